@@ -0,0 +1,109 @@
+"""
+The data the benchmarks run against. Timings are only comparable over the
+same cards, so real data is read at the xwing-data2 commit pinned in
+benchmarks/xwing-data2.ref. Its archive is downloaded through
+ArchiveDataSource once and kept in the r2d7 cache directory. To pin the
+current head of the data branch, where GitHub can be reached, and commit
+the file it writes:
+
+    python -m benchmarks.data --pin
+"""
+import argparse
+import logging
+from pathlib import Path
+
+from r2d7.datasource import ArchiveDataSource, DataSourceError, LocalDataSource
+from r2d7.httpclient import http
+from r2d7.slack.__main__ import Droid
+from r2d7.snapshot import default_cache_dir
+
+REF_FILE = Path(__file__).parent / 'xwing-data2.ref'
+
+logger = logging.getLogger(__name__)
+
+
+class OfflineDroid(Droid):
+    """
+    Keeps no snapshots, pre-renders nothing and loads no points overlays, so
+    only the work being timed is done.
+    """
+    snapshot_store = None
+    PRERENDER_WORKERS = 0
+    points_overlays = {}
+
+
+def load(source, cls=OfflineDroid):
+    """
+    A droid of cls, reading the data source given or the tree at source.
+    """
+    if isinstance(source, (str, Path)):
+        source = LocalDataSource(source)
+    return type(cls.__name__, (cls,), {'data_source': source})()
+
+
+class PinnedDataSource(ArchiveDataSource):
+    """
+    The AMG data as it was at the commit ref, whatever the branch holds now.
+    """
+    def __init__(self, ref, cache_dir=None):
+        super().__init__({"AMG": Droid.GITHUB_USER}, Droid.GITHUB_BRANCH)
+        self.ref = ref
+        self.cache_dir = Path(cache_dir or default_cache_dir() / 'benchmarks')
+
+    def get_version(self, points_database="AMG"):
+        return self.ref
+
+    def prepare(self, points_database, version):
+        if self._loaded.get(points_database) == version:
+            return
+        archive = self.cache_dir / f"xwing-data2-{version}.zip"
+        if not archive.exists():
+            url = self.ARCHIVE_URL.format(user=self.users[points_database], ref=version)
+            logger.info(f"Downloading {url}")
+            res = http.get(url, timeout=self.timeout)
+            if res.status_code != 200:
+                raise DataSourceError(f"Got {res.status_code} GETing {url}.")
+            archive.parent.mkdir(parents=True, exist_ok=True)
+            archive.write_bytes(res.content)
+        self.add_archive(points_database, archive.read_bytes())
+        self._loaded[points_database] = version
+
+
+def pinned_ref():
+    """
+    The pinned commit, or None if nothing has been pinned.
+    """
+    try:
+        return REF_FILE.read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def pinned():
+    """
+    A PinnedDataSource of the pinned commit.
+    """
+    ref = pinned_ref()
+    if ref is None:
+        raise SystemExit(
+            f"No xwing-data2 commit is pinned in {REF_FILE}, "
+            "pin one with: python -m benchmarks.data --pin")
+    return PinnedDataSource(ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--pin', action='store_true',
+                        help="pin the current head of the data branch")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.pin:
+        ref = ArchiveDataSource({"AMG": Droid.GITHUB_USER}, Droid.GITHUB_BRANCH).get_version()
+        if ref is None:
+            raise SystemExit("Couldn't find the head of the data branch.")
+        REF_FILE.write_text(f"{ref}\n")
+    print(pinned_ref() or "Nothing pinned")
+
+
+if __name__ == '__main__':
+    main()
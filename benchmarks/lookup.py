@@ -0,0 +1,158 @@
+"""
+Time card lookups at several catalogue sizes: the old regex scan over every
+card name against the word index, the old substring scan for partial names
+against the trigram index, measuring every name against a misspelt one
+against the deletion dictionary, an eval of every card's points against
+bisecting the range index, and whole lookups through the droid. Only the
+scans should grow with the size of the catalogue.
+
+    python -m benchmarks.lookup
+"""
+import logging
+import random
+import re
+import tempfile
+import time
+
+from r2d7.searchindex import edit_distance
+
+from benchmarks import data, synthetic
+
+
+def pattern(query):
+    ex_lookup = re.escape(query.lower().strip())
+    ex_lookup = re.sub(r' ', ' ?', ex_lookup)
+    ex_lookup = re.sub(r'tie', 'tie.*', ex_lookup)
+    return re.compile(f'\\b{ex_lookup}(?:[\'e]?s)?\\b', re.IGNORECASE)
+
+
+def scan(droid, query):
+    """
+    How lookup used to find names: a regex search of every one.
+    """
+    exact = pattern(query)
+    return [key for key, cards in droid.generation.lookup_data.items()
+            if any(exact.search(card['name']) for card in cards)]
+
+
+def indexed(droid, query):
+    exact = pattern(query)
+    lookup_data = droid.generation.lookup_data
+    keys = droid.generation.word_index.prefixed(droid._name_prefix(query))
+    parts = droid._name_parts(query)
+    return [key for key in keys
+            if all(part in key for part in parts)
+            and any(exact.search(card['name']) for card in lookup_data[key])]
+
+
+def substring_scan(droid, query):
+    """
+    How lookup used to find partial names.
+    """
+    return [key for key in droid.generation.lookup_data if query in key]
+
+
+def substring_indexed(droid, query):
+    return droid.generation.trigram_index.containing(query)
+
+
+def fuzzy_scan(droid, query):
+    """
+    Finding the closest names without an index: measuring them all.
+    """
+    limit = min(2, len(query) // 4)
+    distances = {key: edit_distance(query, key, limit)
+                 for key in droid.generation.lookup_data}
+    best = min(distances.values())
+    return [key for key, distance in distances.items()
+            if distance == best] if best <= limit else []
+
+
+def fuzzy_indexed(droid, query):
+    return droid.generation.fuzzy_index.closest(query)
+
+
+def range_scan(droid, query):
+    """
+    How lookup used to search by points: an eval for every card.
+    """
+    match = droid.filter_pattern.match(query)
+    operator = '==' if match[4] == '=' else match[4]
+    return [card['_id'] for cards in droid.generation.lookup_data.values() for card in cards
+            if match[1] in droid._card_facets(card)
+            and eval(f"{droid._range_value(card, 'points')}{operator}{match[5]}")]
+
+
+def range_indexed(droid, query):
+    match = droid.filter_pattern.match(query)
+    lookup_data = droid.generation.lookup_data
+    facet_cards = droid.generation.facet_index[match[1]]
+    comparison = droid._comparisons[match[4]]
+    keys = droid.generation.range_index.compare(match[1], 'points', match[4], int(match[5]))
+    return [card['_id'] for key in keys for card in lookup_data[key]
+            if card['_id'] in facet_cards
+            and comparison(droid._range_value(card, 'points'), int(match[5]))]
+
+
+def queries(droid, count=100, seed=0):
+    """
+    Names people look up, by kind: whole card names (with and without the
+    spaces), single words, which match many more cards, pieces of names,
+    names with a letter dropped and points searches of a slot.
+    """
+    rng = random.Random(seed)
+    names = sorted(card['name'] for card in droid.all_cards(droid.data))
+    picked = rng.sample(names, count)
+    slots = sorted({droid._card_facets(card)[0] for card in droid.all_cards(droid.data)
+                    if card['category'] not in ('pilot', 'ship')})
+    return {
+        'names': picked + [name.replace(' ', '') for name in picked],
+        'words': [name.split()[0] for name in picked],
+        'partial': [droid.partial_canonicalize(name)[1:7] for name in picked],
+        'misspelt': [droid.partial_canonicalize(name)[:-2] + droid.partial_canonicalize(name)[-1]
+                     for name in picked],
+        'points': [f"{rng.choice(slots)} {rng.choice(('=', '<', '<=', '>', '>='))} {rng.randint(0, 14)}"
+                   for _ in picked],
+    }
+
+
+def per_query(function, droid, queries):
+    start = time.perf_counter()
+    for query in queries:
+        function(droid, query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def lookup(droid, query):
+    return list(droid.lookup(query))
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    kinds = ('names', 'words', 'partial', 'misspelt', 'points')
+    print(f"{'':>6}" + ''.join(f" {kind:^32}" for kind in kinds))
+    print(f"{'cards':>6}" + f" {'scan':>10} {'index':>10} {'lookup':>10}" * len(kinds))
+    for scale in (1, 4, 16):
+        with tempfile.TemporaryDirectory() as root:
+            synthetic.generate(root, scale=scale)
+            droid = data.load(root)
+            cards = sum(len(cards) for cards in droid.data.values())
+            line = f"{cards:>6}"
+            for kind, picked in queries(droid).items():
+                if kind == 'partial':
+                    functions = (substring_scan, substring_indexed, lookup)
+                elif kind == 'misspelt':
+                    functions = (fuzzy_scan, fuzzy_indexed, lookup)
+                elif kind == 'points':
+                    functions = (range_scan, range_indexed, lookup)
+                else:
+                    functions = (scan, indexed, lookup)
+                for query in picked:
+                    assert functions[0](droid, query) == functions[1](droid, query), query
+                for function in functions:
+                    line += f" {per_query(function, droid, picked):>8.0f}us"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
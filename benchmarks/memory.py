@@ -0,0 +1,84 @@
+"""
+Compare the memory used by card data kept as compact Records with the parsed
+JSON dicts it replaces, at several catalogue sizes. "data" is the size of
+everything reachable from the cards, "droid" is everything a loaded droid
+holds on to (cards, lookup index, converted text...) as seen by tracemalloc.
+
+    python -m benchmarks.memory
+"""
+import gc
+import logging
+import sys
+import tempfile
+import tracemalloc
+
+from r2d7.cardmodel import Record
+
+from benchmarks import data, synthetic
+
+
+class DictDroid(data.OfflineDroid):
+    compact_cards = False
+
+
+def deep_size(root):
+    """
+    Bytes used by root and everything it refers to, each object counted once.
+    """
+    seen = set()
+    size = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif isinstance(obj, Record):
+            stack.append(obj._values)
+            stack.append(obj._shape.keys)
+    return size
+
+
+def load(cls, root):
+    gc.collect()
+    tracemalloc.start()
+    droid = data.load(root, cls)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return droid, retained
+
+
+def mb(size):
+    return f"{size / 2**20:.1f}MB"
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    print(f"{'cards':>6} {'dict data':>10} {'compact':>10} {'saved':>6}"
+          f" {'dict droid':>11} {'compact':>10} {'saved':>6}")
+    for scale in (1, 4, 16):
+        with tempfile.TemporaryDirectory() as root:
+            synthetic.generate(root, scale=scale)
+            sizes = []
+            for cls in (DictDroid, data.OfflineDroid):
+                droid, retained = load(cls, root)
+                sizes.append((deep_size(droid.data), retained))
+                cards = sum(len(cards) for cards in droid.data.values())
+                del droid
+
+            (dict_data, dict_droid), (compact_data, compact_droid) = sizes
+            print(f"{cards:>6} {mb(dict_data):>10} {mb(compact_data):>10}"
+                  f" {1 - compact_data / dict_data:>6.0%}"
+                  f" {mb(dict_droid):>11} {mb(compact_droid):>10}"
+                  f" {1 - compact_droid / dict_droid:>6.0%}")
+
+
+if __name__ == '__main__':
+    main()
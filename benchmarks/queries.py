@@ -0,0 +1,190 @@
+"""
+Time a fixed corpus of queries against pinned data, by kind of query: exact
+names, aliases, partial names, slot and ship filters, points searches and
+several lookups in one message. Each query is timed through lookup, then
+through handle_lookup with nothing cached (so rendering is included), then
+through handle_lookup again with its output in the query cache. Reports
+throughput and p50/p99 latency for each, to compare index and cache work.
+
+The queries of benchmarks/corpus.tsv are ones users make, picked by hand,
+and are run against the xwing-data2 commit pinned by benchmarks.data, or a
+local checkout given with --data. --synthetic runs benchmarks/synthetic.tsv
+against the tree benchmarks.synthetic generates instead, to see how the
+timings scale rather than what real lookups cost. That corpus was made up
+from the cards of the synthetic tree with --record, which does the same for
+any data. Every query has to find at least one card, or the timings would
+only be of misses, so a corpus with any that don't is refused.
+
+    python -m benchmarks.queries
+    python -m benchmarks.queries --data ~/xwing-data2
+    python -m benchmarks.queries --synthetic
+    python -m benchmarks.queries --synthetic --record benchmarks/synthetic.tsv
+"""
+import argparse
+import logging
+from pathlib import Path
+import random
+import tempfile
+import time
+
+from r2d7.core import UserError
+
+from benchmarks import data, synthetic
+
+CORPUS = Path(__file__).parent / 'corpus.tsv'
+SYNTHETIC_CORPUS = Path(__file__).parent / 'synthetic.tsv'
+KINDS = ('names', 'aliases', 'partial', 'filters', 'points', 'multi')
+
+
+def record(droid, count=50, seed=0):
+    """
+    count queries of each kind, made up from the cards of droid's data.
+    """
+    rng = random.Random(seed)
+    cards = sorted(droid.all_cards(droid.data), key=lambda card: card['_id'])
+    names = sorted({card['name'] for card in cards})
+    aliases = sorted(alias for alias, target in droid._aliases.items()
+                     if target in droid.generation.lookup_data)
+    by_facet = {}
+    for card in cards:
+        facets = droid._card_facets(card)
+        if facets:
+            by_facet.setdefault(facets[0], []).append(card)
+    facets = sorted(by_facet)
+    ship_facets = [facet for facet in facets
+                   if any(card['category'] == 'pilot' for card in by_facet[facet])]
+
+    def filtered():
+        facet = rng.choice(facets)
+        return f"{facet} {rng.choice(by_facet[facet])['name'].split()[0].lower()}"
+
+    def points():
+        # Compared with the value of one of the cards, so it's found
+        facet = rng.choice(ship_facets)
+        card = rng.choice([card for card in by_facet[facet] if card['category'] == 'pilot'])
+        field = rng.choice(('points', 'loadout', 'initiative'))
+        value = droid._range_value(card, field)
+        operator = rng.choice(('=', '<', '<=', '>', '>='))
+        operand = {'<': value + 1, '>': value - 1}.get(operator, value)
+        return f"{facet} {'' if field == 'points' else field + ' '}{operator} {operand}"
+
+    queries = {
+        'names': [rng.choice((name, name.lower(), name.replace(' ', '')))
+                  for name in rng.sample(names, count)],
+        'aliases': [rng.choice(aliases) for _ in range(count)],
+        'partial': [droid.partial_canonicalize(name)[1:7] for name in rng.sample(names, count)],
+        'filters': [filtered() for _ in range(count)],
+        'points': [points() for _ in range(count)],
+        'multi': [']] [['.join(rng.sample(names, rng.randint(2, 3))) for _ in range(count)],
+    }
+    return [(kind, query) for kind in KINDS for query in queries[kind]]
+
+
+def unmatched(droid, corpus):
+    """
+    The queries of corpus that don't find a card, each lookup of a message
+    with several having to find one.
+    """
+    missing = []
+    for kind, query in corpus:
+        try:
+            if not all(list(droid.lookup(lookup)) for lookup in query.split(']] [[')):
+                missing.append(query)
+        except UserError:
+            missing.append(query)
+    return missing
+
+
+def read_corpus(path):
+    with open(path) as corpus:
+        return [tuple(line.rstrip('\n').split('\t', 1)) for line in corpus
+                if line.strip() and not line.startswith('#')]
+
+
+def write_corpus(path, corpus):
+    with open(path, 'w') as out:
+        for kind, query in corpus:
+            out.write(f"{kind}\t{query}\n")
+
+
+def lookup(droid, query):
+    list(droid.lookup(query))
+
+
+def uncached(droid, query):
+    droid.query_cache.clear()
+    droid.generation.rendered.clear()
+    cached(droid, query)
+
+
+def cached(droid, query):
+    try:
+        droid.handle_lookup(query)
+    except UserError:
+        pass
+
+
+def timings(function, droid, queries, repeat):
+    """
+    Sorted seconds taken by each run of each query, after one untimed run.
+    """
+    for query in queries:
+        function(droid, query)
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            function(droid, query)
+            samples.append(time.perf_counter() - start)
+    return sorted(samples)
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def run(droid, corpus, repeat):
+    cards = sum(len(cards) for cards in droid.data.values())
+    print(f"{len(corpus)} queries over {cards} cards, each run {repeat} times")
+    print(f"{'kind':>8} {'queries':>8} {'timing':>9} {'per sec':>9} {'p50':>10} {'p99':>10}")
+    for kind in KINDS:
+        queries = [query for query_kind, query in corpus if query_kind == kind]
+        if not queries:
+            continue
+        for function in (lookup, uncached, cached):
+            samples = timings(function, droid, queries, repeat)
+            print(f"{kind:>8} {len(queries):>8} {function.__name__:>9} "
+                  f"{len(samples) / sum(samples):>9.0f} "
+                  f"{percentile(samples, 0.5) * 1e6:>8.0f}us "
+                  f"{percentile(samples, 0.99) * 1e6:>8.0f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--data', help="xwing-data2 checkout to use rather than pinned data")
+    parser.add_argument('--synthetic', action='store_true',
+                        help="use synthetic data and its corpus, to see how timings scale")
+    parser.add_argument('--corpus', help="corpus of queries to time")
+    parser.add_argument('--record', metavar='CORPUS', help="record a corpus for the data instead")
+    parser.add_argument('--repeat', type=int, default=5, help="times to run each query")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as root:
+        if args.synthetic:
+            synthetic.generate(root, scale=4, seed=0)
+            droid = data.load(root)
+        else:
+            droid = data.load(args.data or data.pinned())
+        default_corpus = SYNTHETIC_CORPUS if args.synthetic else CORPUS
+        corpus = record(droid) if args.record else read_corpus(args.corpus or default_corpus)
+        missing = unmatched(droid, corpus)
+        if missing:
+            raise SystemExit(f"{len(missing)} queries find no cards: {', '.join(missing[:5])}")
+        if args.record:
+            write_corpus(args.record, corpus)
+            return
+        run(droid, corpus, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
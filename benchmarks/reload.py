@@ -0,0 +1,42 @@
+"""
+Compare a full data load with incremental reloads of a few changed files, at
+several catalogue sizes. Files are read from a local directory rather than
+over HTTP, so what's measured is parsing, indexing and text conversion: reload
+time should follow the number of changed files, not the size of the catalogue.
+
+    python -m benchmarks.reload
+"""
+import logging
+import tempfile
+import time
+
+from benchmarks import data, synthetic
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    print(f"{'cards':>6} {'files':>6} {'full':>9} "
+          + ' '.join(f"{f'{n} changed':>12}" for n in ('none', 1, 4, 16)))
+    for scale in (1, 4, 16):
+        with tempfile.TemporaryDirectory() as root:
+            manifest = synthetic.generate(root, scale=scale)
+            files = synthetic.data_files(manifest)
+
+            start = time.perf_counter()
+            droid = data.load(root)
+            full = time.perf_counter() - start
+
+            timings = []
+            for changed in (0, 1, 4, 16):
+                synthetic.change_costs(root, files[len(files) - changed:])
+                start = time.perf_counter()
+                droid.load_data()
+                timings.append(time.perf_counter() - start)
+
+            cards = sum(len(cards) for cards in droid.data.values())
+            print(f"{cards:>6} {len(files):>6} {full * 1000:>7.1f}ms "
+                  + ' '.join(f"{t * 1000:>10.1f}ms" for t in timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Generate a synthetic xwing-data2 style tree, so the loader and lookups can be
+benchmarked at any catalogue size without network access. The cards are made
+up, so this is for seeing how timings scale rather than what real lookups
+cost, which benchmarks.queries times against pinned data.
+"""
+import json
+from pathlib import Path
+import random
+
+from r2d7.cardlookup import CardLookup
+
+FACTIONS = (
+    ('rebel-alliance', 'Rebel Alliance'),
+    ('galactic-empire', 'Galactic Empire'),
+    ('scum-and-villainy', 'Scum and Villainy'),
+    ('resistance', 'Resistance'),
+)
+SLOTS = ('Talent', 'Sensor', 'Cannon', 'Torpedo', 'Missile', 'Crew',
+         'Gunner', 'Astromech', 'Device', 'Modification', 'Title')
+WORDS = ('hot', 'shot', 'heavy', 'laser', 'cannon', 'fire', 'control',
+         'system', 'red', 'blue', 'squadron', 'ace', 'veteran', 'rookie',
+         'tie', 'wing', 'star', 'dark', 'light', 'ion', 'proton', 'crack',
+         'shadow', 'storm', 'vector', 'orbit', 'pulse', 'nova', 'drift')
+ABILITY = ('After you {}, you may spend 1 [Charge] to gain 1 [Focus] token. '
+           'Setup: Before placing forces, you must assign the Hunted condition.')
+
+
+def alias_targets():
+    """
+    The lookup keys of CardLookup's aliases that a card name alone can give,
+    so lookups of the aliases find something.
+    """
+    return sorted({target for target in CardLookup._aliases.values() if target.isalnum()})
+
+
+def _name(rng, words=2):
+    return ' '.join(rng.choice(WORDS).title() for _ in range(words))
+
+
+def _canonicalize(string):
+    return ''.join(c for c in string.lower() if c.isalnum())
+
+
+def _write(root, filepath, content):
+    path = Path(root) / filepath
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(content))
+
+
+def generate(root, scale=1, seed=0):
+    """
+    Write a tree of roughly 500 * scale cards under root and return its
+    manifest.
+    """
+    rng = random.Random(seed)
+    manifest = {
+        'damagedecks': ['data/damage-decks/core.json'],
+        'upgrades': [],
+        'conditions': 'data/conditions/conditions.json',
+        'pilots': [],
+    }
+
+    _write(root, 'data/damage-decks/core.json', {'name': 'Core', 'cards': [
+        {'title': 'Direct Hit!', 'amount': 5, 'type': 'Ship',
+         'text': 'Suffer 1 [Hit] damage. Then repair this card.'},
+        {'title': 'Blinded Pilot', 'amount': 2, 'type': 'Pilot',
+         'text': 'While you perform an attack, you can modify your dice only by spending [Force].'},
+        {'title': 'Console Fire', 'amount': 2, 'type': 'Ship',
+         'text': 'Before you engage, roll 1 attack die. On a [Hit] result, suffer 1 [Hit] damage.'},
+    ]})
+    _write(root, manifest['conditions'], [
+        {'name': 'Hunted', 'xws': 'hunted',
+         'ability': 'After you are destroyed, you must choose another friendly ship and assign this condition to it.'},
+        {'name': 'Listening Device', 'xws': 'listeningdevice',
+         'ability': 'During the System Phase, if an enemy ship is at range 0-2, reveal your dial.'},
+    ])
+
+    seen = set()
+    for slot in SLOTS:
+        cards = []
+        for i in range(8 * scale):
+            name = f"{_name(rng)} {i}"
+            xws = _canonicalize(name)
+            if xws in seen:
+                continue
+            seen.add(xws)
+            card = {
+                'name': name,
+                'xws': xws,
+                'limited': rng.choice((0, 0, 1)),
+                'cost': {'value': rng.randint(0, 14)},
+                'standard': True,
+                'sides': [{
+                    'title': name,
+                    'type': slot,
+                    'slots': [slot],
+                    'ability': ABILITY.format(rng.choice(WORDS)),
+                }],
+            }
+            if slot == 'Crew' and i % 4 == 0:
+                card['conditions'] = ['hunted']
+            cards.append(card)
+        if slot == 'Crew':
+            # Named for the aliases, without drawing on rng so the rest of
+            # the tree stays as it was
+            for i, target in enumerate(alias_targets()):
+                cards.append({
+                    'name': target.title(),
+                    'xws': target,
+                    'limited': 1,
+                    'cost': {'value': i % 15},
+                    'standard': True,
+                    'sides': [{
+                        'title': target.title(),
+                        'type': slot,
+                        'slots': [slot],
+                        'ability': ABILITY.format('attack'),
+                    }],
+                })
+        filepath = f"data/upgrades/{slot.lower()}.json"
+        _write(root, filepath, cards)
+        manifest['upgrades'].append(filepath)
+
+    ships = [f"{_name(rng, 1)}-{s} Fighter" for s in range(8 * scale)]
+    for f, (faction_dir, faction) in enumerate(FACTIONS):
+        faction_ships = []
+        # Every ship flies for two factions, like the HWK-290 or Y-wing
+        for ship_name in ships[f::len(FACTIONS)] + ships[(f - 1) % len(FACTIONS)::len(FACTIONS)]:
+            pilots = []
+            for p in range(5):
+                name = f"{_name(rng)} {f}{p}"
+                pilots.append({
+                    'name': name,
+                    'xws': _canonicalize(name),
+                    'initiative': rng.randint(1, 6),
+                    'limited': rng.choice((0, 1)),
+                    'cost': rng.randint(2, 9),
+                    'loadout': rng.randint(0, 20),
+                    'slots': rng.sample(SLOTS, 3),
+                    'ability': ABILITY.format(rng.choice(WORDS)),
+                    'shipAbility': {
+                        'name': 'Microthrusters',
+                        'text': 'While you perform a barrel roll, you must use the [Bank Left] template.',
+                    },
+                    'standard': True,
+                })
+            ship = {
+                'name': ship_name,
+                'xws': _canonicalize(ship_name),
+                'size': 'Small',
+                'faction': faction,
+                'dial': ['1TW', '1YW', '2BB', '2FB', '2NB', '3FW', '4KR'],
+                'stats': [
+                    {'arc': 'Front Arc', 'type': 'attack', 'value': 3},
+                    {'type': 'agility', 'value': 2},
+                    {'type': 'hull', 'value': 3},
+                    {'type': 'shields', 'value': 1},
+                ],
+                'actions': [
+                    {'difficulty': 'White', 'type': 'Focus'},
+                    {'difficulty': 'White', 'type': 'Barrel Roll'},
+                ],
+                'pilots': pilots,
+            }
+            filepath = f"data/pilots/{faction_dir}/{ship['xws']}.json"
+            _write(root, filepath, ship)
+            faction_ships.append(filepath)
+        manifest['pilots'].append({'faction': faction, 'ships': faction_ships})
+
+    _write(root, 'data/manifest.json', manifest)
+    return manifest
+
+
+def data_files(manifest):
+    return (
+        manifest['damagedecks'] +
+        manifest['upgrades'] +
+        [manifest['conditions']] +
+        [ship for faction in manifest['pilots'] for ship in faction['ships']]
+    )
+
+
+def change_costs(root, filepaths):
+    """
+    Bump the cost of the first card in each file, like a points update.
+    """
+    for filepath in filepaths:
+        path = Path(root) / filepath
+        content = json.loads(path.read_text())
+        if isinstance(content, list):
+            card = content[0]
+            card['cost'] = {'value': card.get('cost', {}).get('value', 0) + 1}
+        elif 'pilots' in content:
+            content['pilots'][0]['cost'] += 1
+        else:
+            continue
+        path.write_text(json.dumps(content))
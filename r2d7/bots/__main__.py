@@ -1,14 +1,52 @@
-from multiprocessing import Process
 import time
 import logging
 
+from r2d7.core import DroidCore, process_context
+from r2d7.refresher import DataRefresher
+from r2d7.webhook import start_webhook
 from r2d7.slack.__main__ import main as slack_main
 from r2d7.discordR2.__main__ import main as discord_main
 
 logger = logging.getLogger(__name__)
 
+POINTS_DATABASES = ("AMG", "XWA")
 
-def auto_restarter(slack, discord):
+
+def publish_data():
+    """
+    Load the data once here and publish snapshots of it for the bots to
+    attach to, rather than have each of them download and parse it, then keep
+    it up to date in the background. Returns False if that isn't possible.
+
+    What's shared is the downloading and parsing. Each bot still unpickles a
+    snapshot into its own copy of the cards and indexes them itself, so every
+    process holds a whole dataset.
+    """
+    store = DroidCore.snapshot_store
+    if store is None:
+        logger.warning("Snapshots are disabled, each bot will load its own data.")
+        return False
+    refresher = DataRefresher(DroidCore(), POINTS_DATABASES, publish_to=store)
+    refresher.refresh()
+    if not all(store.published(points_database) for points_database in POINTS_DATABASES):
+        logger.warning("Couldn't publish data, each bot will load its own.")
+        return False
+    refresher.start()
+    start_webhook(refresher)
+    return True
+
+
+def start(target, published):
+    """
+    Start a bot in a process of its own. It isn't forked, as the refresher
+    and webhook threads here could be holding locks it would inherit.
+    """
+    process = process_context().Process(target=target, kwargs={'published': published})
+    process.start()
+    return process
+
+
+def auto_restarter(slack, discord, published):
     """
     If either bot crashes, start it up again. Last line of defence against crashes.
     """
@@ -16,21 +54,23 @@ def auto_restarter(slack, discord):
         time.sleep(60)
         if not slack.is_alive():
             logger.warning("AUTO RESTARTER: Slack bot down, restarting...")
-            slack = Process(target=slack_main)
-            slack.start()
+            slack = start(slack_main, published)
         if not discord.is_alive():
             logger.warning("AUTO RESTARTER: Discord bot down, restarting...")
-            discord = Process(target=discord_main)
-            discord.start()
+            discord = start(discord_main, published)
 
 
 def main():
-    slack = Process(target=slack_main)
-    slack.start()
-    discord = Process(target=discord_main)
-    discord.start()
+    logging.basicConfig(
+        format='%(asctime)s [%(process)d] Supervisor - %(levelname)s: %(message)s',
+        level='INFO'
+    )
+    published = publish_data()
+    slack = start(slack_main, published)
+    discord = start(discord_main, published)
+
+    auto_restarter(slack, discord, published)
 
-    auto_restarter(slack, discord)
 
 if __name__ == "__main__":
     main()
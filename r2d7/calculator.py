@@ -1,5 +1,6 @@
 from enum import IntEnum
-import requests
+
+from r2d7.httpclient import http
 
 # These classes are designd to interface with http://xwing.gateofstorms.net/2/multi/
 # For more info see https://github.com/punkUser/xwing_math/blob/master/source/
@@ -192,7 +193,7 @@ class Calculator(object):
         payload['simulate'] = {}
         payload['attack0'] = vars(self.attack_form)
         payload['defense'] = vars(self.defense_form)
-        result = requests.post(self._json_url, json=payload)
+        result = http.post(self._json_url, json=payload)
         if result.ok:
             output = result.json()
             self.result = output['results'][0]
@@ -1,26 +1,50 @@
+from collections import namedtuple
+from collections.abc import Mapping
 import copy
 from html import unescape
-from itertools import chain, groupby
+from itertools import chain, groupby, islice
 import logging
+import operator
+import os
 import re
-import random
 
 from r2d7.core import DroidCore, UserError
+from r2d7.prerender import Prerenderer
+from r2d7.querycache import QueryCache
+from r2d7.sampler import WeightedSampler
+from r2d7.searchindex import FuzzyIndex, PrefixIndex, RangeIndex, TrigramIndex, WordIndex
 
 logger = logging.getLogger(__name__)
 
+# A card another refers to, and the index of the side that does, or None if
+# it's the card itself
+Related = namedtuple('Related', 'kind card side')
+
+
+def _freeze(lines):
+    """
+    Rendered lines as nested tuples, which can be shared safely.
+    """
+    if isinstance(lines, (list, tuple)):
+        return tuple(_freeze(line) for line in lines)
+    return lines
+
+
+def _thaw(lines):
+    if isinstance(lines, tuple):
+        return [_thaw(line) for line in lines]
+    return lines
+
 
 class CardLookup(DroidCore):
     def __init__(self):
         super().__init__()
+        self.query_cache = QueryCache(self.QUERY_CACHE_SIZE, self.QUERY_CACHE_TTL)
         self.register_handler(r'\{\{(.*)\}\}', self.handle_image_lookup)
         self.register_handler(r'\[\[(.*)\]\]', self.handle_lookup)
         self.register_dm_handler(r'\{\{(.*)\}\}', self.handle_image_lookup)
-        self.register_dm_handler(r'(.*)', self.handle_lookup)
-        self.register_handler(r'!(crit)', self.handle_crit)
-
-    _lookup_data = None
-    _core_damage_deck = []
+        self.register_dm_handler(r'(.*)', self.handle_dm_lookup)
+        self.register_handler(r'!crit\b *([^\s\]]*)', self.handle_crit)
 
     _action_order = (
         'Focus',
@@ -116,57 +140,420 @@ class CardLookup(DroidCore):
         'gunboat': 'alphaclassstarwing'
     }
 
-    def load_data(self):
-        super().load_data()
-        self._init_lookup_data()
-
-    def _init_lookup_data(self):
-        next_id = 0
-        self._lookup_data = {}
-        for cards in self.data.values():
-            for card in cards.values():
+    # Worker processes that render every card after a load, set
+    # R2D7_PRERENDER_WORKERS to have cards rendered before they're looked up
+    PRERENDER_WORKERS = int(os.getenv('R2D7_PRERENDER_WORKERS', 0))
+
+    # How many lookup results to keep, and for how many seconds
+    QUERY_CACHE_SIZE = int(os.getenv('R2D7_QUERY_CACHE_SIZE', 1000))
+    QUERY_CACHE_TTL = float(os.getenv('R2D7_QUERY_CACHE_TTL', 3600))
+
+    def metrics(self):
+        metrics = super().metrics()
+        metrics['lookup_cache'] = self.query_cache.stats()._asdict()
+        return metrics
+
+    def _init_generation(self, generation, previous, changes):
+        super()._init_generation(generation, previous, changes)
+        with generation.report.phase('lookup index'):
+            self._init_lookup_data(generation, previous, changes)
+
+    def _generation_loaded(self, generation):
+        super()._generation_loaded(generation)
+        if self.PRERENDER_WORKERS and generation.overlay is None:
+            generation.prerenderer = Prerenderer(self, generation, self.PRERENDER_WORKERS)
+            generation.prerenderer.start()
+
+    def _init_lookup_data(self, generation, previous=None, changes=None):
+        """
+        Index the cards of generation by name. Given the changes from an
+        incremental load, only the cards added and removed are touched.
+        """
+        incremental = not (changes is None or changes.full or previous is None)
+        if not incremental:
+            lookup_data = {}
+            damage_cards = []
+            card_facets = {}
+            added = list(self.all_cards(generation.data))
+        else:
+            lookup_data = dict(previous.lookup_data)
+            removed_ids = {card['_id'] for card in changes.removed if '_id' in card}
+            card_facets = {card_id: facets for card_id, facets in previous.card_facets.items()
+                           if card_id not in removed_ids}
+            # The keys whose cards have changed, in the order they're touched
+            changed = {}
+            for card in changes.removed:
                 name = self.partial_canonicalize(card['name'])
-                self._lookup_data.setdefault(name, []).append(card)
-                card['_id'] = next_id
-                next_id += 1
-                if card['category'] == 'damage':
-                    self._core_damage_deck += [card]*card.get('amount', 0)
-
-        for ship in self.data['ship'].values():
-            all_bars = [
-                pilot['slots']
-                for pilots in ship.get('pilots', []).values()
-                for pilot in pilots
-                if 'slots' in pilot
-            ]
-            try:
-                shortest = sorted(all_bars, key=len)[0]
-            except IndexError:  # No ships have bars
-                continue
-            ship_bar = []
-            for slot in shortest:
-                for bar in all_bars:
-                    if slot not in bar:
-                        break
+                if name not in lookup_data:
+                    continue
+                changed[name] = True
+                cards = [card for card in lookup_data[name]
+                         if card['_id'] not in removed_ids]
+                if cards:
+                    lookup_data[name] = cards
+                else:
+                    del lookup_data[name]
+            damage_cards = [card for card in previous.damage_cards
+                            if card['_id'] not in removed_ids]
+            added = changes.added
+
+        for card in added:
+            name = self.partial_canonicalize(card['name'])
+            # Copy rather than append to lists the previous index still uses
+            lookup_data[name] = lookup_data.get(name, []) + [card]
+            card_facets[card['_id']] = self._card_facets(card)
+            if card['category'] == 'damage':
+                damage_cards.append(card)
+            if incremental:
+                changed[name] = True
+
+        if not incremental:
+            facet_index = {}
+            for card_id, facets in card_facets.items():
+                for facet in facets:
+                    facet_index.setdefault(facet, set()).add(card_id)
+        elif changes.removed or changes.added:
+            # Only the sets of the facets of cards removed or added are copied
+            removals, additions = {}, {}
+            for card_id in removed_ids:
+                for facet in previous.card_facets.get(card_id, ()):
+                    removals.setdefault(facet, set()).add(card_id)
+            for card in added:
+                for facet in card_facets[card['_id']]:
+                    additions.setdefault(facet, set()).add(card['_id'])
+            facet_index = dict(previous.facet_index)
+            for facet in removals.keys() | additions.keys():
+                card_ids = ((facet_index.get(facet, set()) - removals.get(facet, set()))
+                            | additions.get(facet, set()))
+                if card_ids:
+                    facet_index[facet] = card_ids
                 else:
-                    ship_bar.append(slot)
-            ship['slots'] = ship_bar
+                    facet_index.pop(facet, None)
+        else:
+            facet_index = previous.facet_index
+
+        generation.lookup_data = lookup_data
+        generation.damage_cards = damage_cards
+        generation.damage_decks = self._build_damage_decks(damage_cards)
+        generation.card_facets = card_facets
+        generation.facet_index = facet_index
+        if incremental:
+            renamed = [key for key in changed
+                       if self._key_names(previous, key) != self._key_names(generation, key)]
+            generation.word_index = previous.word_index.updated(
+                ((key, self._key_names(previous, key)) for key in renamed),
+                ((key, self._key_names(generation, key)) for key in renamed if key in lookup_data),
+            )
+            removed_keys = [key for key in changed if key not in lookup_data]
+            added_keys = [key for key in changed
+                          if key in lookup_data and key not in previous.lookup_data]
+            generation.trigram_index = previous.trigram_index.updated(removed_keys, added_keys)
+            removed_terms = list(self._lookup_terms(removed_keys))
+            added_terms = list(self._lookup_terms(added_keys))
+            generation.fuzzy_index = previous.fuzzy_index.updated(removed_terms, added_terms)
+            generation.prefix_index = previous.prefix_index.updated(removed_terms, added_terms)
+        else:
+            generation.word_index = WordIndex(
+                (key, self._key_names(generation, key)) for key in lookup_data)
+            generation.trigram_index = TrigramIndex(lookup_data)
+            generation.fuzzy_index = FuzzyIndex(self._lookup_terms(lookup_data))
+            generation.prefix_index = PrefixIndex(self._lookup_terms(lookup_data))
+        # The keys changed since the generation this one was loaded from
+        generation.changed_keys = (previous.number, list(changed)) if incremental else None
+        generation.range_index = self._update_range_index(
+            getattr(previous, 'range_index', None), previous, generation)
+        self._init_related(generation, previous if incremental else None, changes)
+        # What print_card has rendered from this generation, by flavour
+        generation.rendered = {}
+
+    @staticmethod
+    def _key_names(generation, key):
+        return [card['name'] for card in generation.lookup_data.get(key, ())]
+
+    def _lookup_terms(self, keys):
+        """
+        The names and aliases of keys, each with the key it stands for.
+        """
+        keys = dict.fromkeys(keys)
+        return chain(
+            ((key, key) for key in keys),
+            ((alias, target) for alias, target in self._aliases.items() if target in keys),
+        )
+
+    def _init_related(self, generation, previous=None, changes=None):
+        """
+        Link each card of generation to the cards it refers to, and each
+        condition back to the cards that give it. Given the changes from an
+        incremental load, only the cards added and the cards referring to a
+        condition or ship that changed are linked again.
+        """
+        if changes is None or changes.full or previous is None:
+            related = {}
+            given_by = {}
+            cards = list(self.all_cards(generation.data))
+        elif not changes.removed and not changes.added:
+            generation.related = previous.related
+            generation.given_by = previous.given_by
+            return
+        else:
+            related = dict(previous.related)
+            given_by = dict(previous.given_by)
+            cards = list(changes.added)
+            # Cards referring to a changed condition or ship have to link to
+            # its new card
+            referred = {(card['category'], card['xws'])
+                        for card in chain(changes.removed, changes.added)
+                        if card['category'] in ('condition', 'ship')}
+            if referred:
+                added_ids = {card['_id'] for card in cards}
+                cards += [card for card in self.all_cards(generation.data)
+                          if card['_id'] not in added_ids
+                          and not referred.isdisjoint(self._card_references(card))]
+            unlinked = {card.get('_id') for card in chain(changes.removed, cards)}
+            for card_id in unlinked:
+                for relation in related.pop(card_id, ()):
+                    condition_id = relation.card.get('_id')
+                    if relation.kind == 'condition' and condition_id in given_by:
+                        givers = [giver for giver in given_by[condition_id]
+                                  if giver['_id'] != card_id]
+                        if givers:
+                            given_by[condition_id] = givers
+                        else:
+                            del given_by[condition_id]
+            for card in changes.removed:
+                given_by.pop(card.get('_id'), None)
+
+        for card in cards:
+            relations = self._card_relations(card, generation.data)
+            related[card['_id']] = relations
+            for relation in relations:
+                if relation.kind == 'condition':
+                    condition_id = relation.card['_id']
+                    # Copy rather than append to lists the previous links use
+                    given_by[condition_id] = given_by.get(condition_id, []) + [card]
+        generation.related = related
+        generation.given_by = given_by
+
+    @staticmethod
+    def _card_references(card):
+        """
+        The (category, xws) of the conditions and ships card refers to.
+        """
+        for xws in card.get('conditions', ()):
+            yield 'condition', xws
+        for restrict in card.get('restrictions', ()):
+            for xws in restrict.get('ships', ()):
+                yield 'ship', xws
+        for side in card.get('sides', ()):
+            for xws in side.get('conditions', ()):
+                yield 'condition', xws
+
+    @staticmethod
+    def _card_relations(card, data):
+        """
+        The conditions card gives, the ships it's restricted to and the
+        remotes its devices put in play, as a tuple of Related.
+        """
+        conditions = data.get('condition', {})
+        ships = data.get('ship', {})
+        relations = []
+        # In the order of the data, which is how they've always been listed
+        order = {xws: position for position, xws in enumerate(conditions)}
+        for xws in sorted((xws for xws in card.get('conditions', ()) if xws in conditions),
+                          key=order.get):
+            relations.append(Related('condition', conditions[xws], None))
+        for restrict in card.get('restrictions', ()):
+            for xws in restrict.get('ships', ()):
+                if xws in ships:
+                    relations.append(Related('ship', ships[xws], None))
+        for side_index, side in enumerate(card.get('sides', ())):
+            device = side.get('device')
+            if device and device['type'] == 'Remote':
+                remote = dict(device, category='Remote', ability=device['effect'])
+                relations.append(Related('remote', remote, side_index))
+            for xws in side.get('conditions', ()):
+                if xws in conditions:
+                    relations.append(Related('condition', conditions[xws], side_index))
+        return tuple(relations)
+
+    def _relations(self, card):
+        """
+        The Related of card, worked out again for cards that aren't in the
+        data, like remotes.
+        """
+        generation = self.generation
+        relations = generation.related.get(card.get('_id'))
+        if relations is None:
+            relations = self._card_relations(card, generation.data)
+        return relations
+
+    def _related_cards(self, generation, card, expand=False):
+        """
+        The cards to show after card: the conditions it gives, or with expand
+        everything it's linked to either way.
+        """
+        for relation in generation.related.get(card['_id'], ()):
+            if relation.kind == 'condition' and (expand or relation.side is None):
+                yield relation.card
+            elif relation.kind == 'ship' and expand:
+                yield relation.card
+        if expand:
+            yield from generation.given_by.get(card['_id'], ())
+
+    # Numeric fields cards can be searched by, and how each is compared
+    _range_fields = ('points', 'loadout', 'initiative')
+    _comparisons = {
+        '=': operator.eq,
+        '==': operator.eq,
+        '<': operator.lt,
+        '<=': operator.le,
+        '>': operator.gt,
+        '>=': operator.ge,
+    }
+
+    @staticmethod
+    def _range_value(card, field):
+        """
+        The value of field for card, or None if it doesn't have one. Cards
+        without a cost count as free.
+        """
+        if field == 'points':
+            cost = card.get('cost', {})
+            return cost.get('value', 0) if isinstance(cost, Mapping) else cost
+        return card.get(field)
+
+    def _card_facets(self, card):
+        """
+        The emoji a slot filter can pick card out by: its ship's for pilots
+        and its category's for everything else, and its faction's.
+        """
+        if 'ship' in card:
+            facets = (self.iconify(card['ship']['name']),)
+        else:
+            facets = (self.iconify(card['category']),)
+        if 'faction' in card:
+            facets += (self.iconify(card['faction']),)
+        return facets
+
+    def _range_entries(self, generation, keys, points_database="AMG"):
+        """
+        The RangeIndex entries of the cards of generation under keys, with
+        the points they have in points_database.
+        """
+        for key in keys:
+            for card in generation.lookup_data.get(key, ()):
+                card = self.with_points(card, points_database)
+                for facet in generation.card_facets[card['_id']]:
+                    for field in self._range_fields:
+                        value = self._range_value(card, field)
+                        if value is not None:
+                            yield facet, field, value, key
+
+    def _update_range_index(self, index, previous, generation, points_database="AMG"):
+        """
+        index, of the cards of previous, updated for the cards of generation:
+        rebuilt if generation wasn't loaded incrementally from previous,
+        otherwise with only the keys that changed refiled.
+        """
+        changed_from, changed = generation.changed_keys or (None, None)
+        if index is None or previous is None or changed_from != previous.number:
+            return RangeIndex(self._range_entries(
+                generation, generation.lookup_data, points_database))
+        return index.updated(
+            self._range_entries(previous, changed, points_database),
+            self._range_entries(generation, changed, points_database),
+        )
+
+    def _range_index(self, generation, points_database="AMG"):
+        """
+        The RangeIndex of the cards of generation, with the points they have
+        in points_database.
+        """
+        if points_database not in self.points_overlays:
+            return generation.range_index
+        overlay = self.current_generation(points_database)
+        if overlay.overlay is None:  # Fallen back to the base's points
+            return generation.range_index
+        # Built when it's first needed, and updated once the base it was
+        # built from has been replaced
+        built = getattr(overlay, 'range_index', None)
+        if built is None or built[0] is not generation:
+            base, index = built or (None, None)
+            built = overlay.range_index = (generation, self._update_range_index(
+                index, base, generation, points_database))
+        return built[1]
+
+    @staticmethod
+    def _name_prefix(name):
+        """
+        What any card name matching a lookup of name has a word starting with,
+        or None if there's nothing to go on.
+        """
+        match = re.match(r'\w+', name.lower().strip())
+        if not match:
+            return None
+        prefix = match[0]
+        # Anything can come after a "tie"
+        if 'tie' in prefix:
+            prefix = prefix[:prefix.index('tie') + 3]
+        return prefix
+
+    def _name_parts(self, name):
+        """
+        The parts of a lookup of name that the lookup key of any card it
+        matches contains.
+        """
+        return [part for part in self.partial_canonicalize(name).split('tie') if part]
+
+    def _closest_words(self, generation, name):
+        """
+        Keys with a name matching every word of name, each word being an
+        alias, the start of a word of the name or else a misspelling of one.
+        """
+        words = WordIndex.words(name)
+        if len(words) < 2:
+            return []
+        matches = None
+        for word in words:
+            keys = generation.word_index.prefixed(word)
+            if word in self._aliases and self._aliases[word] in generation.lookup_data:
+                keys.append(self._aliases[word])
+            if not keys:
+                keys = generation.word_index.closest(word)
+            if matches is None:
+                matches = keys
+            else:
+                keys = set(keys)
+                matches = [key for key in matches if key in keys]
+            if not matches:
+                return []
+        return matches
 
     _multi_lookup_pattern = re.compile(r'\]\][^\[]*\[\[')
     @property
     def filter_pattern(self):
         raise NotImplementedError()
 
-    def lookup(self, lookup):
-        if self._lookup_data is None:
-            self.load_data()
+    def lookup(self, lookup, points_database="AMG", fuzzy=True):
+        """
+        The cards lookup finds, with their points from points_database.
+        Unless fuzzy is False, a lookup that finds nothing is taken to be
+        misspelt and the closest names are found instead.
+        """
+        generation = self.generation
+        lookup_data = generation.lookup_data
 
         lookup = unescape(lookup)
         logger.debug(f"Looking up: {repr(lookup)}")
 
         cards_yielded = set()
         for lookup in self._multi_lookup_pattern.split(lookup):
-            
+
+            # A leading + shows the related cards of those found too
+            expand = lookup.startswith('+')
+            if expand:
+                lookup = lookup[1:].strip()
+
             if lookup in self._aliases:
                 lookup = self._aliases[lookup]
             
@@ -175,8 +562,10 @@ class CardLookup(DroidCore):
             points_filter = None
             match = self.filter_pattern.match(lookup)
             if not match:
-                match = (None, None, lookup, None, None, None)
-            slot_filter = match[1] or match[5]
+                match = (None, None, lookup, None, None, None, None)
+            slot_filter = match[1] or match[6]
+            if slot_filter:
+                facet_cards = generation.facet_index.get(slot_filter, set())
 
             if match[2]:
                 lookup = self.partial_canonicalize(match[2])
@@ -191,45 +580,68 @@ class CardLookup(DroidCore):
                         f'\\b{ex_lookup}(?:[\'e]?s)?\\b',
                         re.IGNORECASE
                     )
+                    # Only names with a word the lookup could start on, and
+                    # containing all of it, are worth checking
+                    prefix = self._name_prefix(match[2])
+                    parts = self._name_parts(match[2])
+                    if prefix is not None:
+                        keys = generation.word_index.prefixed(prefix)
+                    else:
+                        keys = generation.trigram_index.containing(
+                            max(parts, key=len, default=''))
+                        if keys is None:
+                            keys = lookup_data
                     matches = [
-                        key for key, cards in self._lookup_data.items() if any(
-                            exact.search(card['name']) for card in cards
+                        key for key in keys
+                        if all(part in key for part in parts) and any(
+                            exact.search(card['name']) for card in lookup_data[key]
                         )
                     ]
                     if not matches:
-                        matches = [key for key in self._lookup_data.keys()
+                        matches = generation.trigram_index.containing(lookup)
+                    if matches is None:
+                        matches = [key for key in lookup_data.keys()
                                    if lookup in key]
+                    if not matches and fuzzy:
+                        # Perhaps it's misspelt, as a whole or word by word
+                        matches = (generation.fuzzy_index.closest(lookup)
+                                   or self._closest_words(generation, match[2]))
             else:
+                field = (match[3] or 'points').lower()
                 if not slot_filter:
                     raise UserError(
-                        'You need to specify a slot to search by points value.')
-                matches = self._lookup_data.keys()
-                operator = '==' if match[3] == '=' else match[3]
-                operand = match[4]
+                        f'You need to specify a slot to search by {field} value.')
+                if match[4] not in self._comparisons:
+                    raise UserError(
+                        f"I don't know how to compare with {match[4]}, try one of "
+                        "`=`, `<`, `>`, `<=` or `>=`.")
+                comparison = self._comparisons[match[4]]
+                operand = int(match[5])
+                matches = self._range_index(generation, points_database).compare(
+                    slot_filter, field, match[4], operand)
 
-                points_filter = lambda val: eval(f"{val}{operator}{operand}")
+                def points_filter(card, field=field, comparison=comparison, operand=operand):
+                    value = self._range_value(card, field)
+                    return value is not None and comparison(value, operand)
 
             for match in matches:
-                for card in self._lookup_data[match]:
+                for card in lookup_data[match]:
                     if card['_id'] in cards_yielded:
                         continue
-                    if slot_filter and 'ship' not in card and self.iconify(card['category']) != slot_filter:
+                    card = self.with_points(card, points_database)
+                    if slot_filter and card['_id'] not in facet_cards:
                         continue
-                    if slot_filter and 'ship' in card and self.iconify(card['ship']['name']) != slot_filter:
-                        continue
-                    if points_filter and not points_filter(card.get('cost', {}).get('value', 0)):
+                    if points_filter and not points_filter(card):
                         continue
 
                     cards_yielded.add(card['_id'])
                     yield card
 
-                    if 'conditions' in card:
-                        for condition in self.data['condition'].values():
-                            if condition['_id'] in cards_yielded:
-                                continue
-                            if condition['xws'] in card['conditions']:
-                                yield condition
-                                cards_yielded.add(condition['_id'])
+                    for related in self._related_cards(generation, card, expand):
+                        if related['_id'] in cards_yielded:
+                            continue
+                        cards_yielded.add(related['_id'])
+                        yield self.with_points(related, points_database)
 
     _arc_icons = {
         'Turret': 'turret',
@@ -345,10 +757,11 @@ class CardLookup(DroidCore):
             pass
         return False
 
-    def list_pilots(self, ship):
+    def list_pilots(self, ship, points_database="AMG"):
         ability_faction_pilot_map = {}
         for faction, pilots in ship['pilots'].items():
             for pilot in pilots:
+                pilot = self.with_points(pilot, points_database)
                 ability = '\n'.join(self.print_ship_ability(pilot['shipAbility'])) if 'shipAbility' in pilot else None
                 ability_faction_pilot_map.setdefault(ability, {}).setdefault(faction, []).append(pilot)
         out = []
@@ -424,9 +837,8 @@ class CardLookup(DroidCore):
         return out
 
     def print_charge(self, charge, force=False, plus=False):
-        charge['type'] = 'forcecharge' if force else 'charge'
-        charge['plus'] = plus
-        return self.print_stat(charge)
+        return self.print_stat(
+            dict(charge, type='forcecharge' if force else 'charge', plus=plus))
 
     restriction_faction_map = {
         'Galactic Empire': 'Imperial',
@@ -476,26 +888,27 @@ class CardLookup(DroidCore):
 
 
     def print_ship_ability(self, ability):
-        lines = ability['text']
+        lines = self.convert_text(ability['text'])
         return [self.italics(self.bold(ability['name'] + ':')) + ' ' + lines[0]] + lines[1:]
 
     def print_cost(self, cost):
         try:
             if 'variable' in cost:
                 out = ''
-                if cost['variable'] == 'shields':
-                    cost['variable'] = 'shield'
-                if cost['variable'] in self.stat_colours.keys():
-                    if cost['variable'] != self.stat_colours[cost['variable']]:
+                variable = cost['variable']
+                if variable == 'shields':
+                    variable = 'shield'
+                if variable in self.stat_colours.keys():
+                    if variable != self.stat_colours[variable]:
                         out += self.iconify(
-                            f"{self.stat_colours[cost['variable']]}{cost['variable']}")
-                    icons = [self.iconify(f"{cost['variable']}{stat}")
+                            f"{self.stat_colours[variable]}{variable}")
+                    icons = [self.iconify(f"{variable}{stat}")
                             for stat in cost['values'].keys()]
-                elif cost['variable'] == 'size':
+                elif variable == 'size':
                     icons = [self.iconify(f"{size}base")
                             for size in cost['values'].keys()]
                 else:
-                    logger.warning(f"Unrecognised cost variable: {cost['variable']}")
+                    logger.warning(f"Unrecognised cost variable: {variable}")
                     icons = ['?' for stat in cost['values']]
                 out += ''.join(
                     f"{icon}{cost}" for icon, cost in zip(icons, cost['values'].values()))
@@ -537,13 +950,56 @@ class CardLookup(DroidCore):
             ranges
         )
 
-    def print_card(self, card):
+    def _render_cache(self, points_database="AMG"):
+        """
+        Where print_card keeps what it renders with the points of
+        points_database. It goes with the generation, and renders with an
+        overlay are dropped when the overlay is reloaded.
+        """
+        generation = self.generation
+        overlay = None
+        if points_database in self.points_overlays:
+            overlay = self.current_generation(points_database).number
+        flavour = (points_database, overlay)
+        cache = generation.rendered.get(flavour)
+        if cache is None:
+            for stale in list(generation.rendered):
+                if stale[0] == points_database:
+                    generation.rendered.pop(stale, None)
+            cache = generation.rendered[flavour] = {}
+        return cache
+
+    def print_card(self, card, points_database="AMG"):
+        """
+        The lines describing card. Cards from the data are only rendered once
+        per generation.
+        """
+        if card.get('_id') is None:
+            return self.render_card(card, points_database)
+        return _thaw(self._frozen_card(card, points_database))
+
+    def _frozen_card(self, card, points_database="AMG"):
+        """
+        The rendering of card kept for this generation, frozen.
+        """
+        cache = self._render_cache(points_database)
+        rendered = cache.get(card['_id'])
+        if rendered is None:
+            rendered = cache[card['_id']] = _freeze(self.render_card(card, points_database))
+        return rendered
+
+    def render_card(self, card, points_database="AMG"):
+        """
+        Render card from scratch, without touching it or any other card.
+        """
         is_ship = card['category'] == 'ship'
         is_pilot = card['category'] == 'pilot'
         is_crit = card['category'] == 'damage'
         is_remote = card['category'] == 'Remote'
 
-        if 'sides' not in card:
+        if 'sides' in card:
+            sides = card['sides']
+        else:
             if is_pilot:
                 slot = card['ship']['xws']
             elif is_crit:
@@ -561,10 +1017,13 @@ class CardLookup(DroidCore):
                 fake_side['text'] = card['text']
             elif is_crit and 'text' in card:
                 fake_side['ability'] = card['text']
-            card['sides'] = [fake_side]
+            sides = [fake_side]
 
+        relations = self._relations(card)
         text = []
-        for side in card['sides']:
+        for side_index, side in enumerate(sides):
+            side_relations = [relation for relation in relations
+                              if relation.side == side_index]
             text.append(' '.join(filter(len, (
                 ''.join(self.iconify(slot) for slot in side['slots']),
                 '•' * card.get('limited', 0),
@@ -593,16 +1052,17 @@ class CardLookup(DroidCore):
                 text.append(self.ship_stats(card, card))
 
             if 'ability' in side:
+                ability = list(self.convert_text(side['ability']))
                 # this Restrictions bit handles weird Bold/Italics problems in Discord for Ship Configurations that replace ship abilities.
                 # the database isn't 100% consistent on these so they're a bit finicky
                 if card.get('restrictions'):
                     if card['restrictions'][0].get('shipAbility'):
                         if card['name'] == 'Independent Calculations':
-                            side['ability'][0] = side['ability'][0].replace("***", "**")
-                        side['ability'][-1] = side['ability'][-1].replace("***", "**")
+                            ability[0] = ability[0].replace("***", "**")
+                        ability[-1] = ability[-1].replace("***", "**")
                 if card['name'] == 'TIE Defender Elite':
-                    side['ability'][-1] = side['ability'][-1].replace("***", '**')
-                text.append(side['ability'])
+                    ability[-1] = ability[-1].replace("***", '**')
+                text.append(ability)
 
             if 'text' in side:
                 text.append(self.italics(side['text']))
@@ -627,28 +1087,22 @@ class CardLookup(DroidCore):
             if last_line:
                 text.append(' | '.join(last_line))
 
-            if 'device' in side:
-                if side['device']['type'] == 'Remote':
-                    side['device']['category'] = 'Remote'
-                    side['device']['ability'] = side['device']['effect']
-                    text.append(self.print_card(side['device']))
-                else:
-                    text.append(self.print_device(side['device']))
-
-            if 'conditions' in side:
-                for condition in side['conditions']:
-                    text.append(self.print_card(self.data['condition'][condition]))
+            if 'device' in side and side['device']['type'] != 'Remote':
+                text.append(self.print_device(side['device']))
+            for relation in side_relations:
+                if relation.kind in ('remote', 'condition'):
+                    text.append(self.print_card(relation.card))
 
         if 'dial' in card:
             text.append(self.maneuvers(card['dial']))
 
         if 'pilots' in card:
-            text.append(self.list_pilots(card))
+            text.append(self.list_pilots(card, points_database))
 
         return text
 
     def print_device(self, device):
-        return [f"{self.bold(device['name'])} ({device['type']})"] + device['effect']
+        return [f"{self.bold(device['name'])} ({device['type']})"] + self.convert_text(device['effect'])
 
     def print_image(self, card):
         text = []
@@ -661,30 +1115,136 @@ class CardLookup(DroidCore):
                     text.append(side['image'])
         return text
 
-    def handle_lookup(self, lookup):
-        output = []
-        count = 0
-        for card in self.lookup(lookup):
-            count += 1
-            if count > 15:
-                raise UserError(
-                    'Your search matched more than 15 cards, please be more specific.'
-                )
-            output.append(self.print_card(card))
-        return output
+    @staticmethod
+    def normalize_query(lookup):
+        """
+        lookup with its runs of whitespace made single spaces and none at
+        either end. Case is kept, as aliases and slot emoji depend on it.
+        """
+        return ' '.join(lookup.split())
+
+    def _cached(self, kind, lookup, points_database, handler):
+        """
+        What handler gives for lookup, from the query cache if it's been
+        asked before of the same data. UserErrors are kept too.
+        """
+        lookup = self.normalize_query(lookup)
+        with self.pinned_generation():
+            overlay = None
+            if points_database in self.points_overlays:
+                overlay = self.current_generation(points_database).number
+            key = (kind, lookup, points_database, self.generation.number, overlay)
+            cached = self.query_cache.get(key)
+            if cached is None:
+                try:
+                    cached = _freeze(handler(lookup, points_database))
+                except UserError as error:
+                    cached = error
+                self.query_cache.put(key, cached)
+        if isinstance(cached, UserError):
+            raise UserError(*cached.args)
+        return _thaw(cached)
+
+    def handle_lookup(self, lookup, points_database="AMG"):
+        return self._cached('lookup', lookup, points_database, self._handle_lookup)
+
+    def complete(self, text, limit=25):
+        """
+        Up to limit card names to suggest as text is typed: those starting
+        with it (or with an alias starting with it), shortest first, then
+        those with a word starting with it, then those it's a misspelling of.
+        """
+        generation = self.generation
+        lookup = self.partial_canonicalize(text)
+        if not lookup:
+            return []
+        keys = generation.prefix_index.prefixed(lookup, limit)
+        prefix = self._name_prefix(text)
+        if prefix is not None and len(keys) < limit:
+            parts = self._name_parts(text)
+            keys += [key for key in generation.word_index.prefixed(prefix)
+                     if all(part in key for part in parts)]
+        if not keys:
+            keys = generation.fuzzy_index.closest(lookup)
+        names = []
+        for key in keys:
+            name = generation.lookup_data[key][0]['name']
+            if name not in names:
+                names.append(name)
+                if len(names) == limit:
+                    break
+        return names
+
+    def plan_lookup(self, lookup, points_database="AMG", limit=None, fuzzy=True):
+        """
+        The cards lookup finds, without rendering any. With a limit, only
+        limit + 1 are found, enough to tell whether there are too many.
+        """
+        cards = self.lookup(lookup, points_database, fuzzy)
+        return list(islice(cards, None if limit is None else limit + 1))
+
+    # The most cards a lookup shows
+    lookup_limit = 15
+    image_lookup_limit = 10
+
+    def handle_dm_lookup(self, lookup):
+        """
+        handle_lookup for a direct message, which is taken to be a lookup
+        unless it finds nothing. Misspellings aren't corrected, or any chat
+        would be answered with the closest card.
+        """
+        return self._cached('dm', lookup, "AMG", self._handle_dm_lookup)
+
+    def _handle_dm_lookup(self, lookup, points_database="AMG"):
+        return self._handle_lookup(lookup, points_database, fuzzy=False)
+
+    def _handle_lookup(self, lookup, points_database="AMG", fuzzy=True):
+        cards = self.plan_lookup(lookup, points_database, self.lookup_limit, fuzzy)
+        if len(cards) > self.lookup_limit:
+            raise UserError(
+                f'Your search matched more than {self.lookup_limit} cards, '
+                'please be more specific.'
+            )
+        return [self.print_card(card, points_database) for card in cards]
 
     def handle_image_lookup(self, lookup):
-        output = []
-        count = 0
-        for card in self.lookup(lookup):
-            count += 1
-            if count > 10:
-                raise UserError(
-                    'Your search matched more than 10 cards, please be more specific.'
-                )
-            output += self.print_image(card)
-        return [output]
+        return self._cached('image', lookup, "AMG", self._handle_image_lookup)
+
+    def _handle_image_lookup(self, lookup, points_database="AMG"):
+        cards = self.plan_lookup(lookup, limit=self.image_lookup_limit)
+        if len(cards) > self.image_lookup_limit:
+            raise UserError(
+                f'Your search matched more than {self.image_lookup_limit} cards, '
+                'please be more specific.'
+            )
+        return [list(chain.from_iterable(self.print_image(card) for card in cards))]
 
-    def handle_crit(self, lookup):
-        card = random.choice(self._core_damage_deck)
-        return [self.print_card(card)]
+    # The deck !crit draws from unless it's given another
+    default_damage_deck = 'core'
+
+    @staticmethod
+    def _build_damage_decks(damage_cards):
+        """
+        A WeightedSampler of the cards of each damage deck, by the canonical
+        name of the deck, weighted by how many copies of each it has.
+        """
+        decks = {}
+        for card in damage_cards:
+            decks.setdefault(card['deck'], []).append((card, card.get('amount', 0)))
+        samplers = {}
+        for deck, cards in decks.items():
+            if any(amount > 0 for _, amount in cards):
+                samplers[CardLookup.partial_canonicalize(deck)] = WeightedSampler(cards)
+        return samplers
+
+    def handle_crit(self, deck):
+        decks = self.generation.damage_decks
+        if not decks:
+            raise UserError("There aren't any damage decks loaded.")
+        deck = self.partial_canonicalize(deck or self.default_damage_deck)
+        if deck not in decks:
+            if deck != self.default_damage_deck:
+                names = ', '.join(f"`{sampler.items[0]['deck']}`" for sampler in decks.values())
+                raise UserError(f"I don't know that damage deck, try one of {names}.")
+            deck = next(iter(decks))
+        return [self.print_card(decks[deck].draw())]
@@ -0,0 +1,157 @@
+from collections.abc import Mapping
+import reprlib
+import sys
+
+
+class Shape():
+    """
+    The keys of a Record and where each one's value is. Every record with the
+    same keys, in the same order, shares one Shape.
+    """
+    __slots__ = ('keys', 'index')
+    _shapes = {}
+
+    def __new__(cls, keys):
+        try:
+            return cls._shapes[keys]
+        except KeyError:
+            pass
+        shape = super().__new__(cls)
+        keys = tuple(sys.intern(key) for key in keys)
+        shape.keys = keys
+        shape.index = {key: i for i, key in enumerate(keys)}
+        return cls._shapes.setdefault(keys, shape)
+
+    def __reduce__(self):
+        return Shape, (self.keys, )
+
+
+class Record(Mapping):
+    """
+    A compact, read-only stand in for a card dict from the JSON data. Values
+    are held in a tuple and the keys in a Shape shared with every other record
+    of the same layout, so it costs a fraction of a dict.
+    """
+    __slots__ = ('_shape', '_values')
+
+    def __init__(self, mapping=()):
+        mapping = dict(mapping)
+        object.__setattr__(self, '_shape', Shape(tuple(mapping)))
+        object.__setattr__(self, '_values', tuple(mapping.values()))
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._shape.index[key]]
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        index = self._shape.index.get(key)
+        return default if index is None else self._values[index]
+
+    def __contains__(self, key):
+        return key in self._shape.index
+
+    def __iter__(self):
+        return iter(self._shape.keys)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __eq__(self, other):
+        return self is other or super().__eq__(other)
+
+    __hash__ = None
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    @reprlib.recursive_repr()
+    def __repr__(self):
+        return '{' + ', '.join(f"{key!r}: {value!r}" for key, value in self.items()) + '}'
+
+    # Cards refer to each other (pilots to their ship and back), so pickle
+    # creates the record first and fills it in afterwards
+    def __reduce__(self):
+        return _empty_record, (self._shape, ), self._values
+
+    def __setstate__(self, values):
+        object.__setattr__(self, '_values', values)
+
+
+def _empty_record(shape):
+    record = Record.__new__(Record)
+    object.__setattr__(record, '_shape', shape)
+    return record
+
+
+_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+
+class Compactor():
+    """
+    Turns the dicts and lists parsed from JSON into Records and tuples. Strings
+    are interned, and identical leaves (stat blocks, actions, slot lists, ...)
+    are only kept once. Cycles and shared references are preserved.
+    """
+    def __init__(self):
+        self._memo = {}  # id of an original -> its compact version
+        self._leaves = {}  # Contents of a leaf -> the one kept
+        self._leaf_ids = set()  # ids of compact values made of scalars only
+
+    def __call__(self, value):
+        kind = type(value)
+        if kind is str:
+            return sys.intern(value)
+        if kind is dict:
+            compact = self._memo.get(id(value))
+            return self._record(value) if compact is None else compact
+        if kind is list:
+            compact = self._memo.get(id(value))
+            return self._tuple(value) if compact is None else compact
+        return value
+
+    def _leaf_key(self, values):
+        """
+        What identifies values if they make a leaf, None if they don't.
+        """
+        parts = []
+        for value in values:
+            if type(value) in _SCALARS:
+                parts.append(value)
+            elif id(value) in self._leaf_ids:
+                parts.append(id(value))
+            else:
+                return None
+        # Typed, so that 1, 1.0 and True aren't taken for each other
+        return tuple(parts), tuple(map(type, values))
+
+    def _share(self, key, compact, original):
+        shared = self._leaves.setdefault(key, compact)
+        self._leaf_ids.add(id(shared))
+        self._memo[id(original)] = shared
+        return shared
+
+    def _record(self, mapping):
+        # Registered before its values are, so cycles back to it resolve
+        record = Record.__new__(Record)
+        self._memo[id(mapping)] = record
+        shape = Shape(tuple(mapping))
+        values = tuple([self(value) for value in mapping.values()])
+        object.__setattr__(record, '_shape', shape)
+        object.__setattr__(record, '_values', values)
+        key = self._leaf_key(values)
+        if key is not None:
+            return self._share((shape, key), record, mapping)
+        return record
+
+    def _tuple(self, sequence):
+        values = tuple([self(value) for value in sequence])
+        key = self._leaf_key(values)
+        if key is not None:
+            return self._share(key, values, sequence)
+        self._memo[id(sequence)] = values
+        return values
@@ -1,13 +1,25 @@
 import asyncio
+from contextlib import contextmanager
+import itertools
 import logging
 import json
+import multiprocessing
+import os
 from pathlib import Path
 import re
+import threading
 import time
 import unicodedata
-from collections import OrderedDict
+from collections import OrderedDict, deque, namedtuple
 
-import requests
+from r2d7.cardmodel import Compactor
+from r2d7.datasource import SnapshotDataSource, make_data_source
+from r2d7.filecache import FileCache
+from r2d7.httpclient import http
+from r2d7.loadreport import FileTiming, LoadReport
+from r2d7.points import PointsOverlay
+from r2d7.snapshot import SnapshotStore, default_cache_dir
+from r2d7.versionwatcher import VersionWatcher
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +29,101 @@ def is_pattern_type(obj):
     else:
         return isinstance(obj, re._pattern_type)
 
+
+def process_context():
+    """
+    The multiprocessing context to start processes from. Never fork: a
+    process forked while other threads hold locks (logging, the HTTP
+    session...) can deadlock on them.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+# Cards added and removed by a data load. full is set when everything was
+# reloaded, rather than just the files that changed.
+DataChanges = namedtuple('DataChanges', 'added removed full')
+
+# Where a loaded card came from: the digest of its file, the ship it belongs
+# to (for pilot files) and the (category, card) pairs it added.
+DataFile = namedtuple('DataFile', 'digest ship cards')
+
+# A data file as it comes off a worker: raw is its parsed contents, or None
+# if its digest shows it hasn't changed. fetch and parse are in seconds.
+FetchedFile = namedtuple('FetchedFile', 'filepath digest raw fetch parse')
+
+
+class ClassDefault():
+    """
+    A class attribute that's only built, by calling factory with the class
+    it's declared on, the first time it's read, so importing a module does
+    no I/O. Subclasses can still set their own.
+    """
+    def __init__(self, factory):
+        self.factory = factory
+        self._lock = threading.Lock()
+
+    def __set_name__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance, owner):
+        with self._lock:
+            value = self.owner.__dict__[self.name]
+            if value is self:
+                value = self.factory(self.owner)
+                setattr(self.owner, self.name, value)
+        return value
+
+
+def _snapshot_store(cls):
+    return SnapshotStore(cls.SNAPSHOT_DIR) if cls.SNAPSHOT_DIR else None
+
+
+def _data_source(cls):
+    snapshot_dir = Path(cls.SNAPSHOT_DIR) if cls.SNAPSHOT_DIR else None
+    return make_data_source(
+        cls.DATA_SOURCE,
+        users={"AMG": cls.GITHUB_USER, "XWA": 'gregkash16'},  # XWA is the alternative points db
+        branch=cls.GITHUB_BRANCH,
+        version_users={"XWA": 'eirikmun'},
+        # Validators and bodies of each data file
+        file_cache=FileCache(snapshot_dir / 'files.json' if snapshot_dir else None),
+        # Shared by every process using the same SNAPSHOT_DIR. A GITHUB_TOKEN
+        # raises the API rate limit from 60 requests an hour to 5000
+        watcher=VersionWatcher(
+            snapshot_dir / 'versions.json' if snapshot_dir else None,
+            token=os.getenv('GITHUB_TOKEN'),
+        ),
+    )
+
+
+class DataGeneration():
+    """
+    One complete version of the card data for a points database, along with
+    everything derived from it (the lookup index, converted text, ...).
+
+    A reload builds a new generation off to the side and swaps it in with a
+    single assignment, so readers never see one that is half built.
+    """
+    _numbers = itertools.count(1)
+
+    def __init__(self, points_database, version, data, sources):
+        self.number = next(self._numbers)
+        self.points_database = points_database
+        self.version = version
+        self.data = data
+        self.sources = sources
+        self.checked = time.time()
+        # The LoadReport of the load that built this generation
+        self.report = None
+        # For a points overlay (data is None), the PointsOverlay and the
+        # version of the base database it was built against
+        self.overlay = None
+        self.base_version = None
+
+
 class DroidException(Exception):
     pass
 
@@ -29,6 +136,11 @@ class DroidCore():
     def __init__(self):
         self._handlers = OrderedDict()
         self._dm_handlers = OrderedDict()
+        self._generations = {}
+        self._load_lock = threading.Lock()
+        self._pinned = threading.local()
+        # LoadReports of the latest loads, oldest first
+        self.load_reports = deque(maxlen=50)
 
     def register_handler(self, pattern, method):
         if not is_pattern_type(pattern):
@@ -68,41 +180,198 @@ class DroidCore():
     def link(url, name):
         raise NotImplementedError()
 
-    _data = None
-    _xwa_data = None
     GITHUB_USER = 'gregkash16'  # changed from guidokessels. This should update the default data to the XWA points.
     GITHUB_BRANCH = 'master'
-    BASE_URL = f"https://raw.githubusercontent.com/{GITHUB_USER}/xwing-data2/{GITHUB_BRANCH}/"
-    XWA_POINTS_URL = f"https://raw.githubusercontent.com/gregkash16/xwing-data2/{GITHUB_BRANCH}/"  # alternative points db
     MANIFEST = 'data/manifest.json'
     # VERSION_RE = re.compile(r'xwing-data/releases/tag/([\d\.]+)')
     check_frequency = 900  # 15 minutes
+    # Parsed data is kept here between restarts, set R2D7_SNAPSHOT_DIR to an
+    # empty string to always load from GitHub. It has to be private to this
+    # user, as snapshots are pickles.
+    SNAPSHOT_DIR = os.getenv('R2D7_SNAPSHOT_DIR', default_cache_dir())
+    snapshot_store = ClassDefault(_snapshot_store)
+    # Where data files come from: "http" fetches them from GitHub one by one,
+    # "archive" downloads the whole repository in one go, anything else is
+    # the path of a local xwing-data2 checkout
+    DATA_SOURCE = os.getenv('R2D7_DATA_SOURCE', 'http')
+    data_source = ClassDefault(_data_source)
+    # Keep cards as compact read-only Records rather than the parsed dicts
+    compact_cards = True
+    # Most data files fetched at once, when the data source allows it
+    fetch_window = 8
+    # Alternative points databases, kept as an overlay on the cards of the
+    # database each maps to rather than as a catalogue of their own
+    points_overlays = {"XWA": "AMG"}
+    _next_id = 0
     formatted_link_regex = re.compile(r'(?P<url>http(s)?://.*?)\|(?P<text>.*)')
 
     @classmethod
-    def get_file(cls, filepath, points_database="AMG"):
-        url = cls.BASE_URL if points_database == "AMG" else cls.XWA_POINTS_URL
-        return filepath, requests.get(url + filepath)
-
-    @classmethod
-    def get_version(cls, points_database="AMG"):
-        user = cls.GITHUB_USER if points_database == "AMG" else "eirikmun"
-
-        res = requests.get(
-            f"https://api.github.com/repos/{user}/xwing-data2/branches/{cls.GITHUB_BRANCH}")
-        if res.status_code != 200:
-            logger.warning(f"Got {res.status_code} checking data version.")
-            return False
-        return res.json()['commit']['sha']
-
-    async def _load_data(self, points_database="AMG"):
-        url = self.BASE_URL if points_database == "AMG" else self.XWA_POINTS_URL
-        res = requests.get(url + self.MANIFEST)
-        if res.status_code != 200:
-            raise DroidException(f"Got {res.status_code} GETing {res.url}.")
-        manifest = res.json()
-
-        files = (
+    def use_published_data(cls):
+        """
+        Load only the snapshots published by another process (see
+        r2d7.bots), instead of fetching and parsing the data here.
+        """
+        cls.data_source = SnapshotDataSource(cls.snapshot_store)
+        cls.check_frequency = cls.data_source.check_frequency
+
+    async def _load_data(self, previous=None, points_database="AMG", full=False, report=None):
+        """
+        Build a new DataGeneration for points_database, re-parsing only the
+        files that changed since the previous generation unless full is set.
+        The time taken by each phase is recorded in report.
+
+        Returns the generation and a DataChanges listing the cards added and
+        removed.
+        """
+        if report is None:
+            report = LoadReport(points_database)
+        if points_database in self.points_overlays:
+            return await self._load_overlay(previous, points_database, full, report)
+
+        data_source = self.data_source
+        with report.phase('version'):
+            version = data_source.get_version(points_database)
+        if previous is not None and not full and version == previous.version:
+            # Same commit, same files
+            return (
+                DataGeneration(points_database, version, previous.data, previous.sources),
+                DataChanges(added=[], removed=[], full=False),
+            )
+        if full or previous is None:
+            full, sources = True, {}
+        else:
+            sources = previous.sources
+        previous = {} if previous is None else previous.data
+
+        # This version may already have been built, by an earlier run or by
+        # another process
+        if self.snapshot_store:
+            with report.phase('snapshot load'):
+                snapshot = self.snapshot_store.load(points_database, version)
+            if snapshot is not None:
+                report.count('cards', sum(len(cards) for cards in snapshot['data'].values()))
+                generation = DataGeneration(
+                    points_database, version, snapshot['data'], snapshot['sources'])
+                # Don't hand out ids the snapshot already uses
+                self._next_id = max(
+                    [self._next_id] + [card['_id'] + 1 for card in self.all_cards(generation.data)])
+                return generation, DataChanges(
+                    added=list(self.all_cards(generation.data)),
+                    removed=list(self.all_cards(previous)),
+                    full=True,
+                )
+
+        with report.phase('prepare'):
+            data_source.prepare(points_database, version)
+        with report.phase('manifest'):
+            files = self._data_files(data_source, points_database)
+
+        # Files are parsed as they arrive, and on a full load their cards are
+        # added straight away, in manifest order, while the rest download
+        if full:
+            data, removed = {}, list(self.all_cards(previous))
+        else:
+            data, removed = {category: dict(cards) for category, cards in previous.items()}, []
+        known = {filepath: source.digest for filepath, source in sources.items()}
+        sources = dict(sources)
+        digests, raw_files, timings = {}, {}, {}
+        loaded, added = [], []
+        waiting = deque(files)
+
+        def add_file(filepath):
+            start = time.perf_counter()
+            raw = raw_files.pop(filepath)
+            cards = self._add_file(data, filepath, raw)
+            added.extend(card for _, card in cards)
+            ship = raw['xws'] if filepath.startswith('data/pilots/') else None
+            sources[filepath] = DataFile(digests[filepath], ship, cards)
+            loaded.append(filepath)
+            timings[filepath] = timings[filepath]._replace(
+                ingest=time.perf_counter() - start)
+
+        with report.phase('fetch'):
+            async for fetched in self._fetch_files(data_source, files, points_database, known):
+                digests[fetched.filepath] = fetched.digest
+                timings[fetched.filepath] = FileTiming(fetched.fetch, fetched.parse, 0)
+                if fetched.raw is not None:
+                    raw_files[fetched.filepath] = fetched.raw
+                while full and waiting and waiting[0] in digests:
+                    add_file(waiting.popleft())
+
+        with report.phase('apply changes'):
+            if not full:
+                changed = list(raw_files)
+                deleted = [filepath for filepath in sources if filepath not in digests]
+
+                # Pilots of one ship are spread over a file per faction, but share a
+                # single ship card, so a change to one means reloading them all.
+                ships = {sources[filepath].ship for filepath in changed + deleted
+                         if filepath in sources}
+                ships.update(raw['xws'] for filepath, raw in raw_files.items()
+                             if filepath.startswith('data/pilots/'))
+                ships.discard(None)
+                for filepath in files:
+                    if filepath not in raw_files and sources[filepath].ship in ships:
+                        raw_files[filepath] = data_source.read_file(filepath, points_database)
+
+                for filepath in list(raw_files) + deleted:
+                    if filepath not in sources:
+                        continue
+                    for category, card in sources.pop(filepath).cards:
+                        removed.append(card)
+                        if data[category].get(card['xws']) is card:
+                            del data[category][card['xws']]
+
+                for filepath in files:
+                    if filepath in raw_files:
+                        add_file(filepath)
+
+        with report.phase('ids and slot bars'):
+            for card in added:
+                card['_id'] = self._next_id
+                self._next_id += 1
+                if card['category'] == 'ship':
+                    self._set_ship_slots(card)
+
+        if self.compact_cards:
+            with report.phase('compact'):
+                compact = Compactor()
+                for filepath in loaded:
+                    digest, ship, cards = sources[filepath]
+                    for category, card in cards:
+                        if data[category].get(card['xws']) is card:
+                            data[category][card['xws']] = compact(card)
+                    cards = [(category, compact(card)) for category, card in cards]
+                    sources[filepath] = DataFile(digest, ship, cards)
+                added = [compact(card) for card in added]
+
+        logger.info(
+            f"Loaded {len(loaded)} of {len(files)} {points_database} files: "
+            f"{len(added)} cards added, {len(removed)} removed")
+        report.files = timings
+        report.count('files', len(files))
+        report.count('files loaded', len(loaded))
+        report.count('cards added', len(added))
+        report.count('cards removed', len(removed))
+
+        with report.phase('file cache save'):
+            data_source.save()
+        if self.snapshot_store:
+            with report.phase('snapshot save'):
+                self.snapshot_store.save(points_database, version, {
+                    'data': data,
+                    'sources': sources,
+                })
+        generation = DataGeneration(points_database, version, data, sources)
+        return generation, DataChanges(added=added, removed=removed, full=full)
+
+    def _data_files(self, data_source, points_database):
+        """
+        The data files listed in the manifest, in the order they're loaded.
+        """
+        data_source.get_file(self.MANIFEST, points_database)
+        manifest = data_source.read_file(self.MANIFEST, points_database)
+        return (
             manifest['damagedecks'] +
             manifest['upgrades'] +
             [manifest['conditions']] +
@@ -110,58 +379,189 @@ class DroidCore():
                 for ship in faction['ships']]
         )
 
-        self._data = {}
+    async def _load_overlay(self, previous, points_database, full, report):
+        """
+        Build a generation of points_database holding only the points that
+        differ from those of the base database it's an overlay on. Its cards
+        are parsed to compare them, then dropped.
+        """
+        base = self._generations[self.points_overlays[points_database]]
+        data_source = self.data_source
+        with report.phase('version'):
+            version = data_source.get_version(points_database)
+        generation = DataGeneration(points_database, version, None, {})
+        generation.base_version = base.version
+        if (previous is not None and not full and version == previous.version
+                and base.version == previous.base_version):
+            generation.overlay = previous.overlay
+            return generation, DataChanges(added=[], removed=[], full=False)
+        changes = DataChanges(added=[], removed=[], full=True)
+
+        # Snapshots of an overlay are only good for the base they were built on
+        snapshot_version = f"{version}-{base.version}"
+        if self.snapshot_store:
+            with report.phase('snapshot load'):
+                snapshot = self.snapshot_store.load(points_database, snapshot_version)
+            if snapshot is not None:
+                generation.overlay = snapshot['overlay']
+                return generation, changes
+
+        with report.phase('prepare'):
+            data_source.prepare(points_database, version)
+        with report.phase('manifest'):
+            files = self._data_files(data_source, points_database)
+        raw_files = {}
+        with report.phase('fetch'):
+            async for fetched in self._fetch_files(data_source, files, points_database, {}):
+                raw_files[fetched.filepath] = fetched.raw
+                report.files[fetched.filepath] = FileTiming(fetched.fetch, fetched.parse, 0)
+        data = {}
+        with report.phase('build overlay'):
+            for filepath in files:
+                self._add_file(data, filepath, raw_files.pop(filepath))
+            generation.overlay = PointsOverlay.build(base.data, data)
+
+        logger.info(
+            f"Loaded {points_database} points for {len(generation.overlay)} cards "
+            f"that differ from {base.points_database}")
+        report.count('files', len(files))
+        report.count('cards overlaid', len(generation.overlay))
+
+        with report.phase('file cache save'):
+            data_source.save()
+        if self.snapshot_store:
+            with report.phase('snapshot save'):
+                self.snapshot_store.save(points_database, snapshot_version, {
+                    'overlay': generation.overlay,
+                })
+        return generation, changes
+
+    async def _fetch_files(self, data_source, files, points_database, known):
+        """
+        Yield a FetchedFile for each of files as soon as it's been fetched and
+        parsed, keeping no more than fetch_window of them in flight. Files
+        whose digest is the one known for them aren't parsed.
+        """
+        def fetch(filepath):
+            return self._fetch_file(
+                data_source, filepath, points_database, known.get(filepath))
+
+        if not data_source.parallel:
+            for filepath in files:
+                yield fetch(filepath)
+            return
+
         loop = asyncio.get_event_loop()
-        futures = [loop.run_in_executor(None, self.get_file, filename, points_database)
-                   for filename in files]
-
-        self.data_version = self.get_version()
-        self._last_checked_version = time.time()
-
-        for filepath, res in await asyncio.gather(*futures):
-            if res.status_code != 200:
-                raise DroidException(
-                    f"Got {res.status_code} GETing {res.url}.")
-
-            _, category, remaining = filepath.split('/', maxsplit=2)
-            raw_data = res.json()
-
-            if category == 'upgrades':
-                for card in raw_data:
-                    self.add_card('upgrade', card,
-                                  subcat=remaining.split('.')[0])
-
-            elif category == 'pilots':
-                first_ship = ship = raw_data
-                if 'ship' in self._data and ship['xws'] in self._data['ship']:
-                    first_ship = self._data['ship'][ship['xws']]
-                for pilot in ship['pilots']:
-                    pilot['ship'] = first_ship
-                    pilot['faction'] = ship['faction']
-                    self.add_card('pilot', pilot)
-                ship['pilots'] = {ship['faction']: ship['pilots']}
-                if first_ship is not ship:
-                    first_ship['pilots'].update(ship['pilots'])
-                else:
-                    self.add_card('ship', ship)
-
-            elif category == 'damage-decks':
-                for card in raw_data['cards']:
-                    card['name'] = card['title']
-                    card['xws'] = self.partial_canonicalize(card['name'])
-                    card['deck'] = remaining[:-5]
-                    self.add_card('damage', card)
-
-            elif category == 'conditions':
-                for card in raw_data:
-                    self.add_card('condition', card)
-
-    def add_card(self, category, card, subcat=None):
+        queued = iter(files)
+        in_flight = {loop.run_in_executor(None, fetch, filepath)
+                     for filepath in itertools.islice(queued, self.fetch_window)}
+        try:
+            while in_flight:
+                done, in_flight = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED)
+                in_flight.update(loop.run_in_executor(None, fetch, filepath)
+                                 for filepath in itertools.islice(queued, len(done)))
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    @staticmethod
+    def _fetch_file(data_source, filepath, points_database, digest=None):
+        """
+        Fetch one file, and parse it unless it still has the given digest.
+        """
+        start = time.perf_counter()
+        _, new_digest = data_source.get_file(filepath, points_database)
+        fetched = time.perf_counter()
+        raw = None
+        if digest is None or new_digest != digest:
+            raw = data_source.read_file(filepath, points_database)
+        return FetchedFile(
+            filepath, new_digest, raw, fetched - start, time.perf_counter() - fetched)
+
+    def _add_file(self, data, filepath, raw_data):
+        """
+        Add the cards from one data file, returning (category, card) pairs.
+        """
+        _, category, remaining = filepath.split('/', maxsplit=2)
+        cards = []
+
+        if category == 'upgrades':
+            for card in raw_data:
+                cards.append(self.add_card(data, 'upgrade', card,
+                                           subcat=remaining.split('.')[0]))
+
+        elif category == 'pilots':
+            first_ship = ship = raw_data
+            if 'ship' in data and ship['xws'] in data['ship']:
+                first_ship = data['ship'][ship['xws']]
+            for pilot in ship['pilots']:
+                pilot['ship'] = first_ship
+                pilot['faction'] = ship['faction']
+                cards.append(self.add_card(data, 'pilot', pilot))
+            ship['pilots'] = {ship['faction']: ship['pilots']}
+            if first_ship is not ship:
+                first_ship['pilots'].update(ship['pilots'])
+            else:
+                cards.append(self.add_card(data, 'ship', ship))
+
+        elif category == 'damage-decks':
+            for card in raw_data['cards']:
+                card['name'] = card['title']
+                card['deck'] = remaining[:-5]
+                # Decks share card titles, so each card is filed by its deck too
+                card['xws'] = self.partial_canonicalize(f"{card['deck']} {card['name']}")
+                cards.append(self.add_card(data, 'damage', card))
+
+        elif category == 'conditions':
+            for card in raw_data:
+                cards.append(self.add_card(data, 'condition', card))
+
+        return cards
+
+    @staticmethod
+    def _set_ship_slots(ship):
+        """
+        Give a ship the upgrade bar all its pilots have in common.
+        """
+        all_bars = [
+            pilot['slots']
+            for pilots in ship.get('pilots', []).values()
+            for pilot in pilots
+            if 'slots' in pilot
+        ]
+        try:
+            shortest = sorted(all_bars, key=len)[0]
+        except IndexError:  # No ships have bars
+            return
+        ship_bar = []
+        for slot in shortest:
+            for bar in all_bars:
+                if slot not in bar:
+                    break
+            else:
+                ship_bar.append(slot)
+        ship['slots'] = ship_bar
+
+    @staticmethod
+    def add_card(data, category, card, subcat=None):
         card['category'] = subcat or category
-        category = self._data.setdefault(category, {})
-        category[card['xws']] = card
+        data.setdefault(category, {})[card['xws']] = card
+        return category, card
 
-    def load_data(self, points_database="AMG"):
+    @staticmethod
+    def all_cards(data):
+        for cards in data.values():
+            yield from cards.values()
+
+    def load_data(self, points_database="AMG", full=False):
+        """
+        Load a new generation of points_database and swap it in. Only one load
+        runs at a time; readers carry on with the old generation until it's
+        done.
+        """
         try:
             loop = asyncio.get_event_loop()
         except RuntimeError:
@@ -169,31 +569,141 @@ class DroidCore():
             # yet, so make one
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-        loop.run_until_complete(self._load_data(points_database))
-
-    _last_checked_version = None
-
-    def needs_update(self, points_database="AMG"):
-        if (time.time() - self._last_checked_version) < self.check_frequency:
+        base = self.points_overlays.get(points_database)
+        if base is not None and base not in self._generations:
+            # An overlay needs its base, which has to be loaded before taking
+            # the lock
+            self.load_data(base)
+        with self._load_lock:
+            report = LoadReport(points_database)
+            previous = self._generations.get(points_database)
+            generation, changes = loop.run_until_complete(
+                self._load_data(previous, points_database, full, report))
+            generation.report = report
+            if generation.overlay is None:
+                self._init_generation(generation, previous, changes)
+            self._generations[points_database] = generation
+        self.load_reports.append(report)
+        self._generation_loaded(generation)
+        report.finish(generation.version)
+        return changes
+
+    def load_overlays(self):
+        """
+        Load every points overlay, so none has to be loaded while handling a
+        message. One that fails is left to the refresher to try again.
+        """
+        for points_database in self.points_overlays:
+            try:
+                self.load_data(points_database)
+            except Exception:
+                logger.exception(f"Failed to load {points_database} data")
+
+    def _init_generation(self, generation, previous, changes):
+        """
+        Hook for subclasses to build whatever they derive from the data onto
+        a new generation, before it's swapped in. previous is the generation
+        it replaces, if any, and changes the DataChanges between them. Time
+        each step with generation.report.phase().
+        """
+        pass
+
+    def _generation_loaded(self, generation):
+        """
+        Hook for subclasses to start work on a generation once it's been
+        swapped in. Work that carries on in the background holds
+        generation.report until it's recorded there.
+        """
+        pass
+
+    def needs_update(self, points_database="AMG", recheck=False):
+        """
+        Whether there's newer data for points_database than we have. The
+        version is only checked every check_frequency, unless recheck is set.
+        """
+        generation = self._generations.get(points_database)
+        if generation is None:
+            return True
+        base = self._generations.get(self.points_overlays.get(points_database))
+        if generation.overlay is not None and (
+                base is None or base.version != generation.base_version):
+            return True
+        if not recheck and (time.time() - generation.checked) < self.check_frequency:
             logger.debug("Checked version recently.")
             return False
 
-        current_version = self.get_version(points_database)
+        current_version = self.data_source.get_version(points_database)
         logger.debug(f"Current {points_database} xwing-data version: {current_version}")
-        self._last_checked_version = time.time()
-        return self.data_version != current_version
+        generation.checked = time.time()
+        # Without a version to go on, keep what we have
+        return bool(current_version) and generation.version != current_version
+
+    def current_generation(self, points_database="AMG"):
+        """
+        The generation of points_database in use. Nothing is loaded here, as
+        this runs on threads (like the Discord client's) that can't run a
+        load: an overlay that isn't loaded falls back to its base's points,
+        anything else raises DroidException.
+        """
+        pinned = getattr(self._pinned, 'generation', None)
+        if pinned is not None and pinned.points_database == points_database:
+            return pinned
+        generation = self._generations.get(points_database)
+        if generation is None:
+            base = self.points_overlays.get(points_database)
+            generation = self._generations.get(base)
+            if generation is None:
+                raise DroidException(f"No {points_database} data has been loaded")
+            logger.debug(f"No {points_database} data loaded, using {base} points")
+        return generation
+
+    @contextmanager
+    def pinned_generation(self, points_database="AMG"):
+        """
+        Serve every read of the data made by this thread inside the block from
+        the generation current when it started, even if a reload swaps in a
+        new one part way through.
+        """
+        if getattr(self._pinned, 'generation', None) is not None:
+            yield
+            return
+        self._pinned.generation = self.current_generation(points_database)
+        try:
+            yield
+        finally:
+            self._pinned.generation = None
+
+    @property
+    def generation(self):
+        return self.current_generation()
 
     @property
     def data(self):
-        if self._data is None:
-            self.load_data()
-        return self._data
+        return self.generation.data
 
     @property
-    def xwa_data(self):
-        if self._xwa_data is None:
-            self.load_data("XWA")
-        return self._xwa_data
+    def data_version(self):
+        generation = self._generations.get("AMG")
+        return generation and generation.version
+
+    def metrics(self):
+        """
+        Figures for monitoring: the reports of the latest data loads, and
+        request counts and latencies of outbound HTTP by host.
+        """
+        return {
+            'loads': [report.as_dict() for report in self.load_reports],
+            'http': {host: stats._asdict() for host, stats in http.stats().items()},
+        }
+
+    def with_points(self, card, points_database="AMG"):
+        """
+        card with the cost, loadout and legality it has in points_database.
+        """
+        if points_database not in self.points_overlays:
+            return card
+        overlay = self.current_generation(points_database).overlay
+        return card if overlay is None else overlay.apply(card)
 
     @staticmethod
     def partial_canonicalize(string):
@@ -0,0 +1,195 @@
+import hashlib
+import io
+import logging
+from pathlib import Path
+import zipfile
+
+from r2d7.filecache import FileCache
+from r2d7.httpclient import http
+from r2d7.versionwatcher import VersionWatcher
+
+logger = logging.getLogger(__name__)
+
+
+class DataSourceError(Exception):
+    pass
+
+
+class DataSource():
+    """
+    Where the loader gets xwing-data2 files from. get_file makes sure the
+    current version of a file is to hand and returns the digest of its
+    contents, read_file then hands out a fresh parsed copy of it.
+    """
+    # Whether get_file is worth calling from several threads at once
+    parallel = False
+
+    def __init__(self, file_cache=None):
+        self.file_cache = FileCache() if file_cache is None else file_cache
+
+    def get_version(self, points_database="AMG"):
+        raise NotImplementedError()
+
+    def prepare(self, points_database, version):
+        """
+        Called at the start of each load, before any files are fetched.
+        """
+        pass
+
+    def key(self, filepath, points_database="AMG"):
+        return f"{points_database}/{filepath}"
+
+    def get_file(self, filepath, points_database="AMG"):
+        raise NotImplementedError()
+
+    def read_file(self, filepath, points_database="AMG"):
+        return self.file_cache.get(self.key(filepath, points_database))
+
+    def save(self):
+        self.file_cache.save()
+
+
+class GitHubDataSource(DataSource):
+    """
+    Base for the sources that read xwing-data2 from GitHub. users maps each
+    points database to the GitHub user whose fork holds its data. Versions
+    are found by watcher, which may be shared with other processes.
+    """
+    VERSION_URL = "https://api.github.com/repos/{user}/xwing-data2/branches/{branch}"
+    RAW_URL = "https://raw.githubusercontent.com/{user}/xwing-data2/{branch}/"
+
+    def __init__(self, users, branch='master', version_users=None, file_cache=None,
+                 watcher=None):
+        super().__init__(file_cache)
+        self.users = users
+        self.branch = branch
+        # Repositories to check for new versions, if not the data ones
+        self.version_users = dict(users, **(version_users or {}))
+        self.watcher = VersionWatcher() if watcher is None else watcher
+
+    def get_version(self, points_database="AMG"):
+        return self.watcher.version(self.VERSION_URL.format(
+            user=self.version_users[points_database], branch=self.branch))
+
+    def key(self, filepath, points_database="AMG"):
+        # Both GitHub sources key files by their raw URL, so switching
+        # between them keeps the file cache
+        return self.RAW_URL.format(
+            user=self.users[points_database], branch=self.branch) + filepath
+
+
+class HttpDataSource(GitHubDataSource):
+    """
+    Fetches each file separately, with conditional GETs so unchanged files
+    cost a 304.
+    """
+    parallel = True
+
+    def get_file(self, filepath, points_database="AMG"):
+        url = self.key(filepath, points_database)
+        res = http.get(url, headers=self.file_cache.headers(url))
+        if res.status_code not in (200, 304):
+            raise DataSourceError(f"Got {res.status_code} GETing {res.url}.")
+        self.file_cache.update(url, res)
+        return filepath, self.file_cache.digest(url)
+
+
+class ArchiveDataSource(GitHubDataSource):
+    """
+    Downloads the whole repository as a single zip archive for the version
+    being loaded, and parses the files out of it in memory.
+    """
+    ARCHIVE_URL = "https://codeload.github.com/{user}/xwing-data2/zip/{ref}"
+    timeout = (5, 120)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loaded = {}  # The ref of the archive loaded for each database
+
+    def prepare(self, points_database, version):
+        ref = version or self.branch
+        if self._loaded.get(points_database) == ref:
+            return
+        url = self.ARCHIVE_URL.format(user=self.users[points_database], ref=ref)
+        logger.info(f"Downloading {url}")
+        res = http.get(url, timeout=self.timeout)
+        if res.status_code != 200:
+            raise DataSourceError(f"Got {res.status_code} GETing {url}.")
+        self.add_archive(points_database, res.content)
+        self._loaded[points_database] = ref
+
+    def add_archive(self, points_database, body):
+        """
+        Store every JSON file in the zip archive body.
+        """
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            for name in archive.namelist():
+                # Everything is under a "xwing-data2-<ref>/" directory
+                _, _, filepath = name.partition('/')
+                if filepath.endswith('.json'):
+                    self.file_cache.store(
+                        self.key(filepath, points_database), archive.read(name))
+
+    def get_file(self, filepath, points_database="AMG"):
+        key = self.key(filepath, points_database)
+        if key not in self.file_cache:
+            raise DataSourceError(f"{filepath} isn't in the archive.")
+        return filepath, self.file_cache.digest(key)
+
+
+class LocalDataSource(DataSource):
+    """
+    Reads a local xwing-data2 checkout, for running without network access.
+    The version changes whenever any of the data files does.
+    """
+    def __init__(self, root, file_cache=None):
+        super().__init__(file_cache)
+        self.root = Path(root)
+
+    def get_version(self, points_database="AMG"):
+        stats = hashlib.sha1()
+        for path in sorted((self.root / 'data').rglob('*.json')):
+            stat = path.stat()
+            stats.update(f"{path} {stat.st_size} {stat.st_mtime_ns}\n".encode())
+        return stats.hexdigest()
+
+    def get_file(self, filepath, points_database="AMG"):
+        key = self.key(filepath, points_database)
+        try:
+            body = (self.root / filepath).read_bytes()
+        except OSError as error:
+            raise DataSourceError(f"Couldn't read {filepath}: {error}")
+        self.file_cache.store(key, body)
+        return filepath, self.file_cache.digest(key)
+
+
+class SnapshotDataSource(DataSource):
+    """
+    Reads nothing but the snapshots another process has published to store,
+    so a whole dataset is only downloaded and parsed once per machine.
+    """
+    check_frequency = 60  # Only a local file to look at
+
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def get_version(self, points_database="AMG"):
+        return self.store.published(points_database)
+
+    def get_file(self, filepath, points_database="AMG"):
+        raise DataSourceError(
+            f"No published {points_database} snapshot to read {filepath} from.")
+
+
+def make_data_source(spec, users, branch='master', version_users=None, file_cache=None,
+                     watcher=None):
+    """
+    "http" or "archive" for the GitHub sources, anything else is taken as the
+    path of a local xwing-data2 checkout.
+    """
+    if spec == 'http':
+        return HttpDataSource(users, branch, version_users, file_cache, watcher)
+    if spec == 'archive':
+        return ArchiveDataSource(users, branch, version_users, file_cache, watcher)
+    return LocalDataSource(spec, file_cache)
@@ -15,6 +15,8 @@ from r2d7.meta import Metawing
 from r2d7.roller import Roller
 from r2d7.talkback import Talkback
 from r2d7.discorddroid import DiscordDroid
+from r2d7.refresher import DataRefresher
+from r2d7.webhook import start_webhook
 
 logger = logging.getLogger(__name__)
 load_dotenv()
@@ -85,31 +87,27 @@ class DiscordClient(commands.Bot):
 
         bot_has_message_permissions = message.guild and message.channel.permissions_for(message.guild.me).manage_messages
 
-        # Check for new data
-        if self.droid.needs_update():
-            self.droid.load_data()
-
-        if self.droid.needs_update(points_database="XWA"):
-            self.droid.load_data("XWA")
-
         responses = None
 
-        if not message.guild:
-            for regex, handle_method in self.droid._dm_handlers.items():
-                match = regex.search(message.clean_content)
-                if match:
-                    responses = handle_method(match[1])
-                    if responses:
-                        break
-
-        if not responses:
-            for regex, handle_method in self.droid._handlers.items():
-                logger.debug(f"Checking {regex}")
-                match = regex.search(message.clean_content)
-                if match:
-                    responses = handle_method(match[1])
-                    if responses:
-                        break
+        # New data is loaded in the background, make sure this message is
+        # answered from a single version of it
+        with self.droid.pinned_generation():
+            if not message.guild:
+                for regex, handle_method in self.droid._dm_handlers.items():
+                    match = regex.search(message.clean_content)
+                    if match:
+                        responses = handle_method(match[1])
+                        if responses:
+                            break
+
+            if not responses:
+                for regex, handle_method in self.droid._handlers.items():
+                    logger.debug(f"Checking {regex}")
+                    match = regex.search(message.clean_content)
+                    if match:
+                        responses = handle_method(match[1])
+                        if responses:
+                            break
 
         if responses:
             # If there are multiple matches, allow the user to select one, up to 9 matches.
@@ -190,11 +188,16 @@ class DiscordClient(commands.Bot):
 
 
 
-def main():
+def main(published=False):
+    """
+    Run the Discord bot. If published is set, attach to the data published
+    by the r2d7.bots supervisor instead of loading it.
+    """
     debug = os.getenv('DEBUG', False)
     log_level = 'DEBUG' if debug else 'INFO'
     logging.basicConfig(
         format='%(asctime)s [%(process)d] Discord - %(levelname)s: %(message)s',
+        force=True,
         level=log_level
     )
 
@@ -202,7 +205,13 @@ def main():
     # discord_token = os.getenv("DEV_TOKEN", None)
     logging.info(f"discord token: {discord_token}")
 
+    if published:
+        Droid.use_published_data()
     droid = Droid()
+    refresher = DataRefresher(droid, points_databases=("AMG", "XWA"))
+    refresher.start()
+    if not published:
+        start_webhook(refresher)
     if discord_token:
         logging.info("DISCORD_TOKEN env var set")
         bot = DiscordClient(droid)
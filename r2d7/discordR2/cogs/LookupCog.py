@@ -131,6 +131,11 @@ class SelectCard(discord.ui.View):
         await interaction.response.edit_message(embeds=self.embeds, view=None)
 
 
+async def complete_card(ctx: discord.AutocompleteContext):
+    # Discord allows 100 characters per suggestion
+    return [name[:100] for name in ctx.bot.droid.complete(ctx.value or '')]
+
+
 class LookupCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -139,24 +144,26 @@ class LookupCog(commands.Cog):
     @commands.slash_command(
         description="Look up a card"
     )
-    async def card(self, ctx: discord.ApplicationContext, query):
+    async def card(
+        self,
+        ctx: discord.ApplicationContext,
+        query: discord.Option(str, "Card name", autocomplete=complete_card),
+    ):
         results = None
-        if self.bot.droid.needs_update():
-            self.bot.droid.load_data()
-
-        if not ctx.guild:
-            for regex, handle_method in self.bot.droid._dm_handlers.items():
-                if match := regex.search(f"[[{query}]]"):
-                    results = handle_method(match[1])
-                    if results:
-                        break
-
-        if not results:
-            for regex, handle_method in self.bot.droid._handlers.items():
-                if match := regex.search(f"[[{query}]]"):
-                    results = handle_method(match[1])
-                    if results:
-                        break
+        with self.bot.droid.pinned_generation():
+            if not ctx.guild:
+                for regex, handle_method in self.bot.droid._dm_handlers.items():
+                    if match := regex.search(f"[[{query}]]"):
+                        results = handle_method(match[1])
+                        if results:
+                            break
+
+            if not results:
+                for regex, handle_method in self.bot.droid._handlers.items():
+                    if match := regex.search(f"[[{query}]]"):
+                        results = handle_method(match[1])
+                        if results:
+                            break
         if not results:
             await ctx.respond("No cards found matching your query.", ephemeral=True)
             return
@@ -0,0 +1,159 @@
+from collections import namedtuple
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CachedFile = namedtuple('CachedFile', 'etag last_modified digest')
+
+
+class FileCache():
+    """
+    Remembers the validators (ETag, Last-Modified and a content hash) of
+    every data file fetched, so reloads can make conditional requests and
+    reuse what they already have when a file hasn't changed.
+
+    Only those are kept in memory. The bodies are written to a directory
+    beside the cache file, named by their hash, and read back and parsed
+    whenever a copy is wanted (the loader mutates what it's given). Without
+    a path there's nowhere else to keep them, so they stay in memory.
+    Nothing is pickled, so the files can't carry code.
+    """
+    keep_unused = 24 * 3600  # Seconds a body no file has any more is kept
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.bodies = self.path.parent / 'files' if self.path else None
+        self._files = {}
+        self._bodies = {}  # By digest, when there's no path
+        self._lock = threading.Lock()
+        if self.path:
+            self._read()
+
+    def _read(self):
+        try:
+            with open(self.path) as cache:
+                self._files = {
+                    url: CachedFile(cached['etag'], cached['last_modified'], cached['digest'])
+                    for url, cached in json.load(cache).items()
+                }
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+            logger.warning(f"Ignoring unreadable file cache {self.path}: {error}")
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w') as tmp, self._lock:
+                json.dump({url: cached._asdict() for url, cached in self._files.items()}, tmp)
+                used = {cached.digest for cached in self._files.values()}
+            os.replace(tmp_name, self.path)
+        except OSError as error:
+            logger.warning(f"Couldn't write file cache {self.path}: {error}")
+            return
+        self._prune(used)
+
+    def _prune(self, used):
+        """
+        Delete the bodies no file has had for a while. Other processes may
+        share the directory, so recently written ones are left alone.
+        """
+        now = time.time()
+        for body in self.bodies.glob('*.json'):
+            try:
+                if body.stem not in used and now - body.stat().st_mtime > self.keep_unused:
+                    body.unlink()
+            except OSError:  # Pruned by another process
+                continue
+
+    def _body_path(self, digest):
+        return self.bodies / f"{digest}.json"
+
+    def _has_body(self, digest):
+        if self.bodies is None:
+            return digest in self._bodies
+        return self._body_path(digest).exists()
+
+    def __contains__(self, url):
+        cached = self._files.get(url)
+        return cached is not None and self._has_body(cached.digest)
+
+    def headers(self, url):
+        """
+        Conditional request headers for url, empty if we've never seen it
+        (or have lost its body).
+        """
+        headers = {}
+        if url in self:
+            cached = self._files[url]
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+        return headers
+
+    def digest(self, url):
+        return self._files[url].digest
+
+    def get(self, url):
+        """
+        A fresh copy of the parsed JSON last seen for url.
+        """
+        digest = self._files[url].digest
+        if self.bodies is None:
+            return json.loads(self._bodies[digest])
+        try:
+            return json.loads(self._body_path(digest).read_bytes())
+        except FileNotFoundError:
+            raise KeyError(url)
+
+    def update(self, url, response):
+        """
+        Record a 200 or 304 response for url.
+        """
+        if response.status_code == 304 and url in self:
+            logger.debug(f"{url} not modified")
+            return
+        self.store(
+            url,
+            response.content,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+        )
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """
+        Record the body of url.
+        """
+        digest = hashlib.sha1(body).hexdigest()
+        if self.bodies is not None and not self._body_path(digest).exists():
+            self._write_body(digest, body)
+        with self._lock:
+            previous = self._files.get(url)
+            self._files[url] = CachedFile(etag=etag, last_modified=last_modified, digest=digest)
+            if self.bodies is None:
+                self._bodies[digest] = body
+                if previous and previous.digest != digest and not any(
+                        cached.digest == previous.digest for cached in self._files.values()):
+                    del self._bodies[previous.digest]
+
+    def _write_body(self, digest, body):
+        try:
+            self.bodies.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # Write then rename, so another process never sees half a body
+            fd, tmp_name = tempfile.mkstemp(dir=self.bodies, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(body)
+            os.replace(tmp_name, self._body_path(digest))
+        except OSError as error:
+            logger.warning(f"Couldn't write {self._body_path(digest)}: {error}")
@@ -0,0 +1,95 @@
+from collections import namedtuple
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+HostStats = namedtuple('HostStats', 'requests errors mean max')
+
+
+class HttpClient():
+    """
+    One place for every outbound HTTP call, so they all share keep-alive
+    connection pools (one per host), default timeouts and a limit on how many
+    requests are in flight at once. Keeps per-host latency counters too.
+    """
+    timeout = (5, 30)  # Seconds to connect, and to wait for a response
+    max_connections = 16  # Kept alive per host
+    max_concurrency = 16
+
+    def __init__(self, timeout=None, max_connections=None, max_concurrency=None):
+        self.timeout = timeout or self.timeout
+        self.max_connections = max_connections or self.max_connections
+        self.max_concurrency = max_concurrency or self.max_concurrency
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._session = None
+        self._stats = {}
+
+    @property
+    def session(self):
+        if self._session is None:
+            session = requests.Session()
+            # A pool is kept for each host, pool_connections is just how many
+            # hosts' pools are cached
+            adapter = HTTPAdapter(pool_connections=8,
+                                  pool_maxsize=self.max_connections)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+        with self._slots:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException:
+                self._record(host, time.perf_counter() - start, error=True)
+                raise
+        self._record(host, time.perf_counter() - start,
+                     error=response.status_code >= 500)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _record(self, host, elapsed, error=False):
+        with self._lock:
+            count, errors, total, longest = self._stats.get(host, (0, 0, 0.0, 0.0))
+            self._stats[host] = (
+                count + 1,
+                errors + error,
+                total + elapsed,
+                max(longest, elapsed),
+            )
+
+    def stats(self):
+        """
+        A HostStats (request and error counts, mean and max seconds) for each
+        host requested so far.
+        """
+        with self._lock:
+            return {
+                host: HostStats(count, errors, total / count, longest)
+                for host, (count, errors, total, longest) in self._stats.items()
+            }
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+# Shared by everything in the project
+http = HttpClient()
@@ -4,9 +4,9 @@ import re
 import json
 from enum import Enum
 
-import requests
 
 from r2d7.core import DroidCore, DroidException
+from r2d7.httpclient import http
 
 logger = logging.getLogger(__name__)
 
@@ -71,7 +71,7 @@ class ListFormatter(DroidCore):
         if xws_url:
             xws_url = unescape(xws_url)
             logging.info(f"Requesting {xws_url}")
-            response = requests.get(xws_url)
+            response = http.get(xws_url)
             if response.status_code != 200:
                 raise DroidException(
                     f"Got {response.status_code} GETing {xws_url}")
@@ -80,7 +80,7 @@ class ListFormatter(DroidCore):
                 raise DroidException(f"YASB error: ({data['message']}")
             return data
 
-    def get_pilot_cards(self, pilot):
+    def get_pilot_cards(self, pilot, points_database="AMG"):
         cards = []
         if 'upgrades' in pilot:
             for slot, upgrades in pilot['upgrades'].items():
@@ -89,7 +89,8 @@ class ListFormatter(DroidCore):
                     continue
                 for upgrade in upgrades:
                     try:
-                        cards.append(self.data['upgrade'][upgrade])
+                        cards.append(self.with_points(
+                            self.data['upgrade'][upgrade], points_database))
                     except KeyError:
                         cards.append(None)
         return cards
@@ -113,7 +114,17 @@ class ListFormatter(DroidCore):
             )
         return cost['values'][str(stat)]
 
-    def print_xws(self, xws, url=None):
+    def xws_points_database(self, xws):
+        """
+        The points database a list was built for: the one named by its
+        ruleset if we have it, AMG otherwise.
+        """
+        ruleset = str(xws.get('ruleset', '')).upper()
+        return ruleset if ruleset in self.points_overlays else "AMG"
+
+    def print_xws(self, xws, url=None, points_database=None):
+        if points_database is None:
+            points_database = self.xws_points_database(xws)
         name = xws.get('name', 'Nameless Squadron')
         if 'vendor' in xws:
             if len(list(xws['vendor'].keys())) > 1:
@@ -136,7 +147,8 @@ class ListFormatter(DroidCore):
             except KeyError:
                 pilot_name = pilot['name']
             try:
-                pilot_card = self.data['pilot'][pilot_name]
+                pilot_card = self.with_points(
+                    self.data['pilot'][pilot_name], points_database)
             except KeyError:
                 # Unrecognised pilot
                 output.append(self.iconify('question') * 2 + ' ' +
@@ -150,7 +162,7 @@ class ListFormatter(DroidCore):
             legality.update(pilot_card.get('standard', False), pilot_card.get('extended', False),
                             epic=pilot_card.get('epic', False))
 
-            cards = self.get_pilot_cards(pilot)
+            cards = self.get_pilot_cards(pilot, points_database)
             upgrades = []
             for upgrade in cards:
                 if upgrade is None:
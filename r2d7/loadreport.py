@@ -0,0 +1,103 @@
+from collections import namedtuple
+from contextlib import contextmanager
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent fetching, parsing and adding the cards of a data file
+FileTiming = namedtuple('FileTiming', 'fetch parse ingest')
+
+
+class LoadReport():
+    """
+    Where the time went in one data load: how long each phase took, in the
+    order they ran, counters of what was done, and the FileTiming of each
+    data file loaded.
+
+    Work carried on in the background for a load holds its report, so it
+    isn't finished and logged until that's been recorded too.
+    """
+    def __init__(self, points_database):
+        self.points_database = points_database
+        self.version = None
+        self.started = time.time()
+        self.total = None  # Seconds, once the load is finished
+        self.phases = {}
+        self.counts = {}
+        self.files = {}
+        self._lock = threading.Lock()
+        self._held = 0
+        self._finishing = False
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def hold(self):
+        """
+        Keep the report open until a matching release().
+        """
+        with self._lock:
+            self._held += 1
+
+    def release(self):
+        with self._lock:
+            self._held -= 1
+            done = self._finishing and not self._held
+        if done:
+            self._done()
+
+    def finish(self, version):
+        """
+        The load of version is done: log the report, now or once the last
+        hold on it is released.
+        """
+        with self._lock:
+            self.version = version
+            self._finishing = True
+            done = not self._held
+        if done:
+            self._done()
+
+    def _done(self):
+        self.total = time.time() - self.started
+        self.log()
+
+    def as_dict(self, slowest=3):
+        report = {
+            'points_database': self.points_database,
+            'version': self.version,
+            'started': round(self.started, 3),
+            'total': None if self.total is None else round(self.total, 4),
+            'phases': {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            'counts': dict(self.counts),
+        }
+        if self.files:
+            fetch, parse, ingest = (sum(column) for column in zip(*self.files.values()))
+            worst = sorted(self.files, key=lambda filepath: -sum(self.files[filepath]))
+            report['files'] = {
+                'fetch': round(fetch, 4),
+                'parse': round(parse, 4),
+                'ingest': round(ingest, 4),
+                'slowest': {filepath: round(sum(self.files[filepath]), 4)
+                            for filepath in worst[:slowest]},
+            }
+        return report
+
+    def log(self):
+        for filepath, timing in self.files.items():
+            logger.debug(
+                f"{filepath}: fetched in {timing.fetch * 1000:.1f}ms, parsed in "
+                f"{timing.parse * 1000:.1f}ms, added in {timing.ingest * 1000:.1f}ms")
+        # One line of JSON, to be picked out of the logs and compared
+        logger.info(f"Load report: {json.dumps(self.as_dict())}")
@@ -1,8 +1,8 @@
 from enum import Enum
 import logging
 import re
-import requests
 from r2d7.core import DroidCore
+from r2d7.httpclient import http
 
 logger = logging.getLogger(__name__)
 
@@ -67,7 +67,7 @@ class Metawing(DroidCore):
     def query_and_print(self, url, printer, num_to_print=5):
         url = url + self._json_suffix
         try:
-            result = requests.get(url)
+            result = http.get(url)
             if not result.ok:
                 logger.debug(f'Failed to get: {url}')
                 return [[self._query_error]]
@@ -0,0 +1,53 @@
+from r2d7.cardmodel import Compactor
+
+
+class PointsOverlay():
+    """
+    The points of an alternative points database, as only the fields of each
+    card that differ from those of the base catalogue. Cards are keyed by
+    category and xws, so an overlay still applies to the same cards after an
+    incremental reload of the base.
+    """
+    FIELDS = ('cost', 'loadout', 'standard', 'extended', 'wildspace', 'epic')
+
+    def __init__(self, deltas=None):
+        # (category, xws) -> {field: value}, None for a field the card
+        # doesn't have in this database
+        self.deltas = deltas or {}
+
+    @classmethod
+    def build(cls, base, data):
+        """
+        The overlay that turns the pilots and upgrades of base into those of
+        data. Cards only data has are left out, since there's nothing to
+        overlay them on.
+        """
+        compact = Compactor()
+        deltas = {}
+        for category in ('pilot', 'upgrade'):
+            base_cards = base.get(category, {})
+            for xws, card in data.get(category, {}).items():
+                base_card = base_cards.get(xws)
+                if base_card is None:
+                    continue
+                delta = {field: card.get(field) for field in cls.FIELDS
+                         if card.get(field) != base_card.get(field)}
+                if delta:
+                    deltas[base_card['category'], xws] = compact(delta)
+        return cls(deltas)
+
+    def apply(self, card):
+        """
+        card with the points of this database. Cards with no changes are
+        returned as they are, others as a new dict.
+        """
+        delta = self.deltas.get((card['category'], card['xws']))
+        if delta is None:
+            return card
+        overlaid = {key: value for key, value in card.items() if key not in delta}
+        overlaid.update(
+            (field, value) for field, value in delta.items() if value is not None)
+        return overlaid
+
+    def __len__(self):
+        return len(self.deltas)
@@ -0,0 +1,134 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import logging
+import sys
+import threading
+import time
+
+from r2d7.core import DataChanges, DataGeneration, process_context
+from r2d7.loadreport import LoadReport
+
+logger = logging.getLogger(__name__)
+
+# What a pool worker renders with, set up as it starts
+_renderer = None
+
+
+@contextmanager
+def _pinned(droid, generation):
+    """
+    Have this thread's reads of droid come from generation.
+    """
+    droid._pinned.generation = generation
+    try:
+        yield
+    finally:
+        droid._pinned.generation = None
+
+
+def _start_renderer(droid_class, points_database, version, data):
+    """
+    Set a pool worker up with a droid of droid_class holding the generation
+    of points_database with data, indexed as a load would.
+    """
+    global _renderer
+    droid = droid_class(load=False)
+    generation = DataGeneration(points_database, version, data, {})
+    generation.report = LoadReport(points_database)
+    changes = DataChanges(added=list(droid.all_cards(data)), removed=[], full=True)
+    droid._init_generation(generation, None, changes)
+    droid._generations[points_database] = generation
+    cards = {card['_id']: card for card in droid.all_cards(data)}
+    _renderer = (droid, generation, cards)
+
+
+def _render_cards(card_ids):
+    droid, generation, cards = _renderer
+    with _pinned(droid, generation):
+        return [(card_id, droid._frozen_card(cards[card_id], generation.points_database))
+                for card_id in card_ids]
+
+
+def rendered_size(rendered, seen=None):
+    """
+    Bytes taken by rendered output, counting what's shared once.
+    """
+    if seen is None:
+        seen = set()
+    if id(rendered) in seen:
+        return 0
+    seen.add(id(rendered))
+    size = sys.getsizeof(rendered)
+    if isinstance(rendered, dict):
+        size += sum(rendered_size(key, seen) + rendered_size(value, seen)
+                    for key, value in rendered.items())
+    elif isinstance(rendered, tuple):
+        size += sum(rendered_size(item, seen) for item in rendered)
+    return size
+
+
+class Prerenderer(threading.Thread):
+    """
+    Renders every card of a freshly loaded generation into its print_card
+    cache in the background, over a pool of worker processes, so lookups
+    only ever fetch. Until a card's turn comes it's rendered when it's first
+    looked up, as usual.
+
+    This process has threads running, so the workers aren't forked from it:
+    they're started from a fresh interpreter (by a fork server where there
+    is one), sent the cards and index them for themselves. The generation's
+    load report is held until the pre-rendering is recorded on it.
+    """
+    chunk_size = 50  # Cards sent to a worker at a time
+
+    def __init__(self, droid, generation, workers):
+        super().__init__(name='prerender', daemon=True)
+        self.droid = droid
+        self.generation = generation
+        self.workers = workers
+        generation.report.hold()
+
+    def superseded(self):
+        current = self.droid._generations.get(self.generation.points_database)
+        return current is not None and current.number > self.generation.number
+
+    def _render(self, cache):
+        generation = self.generation
+        card_ids = [card['_id'] for card in self.droid.all_cards(generation.data)]
+        chunks = [card_ids[i:i + self.chunk_size]
+                  for i in range(0, len(card_ids), self.chunk_size)]
+        with ProcessPoolExecutor(
+            self.workers,
+            mp_context=process_context(),
+            initializer=_start_renderer,
+            initargs=(type(self.droid), generation.points_database,
+                      generation.version, generation.data),
+        ) as pool:
+            futures = [pool.submit(_render_cards, chunk) for chunk in chunks]
+            for future in futures:
+                if self.superseded():
+                    # Drop what hasn't started, the pool waits for the rest
+                    for waiting in futures:
+                        waiting.cancel()
+                    return
+                cache.update(future.result())
+
+    def run(self):
+        generation = self.generation
+        report = generation.report
+        cache = generation.rendered.setdefault((generation.points_database, None), {})
+        start = time.perf_counter()
+        try:
+            with report.phase('prerender'):
+                self._render(cache)
+            size = rendered_size(cache)
+            report.count('cards prerendered', len(cache))
+            report.count('prerendered bytes', size)
+            logger.info(
+                f"Pre-rendered {len(cache)} cards of {generation.points_database} "
+                f"{generation.version} in {time.perf_counter() - start:.2f}s, "
+                f"taking {size / 2**20:.1f}MB")
+        except Exception:
+            logger.exception("Couldn't pre-render cards, they'll be rendered as they're looked up")
+        finally:
+            report.release()
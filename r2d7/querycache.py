@@ -0,0 +1,62 @@
+from collections import OrderedDict, namedtuple
+import threading
+import time
+
+CacheStats = namedtuple('CacheStats', 'size hits misses evictions expirations hit_rate')
+
+
+class QueryCache():
+    """
+    A bounded cache of lookup results. When it's full the least recently used
+    entry goes, and entries older than ttl seconds count as missing. Keeps
+    counts of hits, misses, evictions and expirations. A size of 0 keeps
+    nothing.
+    """
+    size = 1000
+    ttl = 3600  # Seconds
+
+    def __init__(self, size=None, ttl=None, clock=time.monotonic):
+        self.size = self.size if size is None else size
+        self.ttl = self.ttl if ttl is None else ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = self._misses = self._evictions = self._expirations = 0
+
+    def get(self, key):
+        """
+        The value kept for key, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if not self.size:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return CacheStats(
+                len(self._entries), self._hits, self._misses, self._evictions,
+                self._expirations, self._hits / lookups if lookups else None)
@@ -0,0 +1,58 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class DataRefresher(threading.Thread):
+    """
+    Checks for new data on its own schedule and loads it in the background,
+    so no message ever has to wait on a version check or a reload. New data
+    is swapped in by the droid once it's completely built.
+
+    Given a SnapshotStore as publish_to, each version loaded is published
+    there for other processes to use. trigger() makes it check straight away,
+    for when something (like a webhook) says there's new data.
+    """
+    def __init__(self, droid, points_databases=("AMG",), interval=None, publish_to=None):
+        super().__init__(name='data-refresher', daemon=True)
+        self.droid = droid
+        self.points_databases = points_databases
+        self.interval = interval or droid.check_frequency
+        self.publish_to = publish_to
+        self._halt = threading.Event()
+        self._wake = threading.Event()
+
+    def run(self):
+        logger.info(f"Checking for new {', '.join(self.points_databases)} data "
+                    f"every {self.interval} seconds")
+        # Catch up first, the data may have been loaded from an old snapshot
+        self.refresh()
+        while True:
+            self._wake.wait(self.interval)
+            if self._halt.is_set():
+                break
+            triggered = self._wake.is_set()
+            self._wake.clear()
+            self.refresh(recheck=triggered)
+
+    def refresh(self, recheck=False):
+        for points_database in self.points_databases:
+            try:
+                if self.droid.needs_update(points_database, recheck=recheck):
+                    logger.info(f"Loading new {points_database} data")
+                    self.droid.load_data(points_database)
+                    if self.publish_to:
+                        self.publish_to.publish(
+                            points_database,
+                            self.droid.current_generation(points_database).version)
+            except Exception:
+                # Keep serving the data we have and try again next time
+                logger.exception(f"Failed to refresh {points_database} data")
+
+    def trigger(self):
+        self._wake.set()
+
+    def stop(self):
+        self._halt.set()
+        self._wake.set()
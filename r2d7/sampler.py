@@ -0,0 +1,38 @@
+import random
+
+
+class WeightedSampler():
+    """
+    Draws items in proportion to their (whole number) weights in constant
+    time, with Vose's alias method: the weights are spread evenly over one
+    column per item, each holding some of its own item and the rest of one
+    other, so a draw is picking a column and then one of its two.
+    """
+    def __init__(self, weighted):
+        weighted = [(item, weight) for item, weight in weighted if weight > 0]
+        if not weighted:
+            raise ValueError("Nothing to draw from")
+        self.items = [item for item, _ in weighted]
+        count = len(weighted)
+        self._total = sum(weight for _, weight in weighted)
+        # Out of _total, how much of each column is its own item
+        scaled = [weight * count for _, weight in weighted]
+        self._own = [self._total] * count
+        self._alias = list(range(count))
+        small = [column for column, weight in enumerate(scaled) if weight < self._total]
+        large = [column for column, weight in enumerate(scaled) if weight >= self._total]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._own[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] -= self._total - scaled[less]
+            (small if scaled[more] < self._total else large).append(more)
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw(self, rng=random):
+        column = rng.randrange(len(self.items))
+        if rng.randrange(self._total) < self._own[column]:
+            return self.items[column]
+        return self.items[self._alias[column]]
@@ -0,0 +1,454 @@
+from bisect import bisect_left, bisect_right, insort
+import copy
+import re
+
+_word = re.compile(r'\w+')
+
+
+class WordIndex():
+    """
+    An inverted index of the words in card names, for finding the names with
+    a word that starts with a given prefix without looking at all of them.
+
+    keys are the lookup keys in order, each with the names of its cards.
+    Results come back in that order. The words are kept in a FuzzyIndex too,
+    for correcting a misspelt one. updated() makes a copy with some keys
+    taken out or refiled under new names, and others added.
+    """
+    def __init__(self, keys):
+        self.keys = []
+        self._positions = {}
+        postings = {}
+        for position, (key, names) in enumerate(keys):
+            self.keys.append(key)
+            self._positions[key] = position
+            for name in names:
+                for word in self.words(name):
+                    positions = postings.setdefault(word, [])
+                    if not positions or positions[-1] != position:
+                        positions.append(position)
+        self._postings = postings
+        self._words = sorted(postings)
+        self._fuzzy = FuzzyIndex((word, word) for word in self._words)
+
+    @staticmethod
+    def words(name):
+        return _word.findall(name.lower())
+
+    def updated(self, removed, added):
+        """
+        A copy without the (key, names) removed and with those added. A key
+        both removed and added keeps its place, new ones come after the
+        rest. Only the postings of their words are copied, the rest are
+        shared with this index, which is left as it is. With nothing to
+        change, this index is returned.
+        """
+        removed, added = list(removed), list(added)
+        if not removed and not added:
+            return self
+        index = copy.copy(self)
+        index.keys = list(self.keys)
+        index._positions = dict(self._positions)
+        postings = index._postings = dict(self._postings)
+        words = index._words = list(self._words)
+        dropped, created = [], []
+        kept = {key for key, _ in added}
+        for key, names in removed:
+            position = index._positions.get(key)
+            if position is None:
+                continue
+            for word in {word for name in names for word in self.words(name)}:
+                positions = [other for other in postings.get(word, ()) if other != position]
+                if positions:
+                    postings[word] = positions
+                elif word in postings:
+                    del postings[word]
+                    del words[bisect_left(words, word)]
+                    dropped.append(word)
+            if key not in kept:
+                # Left as a gap, so the positions after it stay put
+                index.keys[position] = None
+                del index._positions[key]
+        for key, names in added:
+            if key not in index._positions:
+                index._positions[key] = len(index.keys)
+                index.keys.append(key)
+            position = index._positions[key]
+            for word in {word for name in names for word in self.words(name)}:
+                if word not in postings:
+                    insort(words, word)
+                    created.append(word)
+                positions = list(postings.get(word, ()))
+                if position not in positions:
+                    insort(positions, position)
+                postings[word] = positions
+        # Words dropped and created again stay as they were
+        index._fuzzy = self._fuzzy.updated(
+            [(word, word) for word in dropped if word not in postings],
+            [(word, word) for word in created if word not in self._postings])
+        return index
+
+    def prefixed(self, prefix):
+        """
+        Keys of the names with a word starting with prefix.
+        """
+        positions = set()
+        i = bisect_left(self._words, prefix)
+        while i < len(self._words) and self._words[i].startswith(prefix):
+            positions.update(self._postings[self._words[i]])
+            i += 1
+        return [self.keys[position] for position in sorted(positions)]
+
+    def closest(self, word):
+        """
+        Keys of the names with a word fewest edits away from word, as
+        FuzzyIndex.closest measures it.
+        """
+        positions = set()
+        for closest in self._fuzzy.closest(word):
+            positions.update(self._postings[closest])
+        return [self.keys[position] for position in sorted(positions)]
+
+
+class PrefixIndex():
+    """
+    Terms in sorted order, for finding the ones starting with a prefix by
+    bisecting, as autocomplete does on every keystroke.
+
+    terms are (term, key) pairs. Results are the keys of the shortest terms
+    first, each once. updated() makes a copy with some terms taken out and
+    others added.
+    """
+    def __init__(self, terms):
+        self._terms = sorted(terms)
+
+    def updated(self, removed, added):
+        """
+        A copy without the (term, key) pairs removed and with those added,
+        leaving this index as it is. With nothing to change, this index is
+        returned.
+        """
+        removed, added = list(removed), list(added)
+        if not removed and not added:
+            return self
+        index = copy.copy(self)
+        terms = index._terms = list(self._terms)
+        for term in removed:
+            i = bisect_left(terms, term)
+            if i < len(terms) and terms[i] == term:
+                del terms[i]
+        for term in added:
+            insort(terms, term)
+        return index
+
+    def prefixed(self, prefix, limit=None):
+        """
+        Keys of the terms starting with prefix, at most limit of them.
+        """
+        start = bisect_left(self._terms, (prefix,))
+        end = start
+        while end < len(self._terms) and self._terms[end][0].startswith(prefix):
+            end += 1
+        keys, seen = [], set()
+        for _, key in sorted(self._terms[start:end], key=lambda term: (len(term[0]), term)):
+            if key not in seen:
+                seen.add(key)
+                keys.append(key)
+                if len(keys) == limit:
+                    break
+        return keys
+
+
+class TrigramIndex():
+    """
+    An index of the three character sequences in lookup keys, for finding the
+    keys containing a string of three or more characters: the keys holding
+    all of its trigrams are found by intersecting their posting sets, and
+    only those are checked. updated() makes a copy with some keys taken out
+    and others added.
+    """
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self._positions = {}
+        postings = {}
+        for position, key in enumerate(self.keys):
+            self._positions[key] = position
+            for trigram in self.trigrams(key):
+                postings.setdefault(trigram, set()).add(position)
+        self._postings = postings
+
+    def updated(self, removed, added):
+        """
+        A copy without the keys removed and with those added, which come
+        after the rest. Only the sets of their trigrams are copied, the rest
+        are shared with this index, which is left as it is. With nothing to
+        change, this index is returned.
+        """
+        removed, added = list(removed), list(added)
+        if not removed and not added:
+            return self
+        index = copy.copy(self)
+        index.keys = list(self.keys)
+        index._positions = dict(self._positions)
+        postings = index._postings = dict(self._postings)
+        for key in removed:
+            position = index._positions.pop(key, None)
+            if position is None:
+                continue
+            # Left as a gap, so the positions after it stay put
+            index.keys[position] = None
+            for trigram in self.trigrams(key):
+                positions = postings[trigram] - {position}
+                if positions:
+                    postings[trigram] = positions
+                else:
+                    del postings[trigram]
+        for key in added:
+            if key in index._positions:
+                continue
+            position = index._positions[key] = len(index.keys)
+            index.keys.append(key)
+            for trigram in self.trigrams(key):
+                postings[trigram] = postings.get(trigram, set()) | {position}
+        return index
+
+    @staticmethod
+    def trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def containing(self, text):
+        """
+        Keys containing text, or None if it's too short to look up.
+        """
+        if len(text) < 3:
+            return None
+        postings = sorted(
+            (self._postings.get(trigram, ()) for trigram in self.trigrams(text)), key=len)
+        positions = set(postings[0])
+        for posting in postings[1:]:
+            if not positions:
+                break
+            positions &= posting
+        return [self.keys[position] for position in sorted(positions)
+                if text in self.keys[position]]
+
+
+def edit_distance(a, b, limit):
+    """
+    The number of single character insertions, deletions, substitutions and
+    swaps of neighbours it takes to turn a into b, or limit + 1 if it's more
+    than limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # What they start and end with alike costs nothing
+    start = 0
+    while start < min(len(a), len(b)) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < min(len(a), len(b)) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyIndex():
+    """
+    A deletion dictionary, as used by SymSpell, for finding the terms closest
+    to a misspelt one. Each term is filed under every string left by deleting
+    up to max_distance characters from its start, so any term within
+    max_distance edits of a lookup shares one of those strings with it, and
+    only the terms sharing one are measured.
+
+    terms are (term, key) pairs, and lookups return keys in that order.
+    updated() makes a copy with some terms taken out and others added, for
+    when only a few have changed.
+    """
+    prefix_length = 10  # Longer terms are filed by their start alone
+    max_distance = 2
+
+    def __init__(self, terms):
+        self.keys = []
+        self._positions = {}
+        deletes = {}
+        for position, (term, key) in enumerate(terms):
+            self.keys.append((term, key))
+            self._positions[term, key] = position
+            for variant in self._variants(term[:self.prefix_length], self.max_distance):
+                deletes.setdefault(variant, set()).add(position)
+        self._deletes = deletes
+
+    def updated(self, removed, added):
+        """
+        A copy without the (term, key) pairs removed and with those added,
+        which come after the rest. Only the sets of the variants of those
+        terms are copied, the rest are shared with this index, which is left
+        as it is. With nothing to change, this index is returned.
+        """
+        removed, added = list(removed), list(added)
+        if not removed and not added:
+            return self
+        index = copy.copy(self)
+        index.keys = list(self.keys)
+        index._positions = dict(self._positions)
+        deletes = index._deletes = dict(self._deletes)
+        for term, key in removed:
+            position = index._positions.pop((term, key), None)
+            if position is None:
+                continue
+            # Left as a gap, so the positions after it stay put
+            index.keys[position] = None
+            for variant in self._variants(term[:self.prefix_length], self.max_distance):
+                positions = deletes[variant] - {position}
+                if positions:
+                    deletes[variant] = positions
+                else:
+                    del deletes[variant]
+        for term, key in added:
+            if (term, key) in index._positions:
+                continue
+            position = index._positions[term, key] = len(index.keys)
+            index.keys.append((term, key))
+            for variant in self._variants(term[:self.prefix_length], self.max_distance):
+                deletes[variant] = deletes.get(variant, set()) | {position}
+        return index
+
+    @staticmethod
+    def _variants(text, distance):
+        variants = {text}
+        edge = {text}
+        for _ in range(distance):
+            edge = {
+                variant[:i] + variant[i + 1:]
+                for variant in edge for i in range(len(variant))
+            } - variants
+            variants |= edge
+        return variants
+
+    def closest(self, text):
+        """
+        Keys of the terms fewest edits away from text. Short texts allow
+        fewer edits: one from four characters and two from eight.
+        """
+        limit = min(self.max_distance, len(text) // 4)
+        if not limit:
+            return []
+        positions = set()
+        for variant in self._variants(text[:self.prefix_length], limit):
+            positions.update(self._deletes.get(variant, ()))
+        best, keys = limit + 1, []
+        for position in sorted(positions):
+            term, key = self.keys[position]
+            distance = edit_distance(text, term, limit)
+            if distance < best:
+                best, keys = distance, []
+            if distance == best and key not in keys:
+                keys.append(key)
+        return keys if best <= limit else []
+
+
+class RangeIndex():
+    """
+    Lookup keys by the facet of their cards (what a slot filter names them
+    by) and a numeric field of them, sorted by value so the keys with a
+    value in a range are found by bisecting rather than looking at them all.
+
+    entries are (facet, field, value, key) tuples, and results come back in
+    the order their keys first appear. updated() makes a copy with some
+    entries taken out and others added.
+    """
+    def __init__(self, entries):
+        self.keys = []
+        positions = self._key_positions = {}
+        columns = {}
+        for facet, field, value, key in entries:
+            if key not in positions:
+                positions[key] = len(self.keys)
+                self.keys.append(key)
+            columns.setdefault((facet, field), []).append((value, positions[key]))
+        self._values = {}
+        self._positions = {}
+        for column, pairs in columns.items():
+            pairs.sort()
+            self._values[column] = [value for value, _ in pairs]
+            self._positions[column] = [position for _, position in pairs]
+
+    def updated(self, removed, added):
+        """
+        A copy without the entries removed and with those added. Keys it
+        hasn't seen come after the rest. Only the columns they're in are
+        copied, the rest are shared with this index, which is left as it is.
+        With nothing to change, this index is returned.
+        """
+        removed, added = list(removed), list(added)
+        if not removed and not added:
+            return self
+        index = copy.copy(self)
+        index.keys = list(self.keys)
+        index._key_positions = dict(self._key_positions)
+        index._values = dict(self._values)
+        index._positions = dict(self._positions)
+        copied = set()
+
+        def column(facet, field):
+            if (facet, field) not in copied:
+                copied.add((facet, field))
+                index._values[facet, field] = list(index._values.get((facet, field), ()))
+                index._positions[facet, field] = list(index._positions.get((facet, field), ()))
+            return index._values[facet, field], index._positions[facet, field]
+
+        for facet, field, value, key in removed:
+            values, positions = column(facet, field)
+            position = index._key_positions.get(key)
+            for i in range(bisect_left(values, value), bisect_right(values, value)):
+                if positions[i] == position:
+                    del values[i], positions[i]
+                    break
+        for facet, field, value, key in added:
+            if key not in index._key_positions:
+                index._key_positions[key] = len(index.keys)
+                index.keys.append(key)
+            position = index._key_positions[key]
+            values, positions = column(facet, field)
+            # Kept in (value, position) order, as they're built
+            i, end = bisect_left(values, value), bisect_right(values, value)
+            while i < end and positions[i] < position:
+                i += 1
+            values.insert(i, value)
+            positions.insert(i, position)
+        for facet, field in copied:
+            if not index._values[facet, field]:
+                del index._values[facet, field], index._positions[facet, field]
+        return index
+
+    def compare(self, facet, field, operator, operand):
+        """
+        Keys with a card of facet whose field is operator ('=', '<', '<=',
+        '>' or '>=') operand.
+        """
+        values = self._values.get((facet, field), [])
+        if operator in ('=', '=='):
+            start, end = bisect_left(values, operand), bisect_right(values, operand)
+        elif operator == '<':
+            start, end = 0, bisect_left(values, operand)
+        elif operator == '<=':
+            start, end = 0, bisect_right(values, operand)
+        elif operator == '>':
+            start, end = bisect_right(values, operand), len(values)
+        elif operator == '>=':
+            start, end = bisect_left(values, operand), len(values)
+        else:
+            raise ValueError(f"Unknown comparison {operator}")
+        positions = sorted(set(self._positions[(facet, field)][start:end])) if end > start else []
+        return [self.keys[position] for position in positions]
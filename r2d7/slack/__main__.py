@@ -20,6 +20,8 @@ from r2d7.meta import Metawing
 from r2d7.roller import Roller
 from r2d7.slackdroid import SlackDroid
 from r2d7.talkback import Talkback
+from r2d7.refresher import DataRefresher
+from r2d7.webhook import start_webhook
 
 logger = logging.getLogger(__name__)
 
@@ -35,11 +37,16 @@ class Droid(
     pass
 
 
-def main():
+def main(published=False):
+    """
+    Run the Slack bot. If published is set, attach to the data published by
+    the r2d7.bots supervisor instead of loading it.
+    """
     debug = os.getenv('DEBUG', False)
     log_level = 'DEBUG' if debug else 'INFO'
     logging.basicConfig(
         format='%(asctime)s [%(process)d] Slack - %(levelname)s: %(message)s',
+        force=True,
         level=log_level
     )
 
@@ -47,7 +54,13 @@ def main():
     redis_url = os.getenv("REDIS_URL", None)
     logging.info("token: {}".format(slack_token))
 
+    if published:
+        Droid.use_published_data()
     droid = Droid()
+    refresher = DataRefresher(droid, points_databases=("AMG", "XWA"))
+    refresher.start()
+    if not published:
+        start_webhook(refresher)
     if slack_token:
         # Run a single instance of the bot in dev mode
         logging.info("SLACK_TOKEN env var set, running in dev mode")
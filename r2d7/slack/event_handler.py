@@ -39,38 +39,37 @@ class RtmEventHandler(object):
             msg_txt = event['text']
             logger.debug(event)
 
-            # Check for new data
-            if self.droid.needs_update():
-                self.droid.load_data()
+            # New data is loaded in the background, make sure this message is
+            # answered from a single version of it
+            with self.droid.pinned_generation():
+                # Direct responses
+                responses = []
+                if self.clients.is_bot_mention(msg_txt) or self._is_direct_message(event['channel']):
+                    droid_id = self.clients.rtm.server.login_data['self']['id']
+                    msg_txt = re.sub(f"<@{droid_id}>", '', msg_txt)
+                    if self.debug and msg_txt == '!crash':
+                        raise Exception('Crashy crash!')
+                    if 'help' in msg_txt:
+                        self.messager.send_message(
+                            event['channel'], self.droid.helpMessage())
+                    else:
+                        for regex, handle_method in self.droid._dm_handlers.items():
+                            match = regex.search(msg_txt)
+                            if match:
+                                responses = handle_method(match[1])
+                                if responses:
+                                    break
 
-            # Direct responses
-            responses = []
-            if self.clients.is_bot_mention(msg_txt) or self._is_direct_message(event['channel']):
-                droid_id = self.clients.rtm.server.login_data['self']['id']
-                msg_txt = re.sub(f"<@{droid_id}>", '', msg_txt)
-                if self.debug and msg_txt == '!crash':
-                    raise Exception('Crashy crash!')
-                if 'help' in msg_txt:
-                    self.messager.send_message(
-                        event['channel'], self.droid.helpMessage())
-                else:
-                    for regex, handle_method in self.droid._dm_handlers.items():
+                # Don't handle if the dm_handlers have already got it
+                if not responses:
+                    # Watches
+                    for regex, handle_method in self.droid._handlers.items():
                         match = regex.search(msg_txt)
                         if match:
                             responses = handle_method(match[1])
                             if responses:
                                 break
 
-            # Don't handle if the dm_handlers have already got it
-            if not responses:
-                # Watches
-                for regex, handle_method in self.droid._handlers.items():
-                    match = regex.search(msg_txt)
-                    if match:
-                        responses = handle_method(match[1])
-                        if responses:
-                            break
-
             thread_ts = event.get('thread_ts', None)
 
             if responses:
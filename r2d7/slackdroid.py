@@ -1,3 +1,4 @@
+from collections import Counter
 import html
 import logging
 import re
@@ -10,43 +11,68 @@ logger = logging.getLogger(__name__)
 
 
 class SlackDroid(DroidCore):
-    def __init__(self):
+    def __init__(self, load=True):
         super().__init__()
-        self.load_data()
+        if load:
+            self.load_data()
+            self.load_overlays()
 
-    def load_data(self):
-        super().load_data()
+    def _init_generation(self, generation, previous, changes):
+        super()._init_generation(generation, previous, changes)
 
         # References to conditions and ship abilities are highlighted
-        self._ref_names = set()
-        for card in self.data['condition'].values():
-            self._ref_names.add(card['name'])
-        for card in self.data['pilot'].values():
+        ref_names = set()
+        for card in generation.data['condition'].values():
+            ref_names.add(card['name'])
+        for card in generation.data['pilot'].values():
             if 'shipAbility' in card:
-                self._ref_names.add(card['shipAbility']['name'])
-
-        # Convert text now to save time later
-        for category, names in self.data.items():
-            for card in names.values():
-                if 'sides' in card:
-                    for side in card['sides']:
-                        if 'ability' in side:
-                            side['ability'] = self.convert_text(
-                                side['ability'])
-                        if 'shipAbility' in side:
-                            side['shipAbility']['text'] = self.convert_text(
-                                side['shipAbility']['text'])
-                        if 'device' in side:
-                                side['device']['effect'] = self.convert_text(
-                                    side['device'].get('effect', ''))
-                if 'ability' in card:
-                    card['ability'] = self.convert_text(card['ability'])
-                if 'shipAbility' in card:
-                    card['shipAbility']['text'] = self.convert_text(
-                        card['shipAbility']['text'])
-                if category == 'damage':
-                    card['text'] = self.convert_text(card['text'])
+                ref_names.add(card['shipAbility']['name'])
+
+        # Convert text now to save time later. Card data is left as it is
+        # and print_card picks the converted text up from converted_text.
+        # Each generation has its own copy, holding the texts of its cards
+        # only: text_uses counts the cards using each.
+        generation.ref_names = ref_names
+        if changes.full or previous is None or ref_names != previous.ref_names:
+            converted_text, text_uses = {}, Counter()
+            cards = self.all_cards(generation.data)
+        else:
+            converted_text = dict(previous.converted_text)
+            text_uses = previous.text_uses.copy()
+            for card in changes.removed:
+                for text in self._card_texts(card):
+                    text_uses[text] -= 1
+                    if text_uses[text] <= 0:
+                        del text_uses[text]
+                        converted_text.pop(text, None)
+            cards = changes.added
+        generation.converted_text = converted_text
+        generation.text_uses = text_uses
+        with generation.report.phase('convert text'):
+            for card in cards:
+                for text in self._card_texts(card):
+                    text_uses[text] += 1
+                    if text not in converted_text:
+                        converted_text[text] = self._convert_text(text, ref_names)
 
+    @staticmethod
+    def _card_texts(card):
+        """
+        The texts of card that are converted.
+        """
+        for side in card.get('sides', []):
+            if 'ability' in side:
+                yield side['ability']
+            if 'shipAbility' in side:
+                yield side['shipAbility']['text']
+            if 'device' in side:
+                yield side['device'].get('effect', '')
+        if 'ability' in card:
+            yield card['ability']
+        if 'shipAbility' in card:
+            yield card['shipAbility']['text']
+        if card['category'] == 'damage':
+            yield card['text']
 
     def helpMessage(self):
         return f"""\
@@ -54,17 +80,19 @@ I am R2-D7, the x-wing miniatures chat bot.
 {self.bold("List Printing:")} If you paste a (Yet Another) Squad Builder or LaunchBayNext permalink into a channel I'm in (or direct message me one), I will print a summary of the list.
 {self.bold("Card Lookup:")} Type something surrounded by square brackets and I will describe any upgrades, ships or pilots that match what you said. (Eg. Why not try `[[Engine Upgrade]]`)
 If you only want cards in a particular slot or ship, begin your lookup with the emoji for that ship or slot. (eg. `[[:crew: rey]]`)
-You can also search for cards by points value in a particular slot. Eg. `[[:crew: <=3]]`. `=`, `<`, `>`, `<=` and `>=` are supported.
+Begin your lookup with a `+` to see the conditions and ships related to the cards found too. (eg. `[[+hunted]]`)
+You can also search for cards by points value in a particular slot. Eg. `[[:crew: <=3]]`. `=`, `<`, `>`, `<=` and `>=` are supported. Pilots of a ship can be searched by loadout and initiative too. Eg. `[[:xwing: initiative >= 5]]`.
 {self.bold("Dice Rolling:")} If you type `!roll` followed by a number and a dice color, I'll roll dice for you. Type `!roll syntax` for full syntax.
-{self.bold("Crit:")} Type `!crit` for a crit.
+{self.bold("Crit:")} Type `!crit` for a crit, or `!crit` and the name of a damage deck for one from that deck.
 {self.bold("Metawing:")} Type `!meta` for a quick glimpse of the meta. Type `!meta syntax` for full syntax.
 {self.bold("Issues:")} Type `!fix` for the best ways to contact the developers about issues.
 """
 
 
     filter_pattern = re.compile(
-        r' *(?:(:[^:]+:))? *(?:([^=><:]*[^=><: ][^=><:]*)|([=><][=><]?)'
-        r' *(\d+)) *(?:(:[^:]+:))? *'
+        r' *(?:(:[^:]+:))? *(?:(?!(?i:points|loadout|initiative) *[=><])'
+        r'([^=><:]*[^=><: ][^=><:]*)|(?:((?i:points|loadout|initiative)) *)?'
+        r'([=><][=><]?) *(\d+)) *(?:(:[^:]+:))? *'
     )
     faction_icon_pattern = r':(rebel(2)?|resistance(2)?|scum(2)?|imperial|empire2|first_order|firstorder2|separatistalliance|separatist2|galacticrepublic|republic2):'
 
@@ -136,16 +164,24 @@ You can also search for cards by points value in a particular slot. Eg. `[[:crew
         'must',
     ]
 
-    def convert_text(self, text):
+    def convert_text(self, text, generation=None):
         """
         The data has HTML formatting tags, convert them to slack formatting.
         """
+        if generation is None:
+            generation = self.generation
+        try:
+            return generation.converted_text[text]
+        except KeyError:
+            return self._convert_text(text, generation.ref_names)
+
+    def _convert_text(self, text, ref_names=()):
         if text == 'Attack':
             return [self.bold('Attack')]
         text = re.sub(r'\b([A-Z][A-Za-z ]+:)', '__BREAK__*\\1*', text)
         for regex, sub in self._data_to_emoji.items():
             text = regex.sub(sub, text)
-        for card_name in self._ref_names:
+        for card_name in ref_names:
             text = text.replace(card_name, self.italics(self.bold(card_name)))
         text = re.sub(f"\\b({'|'.join(self._bold_words)})\\b", '*\\1*', text)
         text = re.sub(r'\[([^\[\]:]+)\]', lambda pat: f":{pat.group(1).lower()}:", text)
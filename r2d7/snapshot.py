@@ -0,0 +1,146 @@
+import logging
+import os
+from pathlib import Path
+import pickle
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_dir():
+    """
+    This user's own cache directory for r2d7, ~/.cache/r2d7 unless
+    XDG_CACHE_HOME says otherwise.
+    """
+    return Path(os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache') / 'r2d7'
+
+
+def private_dir(path):
+    """
+    Make sure path is a directory no one but this user can write to,
+    creating it if need be, as anything unpickled from it could run code as
+    us. Returns path, or None if it isn't.
+    """
+    path = Path(path)
+    try:
+        path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        stat = path.stat()
+    except OSError as error:
+        logger.warning(f"Couldn't create {path}: {error}")
+        return None
+    owned = not hasattr(os, 'getuid') or stat.st_uid == os.getuid()
+    if not owned or stat.st_mode & 0o022:
+        logger.warning(
+            f"Not using {path}, it has to belong to this user and not be "
+            "writable by anyone else")
+        return None
+    return path
+
+
+class SnapshotStore():
+    """
+    Keeps fully parsed card data on local disk, keyed by points database and
+    the xwing-data2 commit SHA it was built from, so a restart on an unchanged
+    version doesn't have to fetch anything.
+    """
+    # Bump this whenever the shape of the parsed data changes, so snapshots
+    # written by older code are ignored rather than loaded.
+    FORMAT = 3
+    keep = 2  # Snapshots kept per points database
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._private = None
+
+    def private(self):
+        """
+        Whether the store's directory is safe to read snapshots from. It's
+        only checked once.
+        """
+        if self._private is None:
+            self._private = private_dir(self.path) is not None
+        return self._private
+
+    def _filename(self, points_database, version):
+        return self.path / f"{points_database}-v{self.FORMAT}-{version}.pickle"
+
+    def load(self, points_database, version):
+        if not version or not self.private():
+            return None
+        filename = self._filename(points_database, version)
+        try:
+            with open(filename, 'rb') as snapshot:
+                if hasattr(os, 'getuid') and os.fstat(snapshot.fileno()).st_uid != os.getuid():
+                    logger.warning(f"Ignoring snapshot {filename}, it belongs to someone else")
+                    return None
+                data = pickle.load(snapshot)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError) as error:
+            logger.warning(f"Ignoring unreadable snapshot {filename}: {error}")
+            return None
+        logger.info(f"Loaded {points_database} data {version} from {filename}")
+        return data
+
+    def save(self, points_database, version, data):
+        if not version or not self.private():
+            return
+        filename = self._filename(points_database, version)
+        try:
+            # Write then rename, so another process never sees half a file
+            fd, tmp_name = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as tmp:
+                pickle.dump(data, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_name, filename)
+        except (OSError, pickle.PicklingError, RecursionError) as error:
+            logger.warning(f"Couldn't write snapshot {filename}: {error}")
+            return
+        logger.info(f"Saved {points_database} data {version} to {filename}")
+        self.prune(points_database)
+
+    def _pointer(self, points_database):
+        return self.path / f"{points_database}-v{self.FORMAT}.current"
+
+    def publish(self, points_database, version):
+        """
+        Mark the snapshot of version as the current one, for other processes
+        to pick up with published().
+        """
+        if not version or not self.private():
+            return
+        pointer = self._pointer(points_database)
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'w') as tmp:
+                tmp.write(version)
+            os.replace(tmp_name, pointer)
+        except OSError as error:
+            logger.warning(f"Couldn't publish {points_database} data {version}: {error}")
+            return
+        logger.info(f"Published {points_database} data {version}")
+
+    def published(self, points_database):
+        """
+        The version last published for points_database, None if there isn't
+        one.
+        """
+        if not self.private():
+            return None
+        try:
+            return self._pointer(points_database).read_text() or None
+        except OSError:
+            return None
+
+    def prune(self, points_database):
+        snapshots = []
+        for path in self.path.glob(f"{points_database}-v*.pickle"):
+            try:
+                snapshots.append((path.stat().st_mtime, path))
+            except OSError:  # Pruned by another process
+                continue
+        snapshots.sort(reverse=True)
+        for _, old in snapshots[self.keep:]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,195 @@
+from contextlib import contextmanager
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+import time
+
+import requests
+
+from r2d7.httpclient import http
+
+try:
+    import fcntl
+except ImportError:  # Not POSIX, so no way of locking the state file
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class VersionWatcher():
+    """
+    Finds the latest commit of the data branches on GitHub for every process
+    on the machine. What it learns (the last SHA and ETag of each branch, and
+    the API rate limit) is kept in a state file they all share, so:
+
+    * a check made by any process serves the others for a while, at least
+      min_interval,
+    * an unchanged branch costs a conditional request, which GitHub doesn't
+      count against the rate limit,
+    * that while is stretched to make the requests left last until the limit
+      resets, and checks stop altogether when it's used up or GitHub fails,
+    * a webhook can have the next check made straight away.
+
+    Each check reads, updates and rewrites the file holding a lock on it, so
+    processes checking at the same time don't undo each other's updates.
+    When no check can be made the last SHA known is returned. Where files
+    can't be locked, each process keeps its own state instead.
+    """
+    min_interval = 60  # Seconds a check is good for, at least
+    reserve = 5  # Requests left for anything else using the same quota
+    max_backoff = 3600
+
+    def __init__(self, path=None, token=None):
+        if path and fcntl is None:
+            logger.warning(f"Can't lock {path} here, not sharing version state")
+            path = None
+        self.path = Path(path) if path else None
+        self.token = token
+        self._lock = threading.Lock()
+        self._state = self._empty_state()
+
+    def _empty_state(self):
+        return {
+            'branches': {},  # url -> {sha, etag, checked}
+            'interval': self.min_interval,  # Seconds a check is good for
+            'blocked_until': 0,  # No requests before this time
+            'failures': 0,  # In a row, for backing off
+        }
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the state to ourselves, across processes when it's in a file.
+        """
+        with self._lock:
+            if not self.path:
+                yield
+                return
+            try:
+                self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+                lock = open(self.path.with_name(self.path.name + '.lock'), 'a')
+            except OSError as error:
+                logger.warning(f"Couldn't lock version state {self.path}: {error}")
+                yield
+                return
+            with lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                yield
+
+    def _read(self):
+        if not self.path:
+            return self._state
+        try:
+            with open(self.path) as state:
+                return json.load(state)
+        except FileNotFoundError:
+            return self._empty_state()
+        except (OSError, ValueError) as error:
+            logger.warning(f"Ignoring unreadable version state {self.path}: {error}")
+            return self._empty_state()
+
+    def _write(self, state):
+        self._state = state
+        if not self.path:
+            return
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w') as tmp:
+                json.dump(state, tmp)
+            os.replace(tmp_name, self.path)
+        except OSError as error:
+            logger.warning(f"Couldn't write version state {self.path}: {error}")
+
+    def version(self, url):
+        """
+        The SHA of the latest commit from the GitHub branch API url, or None
+        if it has never been seen.
+        """
+        with self._locked():
+            state = self._read()
+            branch = state['branches'].get(url, {})
+            now = time.time()
+            if now - branch.get('checked', 0) < state['interval']:
+                logger.debug(f"Using recent check of {url}")
+                return branch.get('sha')
+            if now < state['blocked_until']:
+                logger.debug(f"Not checking {url} for another "
+                             f"{state['blocked_until'] - now:.0f} seconds")
+                return branch.get('sha')
+
+            headers = {}
+            if branch.get('etag'):
+                headers['If-None-Match'] = branch['etag']
+            if self.token:
+                headers['Authorization'] = f"token {self.token}"
+            try:
+                res = http.get(url, headers=headers)
+            except requests.RequestException as error:
+                logger.warning(f"Couldn't check data version: {error}")
+                self._back_off(state, now)
+                self._write(state)
+                return branch.get('sha')
+
+            if res.status_code == 200:
+                try:
+                    sha = res.json()['commit']['sha']
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("Got a malformed response checking data version.")
+                    self._back_off(state, now)
+                else:
+                    branch = {'sha': sha, 'etag': res.headers.get('ETag'), 'checked': now}
+                    state['failures'] = 0
+            elif res.status_code == 304:
+                branch = dict(branch, checked=now)
+                state['failures'] = 0
+            else:
+                logger.warning(f"Got {res.status_code} checking data version.")
+                self._back_off(state, now)
+            state['branches'][url] = branch
+            self._pace(state, res, now)
+            self._write(state)
+            return branch.get('sha')
+
+    def _back_off(self, state, now):
+        state['failures'] += 1
+        delay = min(self.min_interval * 2 ** state['failures'], self.max_backoff)
+        state['blocked_until'] = max(state['blocked_until'], now + delay)
+
+    def _pace(self, state, res, now):
+        """
+        Space checks out as the rate limit headers of res call for.
+        """
+        try:
+            remaining = int(res.headers['X-RateLimit-Remaining'])
+            reset = float(res.headers['X-RateLimit-Reset'])
+        except (KeyError, ValueError):
+            return
+        if res.status_code in (403, 429) and 'Retry-After' in res.headers:
+            reset = now + float(res.headers['Retry-After'])
+        usable = remaining - self.reserve
+        if usable <= 0:
+            logger.warning(
+                f"GitHub rate limit reached, not checking for new data for "
+                f"{reset - now:.0f} seconds")
+            state['blocked_until'] = max(state['blocked_until'], reset)
+            usable = 1
+        # Spread what's left over the time until the reset, each branch
+        # taking a request per interval
+        branches = max(len(state['branches']), 1)
+        interval = min((reset - now) * branches / usable, reset - now)
+        state['interval'] = max(self.min_interval, interval)
+
+    def expire(self, url):
+        """
+        Have the next version() of url check GitHub, as a webhook says it's
+        changed. The ETag is kept, a conditional request tells us if it is.
+        """
+        with self._locked():
+            state = self._read()
+            if url in state['branches']:
+                state['branches'][url]['checked'] = 0
+                self._write(state)
+        logger.info(f"Checking {url} again")
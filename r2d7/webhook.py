@@ -0,0 +1,146 @@
+import hashlib
+import hmac
+import ipaddress
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import threading
+
+from r2d7.datasource import GitHubDataSource
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer(threading.Thread):
+    """
+    Listens for GitHub push webhooks from the xwing-data2 repositories, and
+    has the refresher check the pushed branch straight away, so new data is
+    loaded as soon as it's pushed rather than at the next poll. Only
+    deliveries signed with secret are accepted, and even then a push is only
+    a reason to check: the version loaded is always the one GitHub reports.
+
+    GET /metrics returns the refreshing droid's metrics() as JSON, to clients
+    sending metrics_token as a bearer token or, without one, to this machine.
+    """
+    def __init__(self, refresher, watcher, port, secret, host='127.0.0.1',
+                 metrics_token=None):
+        if not secret:
+            raise ValueError("A webhook secret is required")
+        super().__init__(name='webhook', daemon=True)
+        self.refresher = refresher
+        self.watcher = watcher
+        self.secret = secret
+        self.metrics_token = metrics_token
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+
+    @property
+    def port(self):
+        return self.server.server_port
+
+    def _handler(self):
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status = webhook.handle(
+                    self.headers.get('X-GitHub-Event'),
+                    body,
+                    self.headers.get('X-Hub-Signature-256'),
+                )
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                if not webhook.may_read_metrics(
+                        self.client_address[0], self.headers.get('Authorization')):
+                    self.send_error(401)
+                    return
+                body = json.dumps(webhook.refresher.droid.metrics()).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def may_read_metrics(self, address, authorization):
+        if self.metrics_token:
+            return hmac.compare_digest(
+                f"Bearer {self.metrics_token}", authorization or '')
+        return ipaddress.ip_address(address).is_loopback
+
+    def verify(self, body, signature):
+        expected = 'sha256=' + hmac.new(
+            self.secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature or '')
+
+    def handle(self, event, body, signature=None):
+        """
+        Deal with one delivery, returning the HTTP status to answer it with.
+        """
+        if not self.verify(body, signature):
+            logger.warning("Ignoring webhook with a bad signature")
+            return 401
+        if event != 'push':
+            return 204
+        try:
+            push = json.loads(body)
+            user, _, repository = push['repository']['full_name'].partition('/')
+            branch = push['ref']
+            if branch.startswith('refs/heads/'):
+                branch = branch[len('refs/heads/'):]
+        except (ValueError, KeyError, AttributeError):
+            return 400
+        if repository != 'xwing-data2':
+            return 204
+        self.watcher.expire(GitHubDataSource.VERSION_URL.format(user=user, branch=branch))
+        self.refresher.trigger()
+        return 202
+
+    def run(self):
+        logger.info(f"Listening for GitHub webhooks on port {self.port}")
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def start_webhook(refresher):
+    """
+    Start a WebhookServer for refresher if R2D7_WEBHOOK_PORT is set, with
+    R2D7_WEBHOOK_SECRET as its secret, on R2D7_WEBHOOK_HOST (this machine
+    only by default). R2D7_METRICS_TOKEN lets other machines read /metrics.
+    """
+    port = os.getenv('R2D7_WEBHOOK_PORT')
+    if not port:
+        return None
+    secret = os.getenv('R2D7_WEBHOOK_SECRET')
+    if not secret:
+        logger.warning("Not listening for webhooks, R2D7_WEBHOOK_SECRET isn't set")
+        return None
+    watcher = getattr(refresher.droid.data_source, 'watcher', None)
+    if watcher is None:
+        logger.warning("Not listening for webhooks, the data isn't from GitHub")
+        return None
+    try:
+        webhook = WebhookServer(
+            refresher, watcher, int(port), secret,
+            host=os.getenv('R2D7_WEBHOOK_HOST', '127.0.0.1'),
+            metrics_token=os.getenv('R2D7_METRICS_TOKEN'))
+    except OSError as error:
+        # Most likely another bot on this machine is already listening
+        logger.warning(f"Not listening for webhooks on port {port}: {error}")
+        return None
+    webhook.start()
+    return webhook
@@ -1,6 +1,95 @@
+import copy
+import json
+
 import pytest
+
+from r2d7.datasource import DataSource, LocalDataSource
 from r2d7.slack.__main__ import Droid
 
+# A small tree of data: one ship with one pilot, one crew upgrade, one
+# condition and one damage deck
+FILES = {
+    'data/manifest.json': {
+        'damagedecks': ['data/damage-decks/core.json'],
+        'upgrades': ['data/upgrades/crew.json'],
+        'conditions': 'data/conditions/conditions.json',
+        'pilots': [{'faction': 'Rebel Alliance',
+                    'ships': ['data/pilots/rebel-alliance/t-65-x-wing.json']}],
+    },
+    'data/damage-decks/core.json': {'cards': [
+        {'title': 'Direct Hit!', 'amount': 5, 'type': 'Ship', 'text': 'Suffer 1 [Hit] damage.'},
+    ]},
+    'data/upgrades/crew.json': [
+        {'name': 'Chewbacca', 'xws': 'chewbacca', 'limited': 1,
+         'cost': {'value': 5},
+         'sides': [{'title': 'Chewbacca', 'type': 'Crew', 'slots': ['Crew'],
+                    'ability': 'At the start of the Engagement Phase, you may spend 2 [Charge].'}]},
+    ],
+    'data/conditions/conditions.json': [
+        {'name': 'Hunted', 'xws': 'hunted', 'ability': 'After you are destroyed...'},
+    ],
+    'data/pilots/rebel-alliance/t-65-x-wing.json': {
+        'name': 'T-65 X-wing', 'xws': 't65xwing', 'faction': 'Rebel Alliance',
+        'size': 'Small', 'dial': ['1BW'], 'stats': [], 'actions': [],
+        'pilots': [{'name': 'Luke Skywalker', 'xws': 'lukeskywalker',
+                    'initiative': 5, 'limited': 1, 'cost': 6,
+                    'slots': ['Talent', 'Astromech'],
+                    'ability': 'After you become the defender, recover 1 [Force].'}],
+    },
+}
+
+SHIP = 'data/pilots/rebel-alliance/t-65-x-wing.json'
+CREW = 'data/upgrades/crew.json'
+CONDITIONS = 'data/conditions/conditions.json'
+
+
+class DataTree():
+    """
+    A copy of FILES under root, to change before writing it out.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.files = copy.deepcopy(FILES)
+
+    @property
+    def manifest(self):
+        return self.files['data/manifest.json']
+
+    @property
+    def ship(self):
+        return self.files[SHIP]
+
+    @property
+    def crew(self):
+        return self.files[CREW]
+
+    @property
+    def conditions(self):
+        return self.files[CONDITIONS]
+
+    def write(self):
+        for filepath, content in self.files.items():
+            path = self.root / filepath
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(content))
+        return self.root
+
+
+class PointsDataSource(LocalDataSource):
+    """
+    Reads each points database from its own tree.
+    """
+    def __init__(self, roots):
+        super().__init__(roots["AMG"])
+        self.sources = {points_database: LocalDataSource(root, self.file_cache)
+                        for points_database, root in roots.items()}
+
+    def get_version(self, points_database="AMG"):
+        return self.sources[points_database].get_version()
+
+    def get_file(self, filepath, points_database="AMG"):
+        return self.sources[points_database].get_file(filepath, points_database)
+
 
 class TestDroid(Droid):
     def test_lookup(self, descriptor):
@@ -8,11 +97,72 @@ class TestDroid(Droid):
             descriptor, num = descriptor.split('.')
         else:
             num = 0
-        assert descriptor in self._lookup_data
-        assert len(self._lookup_data[descriptor]) > int(num)
-        return self._lookup_data[descriptor][int(num)]
+        assert descriptor in self.generation.lookup_data
+        assert len(self.generation.lookup_data[descriptor]) > int(num)
+        return self.generation.lookup_data[descriptor][int(num)]
 
 
 @pytest.fixture(scope="session")
 def testbot():
     return TestDroid()
+
+
+class OfflineDroid(Droid):
+    """
+    Keeps no snapshots, and reads the data from whatever offline_droid gives
+    it. At the top level, so pre-render workers can unpickle it.
+    """
+    snapshot_store = None
+
+
+@pytest.fixture
+def data_tree(tmp_path):
+    """
+    The DataTree of tmp_path, not written out yet.
+    """
+    return DataTree(tmp_path)
+
+
+@pytest.fixture
+def tree(data_tree):
+    return data_tree.write()
+
+
+@pytest.fixture
+def offline_droid(monkeypatch):
+    """
+    Makes an OfflineDroid reading the data from a local tree, from a tree
+    for each points database given by name, or from the data source given,
+    with any class attributes given set for the test.
+    """
+    def make(source, **attributes):
+        if isinstance(source, dict):
+            source = PointsDataSource(source)
+        elif not isinstance(source, DataSource):
+            source = LocalDataSource(source)
+        attributes['data_source'] = source
+        for name, value in attributes.items():
+            monkeypatch.setattr(OfflineDroid, name, value, raising=False)
+        return OfflineDroid()
+
+    return make
+
+
+@pytest.fixture
+def points_trees(tmp_path):
+    """
+    DataTrees of AMG and XWA points, written out. In XWA Luke costs 7 rather
+    than 6, and Chewbacca is standard.
+    """
+    amg, xwa = DataTree(tmp_path / 'amg'), DataTree(tmp_path / 'xwa')
+    xwa.ship['pilots'][0]['cost'] = 7
+    xwa.crew[0]['standard'] = True
+    amg.write()
+    xwa.write()
+    return {"AMG": amg, "XWA": xwa}
+
+
+@pytest.fixture
+def points_droid(points_trees, offline_droid):
+    return offline_droid({points_database: tree.root
+                          for points_database, tree in points_trees.items()})
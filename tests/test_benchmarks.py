@@ -0,0 +1,14 @@
+from benchmarks import data, queries, synthetic
+
+
+def test_corpus_finds_cards(tmp_path):
+    synthetic.generate(tmp_path, scale=4, seed=0)
+    droid = data.load(tmp_path)
+    corpus = queries.read_corpus(queries.SYNTHETIC_CORPUS)
+    assert {kind for kind, _ in corpus} == set(queries.KINDS)
+    assert queries.unmatched(droid, corpus) == []
+
+
+def test_corpus_kinds():
+    corpus = queries.read_corpus(queries.CORPUS)
+    assert {kind for kind, _ in corpus} == set(queries.KINDS)
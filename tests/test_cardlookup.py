@@ -1,3 +1,6 @@
+from collections import Counter
+import random
+
 import pytest
 
 from r2d7.cardlookup import CardLookup
@@ -166,9 +169,306 @@ def test_lookup(testbot, lookup, expected):
     actual = [(card['xws'], card['category']) for card in testbot.lookup(lookup)]
     assert actual == expected
 
+@pytest.mark.parametrize('misspelt, lookup', [
+    ('soontir fell', 'soontir fel'),
+    ('hevy laser canon', 'heavy laser cannon'),
+])
+def test_lookup_misspelt(testbot, misspelt, lookup):
+    assert list(testbot.lookup(misspelt)) == list(testbot.lookup(lookup))
+
+@pytest.fixture
+def related_tree(data_tree):
+    """
+    Luke and Chewbacca both give the Hunted condition, and Chewbacca only
+    goes on an X-wing.
+    """
+    data_tree.ship['pilots'][0]['conditions'] = ['hunted']
+    chewbacca = data_tree.crew[0]
+    chewbacca['restrictions'] = [{'ships': ['t65xwing']}]
+    chewbacca['sides'][0]['conditions'] = ['hunted']
+    return data_tree
+
+
+@pytest.fixture
+def related_droid(related_tree, offline_droid):
+    return offline_droid(related_tree.write())
+
+
+@pytest.mark.parametrize('lookup, expected', [
+    ('luke', ['Luke Skywalker', 'Hunted']),
+    ('chewbacca', ['Chewbacca']),
+    ('+chewbacca', ['Chewbacca', 'T-65 X-wing', 'Hunted']),
+    ('+ hunted', ['Hunted', 'Chewbacca', 'Luke Skywalker']),
+    ('+t65xwing', ['T-65 X-wing']),
+])
+def test_lookup_related(related_droid, lookup, expected):
+    assert [card['name'] for card in related_droid.lookup(lookup)] == expected
+
+
+def test_lookup_misspelt_words(data_tree, offline_droid):
+    data_tree.manifest['upgrades'].append('data/upgrades/cannon.json')
+    data_tree.files['data/upgrades/cannon.json'] = [
+        {'name': 'Heavy Laser Cannon', 'xws': 'heavylasercannon', 'cost': {'value': 4},
+         'sides': [{'title': 'Heavy Laser Cannon', 'type': 'Cannon', 'slots': ['Cannon'],
+                    'ability': 'Attack: after the Modify Dice step...'}]},
+    ]
+    droid = offline_droid(data_tree.write())
+    for lookup in ('hlc canon', 'heavy lazer canon', 'lukeskywalkr', 'luke skywlker'):
+        assert [card['name'] for card in droid.lookup(lookup)] == [
+            'Heavy Laser Cannon' if 'canon' in lookup else 'Luke Skywalker']
+    assert list(droid.lookup('hlc carrot')) == []
+
+    # Anything sent to the bot directly is looked up, but not corrected
+    assert droid.handle_dm_lookup('hlc canon') == []
+    assert droid.handle_dm_lookup('hlc') == droid.handle_lookup('hlc canon')
+    assert droid.handle_dm_lookup('how are you') == []
+
+
+@pytest.fixture
+def crit_droid(data_tree, offline_droid):
+    data_tree.manifest['damagedecks'].append('data/damage-decks/core-tfa.json')
+    data_tree.files['data/damage-decks/core-tfa.json'] = {'cards': [
+        {'title': 'Direct Hit!', 'amount': 1, 'type': 'Ship', 'text': 'Suffer 1 [Hit] damage.'},
+        {'title': 'Blinded Pilot', 'amount': 2, 'type': 'Pilot', 'text': 'You cannot attack.'},
+    ]}
+    return offline_droid(data_tree.write())
+
+
+def test_crit(crit_droid):
+    assert len(crit_droid.generation.lookup_data['directhit']) == 2
+    assert crit_droid.handle_crit('')[0][0] == ':crit: *Direct Hit!* (core) •••••'
+    assert {crit_droid.handle_crit('core-tfa')[0][0] for _ in range(50)} == {
+        ':crit: *Direct Hit!* (core-tfa) •',
+        ':crit: *Blinded Pilot* (core-tfa) ••',
+    }
+    with pytest.raises(UserError, match="`core`, `core-tfa`"):
+        crit_droid.handle_crit('tfa')
+
+    decks = crit_droid.generation.damage_decks
+    crit_droid.load_data(full=True)
+    assert crit_droid.generation.damage_decks is not decks
+    assert [len(deck) for deck in crit_droid.generation.damage_decks.values()] == [1, 2]
+
+
+def test_crit_weighted(crit_droid):
+    # Blinded Pilot has twice the copies of Direct Hit! in core-tfa
+    random.seed(0)
+    draws = Counter(crit_droid.handle_crit('core-tfa')[0][0] for _ in range(3000))
+    ratio = (draws[':crit: *Blinded Pilot* (core-tfa) ••']
+             / draws[':crit: *Direct Hit!* (core-tfa) •'])
+    assert 1.8 < ratio < 2.2
+
+
+@pytest.mark.parametrize('message, deck', [
+    ('!crit', ''),
+    ('roll me a !crit core-tfa please', 'core-tfa'),
+])
+def test_crit_pattern(crit_droid, message, deck):
+    pattern, = (pattern for pattern, handler in crit_droid._handlers.items()
+                if handler == crit_droid.handle_crit)
+    assert pattern.search(message)[1] == deck
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('', []),
+    ('l', ['Luke Skywalker']),
+    ('T-65', ['T-65 X-wing']),
+    ('x-w', ['T-65 X-wing']),
+    ('sky', ['Luke Skywalker']),
+    ('chewbaca', ['Chewbacca']),
+    ('zzz', []),
+])
+def test_complete(related_droid, text, expected):
+    assert related_droid.complete(text) == expected
+
+
+def test_print_card_cache(related_droid):
+    luke = related_droid.data['pilot']['lukeskywalker']
+    text = related_droid.print_card(luke)
+    text[0] = 'changed by the caller'
+    assert related_droid.print_card(luke)[0] != text[0]
+    assert related_droid.print_card(luke) == related_droid.render_card(luke)
+
+    generation = related_droid.generation
+    assert luke['_id'] in generation.rendered["AMG", None]
+    related_droid.load_data(full=True)
+    assert related_droid.generation.rendered == {}
+
+
+def test_print_card_conditions(related_droid):
+    chewbacca = related_droid.data['upgrade']['chewbacca']
+    text = related_droid.print_card(chewbacca)
+    assert text[-1] == [':condition: *Hunted*', ['After you are destroyed...']]
+
+
+def test_render_cache(points_droid, points_trees):
+    amg, = points_droid.handle_lookup('t65xwing')
+    xwa, = points_droid.handle_lookup('t65xwing', "XWA")
+    assert '*[7]*' in xwa[-1][0]
+
+    points_trees["XWA"].ship['pilots'][0]['cost'] = 8
+    points_trees["XWA"].write()
+    points_droid.load_data("XWA")
+    assert points_droid.handle_lookup('t65xwing') == [amg]
+    xwa, = points_droid.handle_lookup('t65xwing', "XWA")
+    assert '*[8]*' in xwa[-1][0]
+    assert len(points_droid.generation.rendered) == 2
+
+
+def test_lookup_limit(points_droid, monkeypatch):
+    rendered = []
+    render_card = points_droid.render_card
+    monkeypatch.setattr(points_droid, 'render_card',
+                        lambda card, *args: rendered.append(card) or render_card(card, *args))
+    query = 'luke]] [[chewbacca]] [[hunted'
+    assert len(points_droid.plan_lookup(query)) == 3
+    assert len(points_droid.plan_lookup(query, limit=1)) == 2
+    points_droid.lookup_limit = points_droid.image_lookup_limit = 2
+    with pytest.raises(UserError, match='more than 2 cards'):
+        points_droid.handle_lookup(query)
+    with pytest.raises(UserError, match='more than 2 cards'):
+        points_droid.handle_image_lookup(query)
+    assert rendered == []
+    points_droid.lookup_limit = 3
+    points_droid.query_cache.clear()
+    assert len(points_droid.handle_lookup(query)) == 3
+    assert len(rendered) == 3
+
+
+def _cards(generation):
+    return {card['_id']: (card['category'], card['xws'])
+            for card in CardLookup.all_cards(generation.data)}
+
+
+def _related(generation):
+    cards = _cards(generation)
+    related = {cards[card_id]: [(relation.kind, relation.card['xws'], relation.side,
+                                 relation.card.get('ability'))
+                                for relation in relations if relation.kind != 'remote']
+               for card_id, relations in generation.related.items()}
+    given_by = {cards[card_id]: sorted(cards[giver['_id']] for giver in givers)
+                for card_id, givers in generation.given_by.items()}
+    return related, given_by
+
+
+def _facets(generation):
+    cards = _cards(generation)
+    return {facet: sorted(cards[card_id] for card_id in card_ids)
+            for facet, card_ids in generation.facet_index.items()}
+
+
+# What of each index an incremental load has to get the same as a full one
+INDEX_VIEWS = {
+    'word_index': lambda generation: {
+        word: sorted(generation.word_index.prefixed(word))
+        for word in ('chewbacca', 'scum', 'han', 'luke', 'hunted')},
+    'prefix_index': lambda generation: {
+        prefix: sorted(generation.prefix_index.prefixed(prefix)) for prefix in 'chlt'},
+    'trigram_index': lambda generation: {
+        text: sorted(generation.trigram_index.containing(text))
+        for text in ('chew', 'solo', 'luke', 'hunt')},
+    'fuzzy_index': lambda generation: {
+        text: sorted(generation.fuzzy_index.closest(text))
+        for text in ('hansolp', 'chewbaca', 'lukeskywalkr', 'huntd')},
+    'range_index': lambda generation: [
+        sorted(generation.range_index.compare(':crew:', 'points', operator, 5))
+        for operator in ('<', '=', '>')],
+    'related': _related,
+    'facet_index': _facets,
+}
+
+
+def _chewbacca_cost(tree):
+    tree.crew[0]['cost'] = {'value': 4}
+
+
+def _scum_chewbacca(tree):
+    tree.crew[0]['name'] = 'Chewbacca (Scum)'
+
+
+def _han_solo(tree):
+    tree.crew[0].update(name='Han Solo', xws='hansolo')
+
+
+def _han_solo_too(tree):
+    tree.crew[0]['cost'] = {'value': 4}
+    tree.crew.append(dict(tree.crew[0], name='Han Solo', xws='hansolo', cost={'value': 6}))
+
+
+def _changed_condition(tree):
+    tree.conditions[0]['ability'] = 'Changed.'
+    tree.crew[0]['sides'][0]['conditions'] = []
+
+
+def _scum_ship(tree):
+    tree.ship['faction'] = 'Scum and Villainy'
+
+
+@pytest.mark.parametrize('index, change, kept, lookups', [
+    ('word_index', _chewbacca_cost, True, {}),
+    ('word_index', _scum_chewbacca, False, {'scum': ['Chewbacca (Scum)']}),
+    ('prefix_index', _chewbacca_cost, True, {}),
+    ('prefix_index', _han_solo, False, {'han': ['Han Solo'], 'chewbacca': []}),
+    ('trigram_index', _han_solo, False, {'solo': ['Han Solo']}),
+    ('fuzzy_index', _chewbacca_cost, True, {}),
+    ('fuzzy_index', _han_solo, False, {'hansolp': ['Han Solo'], 'chewbaca': []}),
+    ('range_index', _han_solo_too, False, {
+        ':crew: = 4': ['Chewbacca'], ':crew: > 4': ['Han Solo'], ':crew: = 5': []}),
+    ('related', _changed_condition, False, {'+ hunted': ['Hunted', 'Luke Skywalker']}),
+    ('facet_index', _scum_ship, False, {
+        ':rebel: luke': [], ':scum: luke': ['Luke Skywalker', 'Hunted']}),
+])
+def test_incremental_index(related_tree, offline_droid, index, change, kept, lookups):
+    """
+    An incremental load keeps each index when what it holds is unchanged, or
+    else updates a copy of it, to the same as a full load would build.
+    """
+    droid = offline_droid(related_tree.write())
+    previous = droid.generation
+    built = getattr(previous, index)
+    view = INDEX_VIEWS[index]
+    before = view(previous)
+    droid.load_data()
+    assert getattr(droid.generation, index) is built
+
+    change(related_tree)
+    related_tree.write()
+    assert not droid.load_data().full
+    assert (getattr(droid.generation, index) is built) == kept
+    assert view(previous) == before
+    for lookup, expected in lookups.items():
+        assert [card['name'] for card in droid.lookup(lookup)] == expected
+
+    incremental = view(droid.generation)
+    droid.load_data(full=True)
+    assert view(droid.generation) == incremental
+
+
+def test_incremental_related_cards(related_tree, related_droid):
+    _changed_condition(related_tree)
+    related_tree.write()
+    related_droid.load_data()
+    _, hunted = related_droid.lookup('luke')
+    assert hunted is related_droid.data['condition']['hunted']
+    assert hunted['ability'] == 'Changed.'
+
+
+@pytest.mark.parametrize('name, prefix', [
+    ('Heavy Laser Cannon', 'heavy'),
+    ('hot shot', 'hot'),
+    ('r2-d2', 'r2'),
+    ('tiefighter', 'tie'),
+    ('"Whisper"', None),
+])
+def test_name_prefix(name, prefix):
+    assert CardLookup._name_prefix(name) == prefix
+
+
 @pytest.mark.parametrize('lookup, message', [
     ('tie', 'Your search matched more than 15 cards, please be more specific.'),
-    ('> 4', 'You need to specify a slot to search by points value.')
+    ('> 4', 'You need to specify a slot to search by points value.'),
+    ('initiative > 4', 'You need to specify a slot to search by initiative value.'),
+    (':crew: => 4', "I don't know how to compare with =>, try one of `=`, `<`, `>`, `<=` or `>=`."),
 ])
 def test_user_errors(testbot, lookup, message):
     with pytest.raises(UserError, match=message):
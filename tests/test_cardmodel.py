@@ -0,0 +1,61 @@
+from collections.abc import Mapping
+import pickle
+
+import pytest
+
+from r2d7.cardmodel import Compactor, Record
+
+
+def test_record():
+    record = Record({'name': 'Chewbacca', 'cost': {'value': 5}})
+    assert isinstance(record, Mapping)
+    assert record['name'] == 'Chewbacca'
+    assert record.get('limited', 0) == 0
+    assert 'cost' in record
+    assert 'sides' not in record
+    assert list(record) == ['name', 'cost']
+    assert record == {'name': 'Chewbacca', 'cost': {'value': 5}}
+    assert dict(record, limited=1)['limited'] == 1
+    with pytest.raises(KeyError):
+        record['sides']
+    with pytest.raises(TypeError):
+        record['name'] = 'Chewie'
+    with pytest.raises(AttributeError):
+        record._values = ()
+
+
+def test_compact():
+    ship = {'name': 'T-65 X-wing', 'stats': [{'type': 'agility', 'value': 2}]}
+    luke = {'name': 'Luke Skywalker', 'ship': ship, 'slots': ['Talent', 'Astromech']}
+    wedge = {'name': 'Wedge Antilles', 'ship': ship, 'slots': ['Talent', 'Astromech']}
+    ship['pilots'] = {'Rebel Alliance': [luke, wedge]}
+    other = {'name': 'A-wing', 'stats': [{'type': 'agility', 'value': 3}],
+             'flags': [{'value': True}, {'value': 1}]}
+
+    compact = Compactor()
+    compact_luke = compact(luke)
+    compact_ship = compact(ship)
+    compact_other = compact(other)
+
+    assert compact_luke['ship'] is compact_ship
+    assert compact_ship['pilots']['Rebel Alliance'][0] is compact_luke
+    # Identical leaves are shared
+    compact_wedge = compact_ship['pilots']['Rebel Alliance'][1]
+    assert compact_wedge['slots'] is compact_luke['slots']
+    assert compact_wedge['slots'] == ('Talent', 'Astromech')
+    assert compact_other['stats'][0]['value'] == 3
+    assert compact_other['flags'][0]['value'] is True
+    assert compact_other['flags'][1]['value'] == 1
+    assert compact_other['flags'][1]['value'] is not True
+    assert 'Luke Skywalker' in repr(compact_ship)
+
+
+def test_pickle():
+    ship = {'name': 'T-65 X-wing'}
+    luke = {'name': 'Luke Skywalker', 'ship': ship}
+    ship['pilots'] = {'Rebel Alliance': [luke]}
+    compact_ship = Compactor()(ship)
+
+    loaded = pickle.loads(pickle.dumps(compact_ship))
+    assert loaded['pilots']['Rebel Alliance'][0]['ship'] is loaded
+    assert loaded._shape is compact_ship._shape
@@ -1,8 +1,10 @@
+from collections.abc import Mapping
+import multiprocessing
 import threading
 
 import pytest
 
-from r2d7.core import DroidCore
+from r2d7.core import ClassDefault, DroidCore, process_context
 
 
 categories = [
@@ -20,7 +22,7 @@ def test_data(testbot):
     assert testbot.data_version is not None
     assert testbot.data['ship']['starviperclassattackplatform']['name'] == "StarViper-class Attack Platform"
     assert testbot.data['upgrade']['genius']['name'] == "\"Genius\""
-    assert type(testbot.data['ship']['hwk290lightfreighter']['pilots']) is dict
+    assert isinstance(testbot.data['ship']['hwk290lightfreighter']['pilots'], Mapping)
 
 
 partial_canonicalize_tests = {
@@ -58,3 +60,44 @@ def test_threaded(testbot):
     thread.join()
     assert signal.is_set()
 
+
+def test_reload_unchanged(testbot):
+    lookup_data = testbot.generation.lookup_data
+    changes = testbot.load_data()
+    assert not changes.full
+    assert changes.added == []
+    assert changes.removed == []
+    assert testbot.generation.lookup_data.keys() == lookup_data.keys()
+
+
+def test_pinned_generation(testbot):
+    with testbot.pinned_generation():
+        pinned = testbot.generation
+        testbot.load_data(full=True)
+        assert testbot.generation is pinned
+        assert testbot.data is pinned.data
+    assert testbot.generation is not pinned
+
+
+def test_class_default():
+    built = []
+
+    class Base():
+        thing = ClassDefault(lambda cls: built.append(cls) or object())
+
+    class Sub(Base):
+        pass
+
+    class Own(Base):
+        thing = 'own'
+
+    assert built == []
+    assert Sub().thing is Base.thing is Sub.thing
+    assert built == [Base]
+    assert Own.thing == 'own'
+
+
+def test_process_context(monkeypatch):
+    assert process_context().get_start_method() != 'fork'
+    monkeypatch.setattr(multiprocessing, 'get_all_start_methods', lambda: ['fork', 'spawn'])
+    assert process_context().get_start_method() == 'spawn'
@@ -0,0 +1,118 @@
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+
+import pytest
+
+from r2d7.core import DroidCore
+from r2d7.datasource import (
+    ArchiveDataSource, DataSourceError, LocalDataSource, SnapshotDataSource,
+    make_data_source)
+from r2d7.refresher import DataRefresher
+from r2d7.slack.__main__ import Droid
+from r2d7.snapshot import SnapshotStore
+
+
+def test_local(tree):
+    source = LocalDataSource(tree)
+    version = source.get_version()
+    assert source.get_version() == version
+
+    filepath, digest = source.get_file('data/upgrades/crew.json')
+    assert filepath == 'data/upgrades/crew.json'
+    card = source.read_file(filepath)[0]
+    assert card['name'] == 'Chewbacca'
+    card['name'] = 'mutated by the loader'
+    assert source.read_file(filepath)[0]['name'] == 'Chewbacca'
+
+    path = tree / filepath
+    path.write_text(json.dumps([dict(card, name='Chewie')]))
+    os.utime(path, ns=(0, 0))
+    assert source.get_version() != version
+    assert source.get_file(filepath)[1] != digest
+
+    with pytest.raises(DataSourceError):
+        source.get_file('data/upgrades/missing.json')
+
+
+def test_archive(data_tree):
+    body = io.BytesIO()
+    with zipfile.ZipFile(body, 'w') as archive:
+        for filepath, content in data_tree.files.items():
+            archive.writestr(f"xwing-data2-abc123/{filepath}", json.dumps(content))
+        archive.writestr("xwing-data2-abc123/README.md", "Not data")
+
+    source = ArchiveDataSource({"AMG": 'someone'})
+    source.add_archive("AMG", body.getvalue())
+    assert source.get_file('data/upgrades/crew.json')[0] == 'data/upgrades/crew.json'
+    assert source.read_file(Droid.MANIFEST) == data_tree.manifest
+    with pytest.raises(DataSourceError):
+        source.get_file('README.md')
+
+
+def test_make_data_source(tree):
+    assert make_data_source('archive', {"AMG": 'someone'}).parallel is False
+    assert make_data_source('http', {"AMG": 'someone'}).parallel is True
+    assert make_data_source(str(tree), {"AMG": 'someone'}).root == tree
+
+
+def test_droid_offline(tree, offline_droid):
+    droid = offline_droid(tree)
+    assert droid.data_version == droid.data_source.get_version()
+    assert droid.data['pilot']['lukeskywalker']['ship']['name'] == 'T-65 X-wing'
+    assert not droid.needs_update()
+    assert [card['name'] for card in droid.lookup('chewbacca')] == ['Chewbacca']
+
+    report, _ = droid.metrics()['loads']
+    assert report['points_database'] == "AMG"
+    assert report['version'] == droid.data_version
+    assert report['counts']['cards added'] == 5
+    assert {'fetch', 'compact', 'lookup index', 'convert text'} <= set(report['phases'])
+    assert report['total'] >= sum(report['phases'].values())
+
+
+def test_streaming(data_tree, tree, offline_droid):
+    class SlowDataSource(LocalDataSource):
+        parallel = True
+        in_flight = most_in_flight = 0
+        lock = threading.Lock()
+
+        def get_file(self, filepath, points_database="AMG"):
+            with self.lock:
+                self.in_flight += 1
+                self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            # Later files arrive first
+            time.sleep(0.05 if 'damage-decks' in filepath else 0.01)
+            try:
+                return super().get_file(filepath, points_database)
+            finally:
+                with self.lock:
+                    self.in_flight -= 1
+
+    source = SlowDataSource(tree)
+    droid = offline_droid(source, fetch_window=2)
+    assert source.most_in_flight == 2
+    # Cards still go in in manifest order
+    assert list(droid.data) == ['damage', 'upgrade', 'condition', 'pilot', 'ship']
+    assert droid.data['pilot']['lukeskywalker']['ship']['name'] == 'T-65 X-wing'
+    assert set(droid.generation.report.files) == set(data_tree.files) - {Droid.MANIFEST}
+
+
+def test_published(tree, tmp_path, offline_droid):
+    store = SnapshotStore(tmp_path / 'snapshots')
+
+    class Supervisor(DroidCore):
+        snapshot_store = store
+        data_source = LocalDataSource(tree)
+
+    with pytest.raises(DataSourceError):
+        offline_droid(SnapshotDataSource(store), snapshot_store=store)
+
+    DataRefresher(Supervisor(), publish_to=store).refresh()
+    droid = offline_droid(SnapshotDataSource(store), snapshot_store=store)
+    assert droid.data_version == store.published("AMG")
+    assert [card['name'] for card in droid.lookup('luke')] == ['Luke Skywalker']
+    assert not droid.load_data().full
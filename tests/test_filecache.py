@@ -0,0 +1,88 @@
+import json
+
+from r2d7.filecache import FileCache
+
+
+class FakeResponse():
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers or {}
+
+
+URL = 'https://example.com/data/upgrades/crew.json'
+BODY = json.dumps([{'xws': 'rey', 'sides': [{'ability': 'test'}]}]).encode()
+
+
+def test_headers():
+    cache = FileCache()
+    assert cache.headers(URL) == {}
+    cache.update(URL, FakeResponse(200, BODY, {
+        'ETag': '"abc"', 'Last-Modified': 'Wed, 01 Jan 2020 00:00:00 GMT'}))
+    assert cache.headers(URL) == {
+        'If-None-Match': '"abc"',
+        'If-Modified-Since': 'Wed, 01 Jan 2020 00:00:00 GMT',
+    }
+
+
+def test_not_modified_reuses_body():
+    cache = FileCache()
+    cache.update(URL, FakeResponse(200, BODY, {'ETag': '"abc"'}))
+    first = cache.get(URL)
+    first[0]['sides'][0]['ability'] = 'mutated by the loader'
+    cache.update(URL, FakeResponse(304))
+    second = cache.get(URL)
+    assert second == json.loads(BODY)
+    assert second is not first
+
+
+def test_same_body_without_validators():
+    cache = FileCache()
+    cache.update(URL, FakeResponse(200, BODY))
+    digest = cache.digest(URL)
+    assert cache.headers(URL) == {}
+    cache.update(URL, FakeResponse(200, BODY))
+    assert cache.digest(URL) == digest
+    assert cache.get(URL) == json.loads(BODY)
+
+
+def test_persisted(tmp_path):
+    cache = FileCache(tmp_path / 'files.json')
+    cache.update(URL, FakeResponse(200, BODY, {'ETag': '"abc"'}))
+    cache.save()
+    assert json.loads((tmp_path / 'files.json').read_text())[URL]['etag'] == '"abc"'
+
+    reloaded = FileCache(tmp_path / 'files.json')
+    assert URL in reloaded
+    assert reloaded.headers(URL) == {'If-None-Match': '"abc"'}
+    assert reloaded.get(URL) == json.loads(BODY)
+
+
+def test_unreadable(tmp_path):
+    (tmp_path / 'files.json').write_bytes(b'\x80\x04not json')
+    assert URL not in FileCache(tmp_path / 'files.json')
+
+
+def test_bodies_on_disk(tmp_path):
+    cache = FileCache(tmp_path / 'files.json')
+    cache.update(URL, FakeResponse(200, BODY, {'ETag': '"abc"'}))
+    assert cache._bodies == {}
+    body = tmp_path / 'files' / f"{cache.digest(URL)}.json"
+    assert body.read_bytes() == BODY
+    assert 'body' not in json.dumps(cache._files)
+
+    # Losing the body means starting over rather than a 304 we can't use
+    body.unlink()
+    assert URL not in cache
+    assert cache.headers(URL) == {}
+
+
+def test_prune(tmp_path):
+    cache = FileCache(tmp_path / 'files.json')
+    cache.store(URL, BODY)
+    old = tmp_path / 'files' / f"{cache.digest(URL)}.json"
+    cache.store(URL, b'[]')
+    cache.keep_unused = -1
+    cache.save()
+    assert not old.exists()
+    assert URL in cache
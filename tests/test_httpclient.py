@@ -0,0 +1,66 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import pytest
+import requests
+
+from r2d7.httpclient import HttpClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        Handler.connections += 1
+
+    def do_GET(self):
+        status = 500 if self.path == '/broken' else 200
+        body = self.path.encode()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_requests(server):
+    client = HttpClient()
+    assert client.get(f"http://{server}/one").text == '/one'
+    assert client.post(f"http://{server}/two", json={}).text == '/two'
+    assert client.get(f"http://{server}/broken").status_code == 500
+
+    stats = client.stats()[server]
+    assert stats.requests == 3
+    assert stats.errors == 1
+    assert 0 < stats.mean <= stats.max
+
+
+def test_connection_reused(server):
+    client = HttpClient()
+    connections = Handler.connections
+    for _ in range(3):
+        client.get(f"http://{server}/one")
+    assert Handler.connections == connections + 1
+
+
+def test_connection_error_counted():
+    client = HttpClient(timeout=1)
+    with pytest.raises(requests.ConnectionError):
+        client.get("http://127.0.0.1:1/")
+    assert client.stats()['127.0.0.1:1'].errors == 1
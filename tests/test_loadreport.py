@@ -0,0 +1,34 @@
+from r2d7.loadreport import FileTiming, LoadReport
+
+
+def test_report():
+    report = LoadReport("AMG")
+    with report.phase('fetch'):
+        pass
+    with report.phase('fetch'):
+        pass
+    report.count('files', 2)
+    report.files = {
+        'data/upgrades/crew.json': FileTiming(0.5, 0.1, 0.1),
+        'data/upgrades/talent.json': FileTiming(0.1, 0.1, 0.1),
+    }
+    report.finish('abc')
+
+    summary = report.as_dict(slowest=1)
+    assert summary['version'] == 'abc'
+    assert list(summary['phases']) == ['fetch']
+    assert summary['counts'] == {'files': 2}
+    assert summary['files']['fetch'] == 0.6
+    assert list(summary['files']['slowest']) == ['data/upgrades/crew.json']
+    assert summary['total'] >= summary['phases']['fetch']
+
+
+def test_hold():
+    report = LoadReport("AMG")
+    report.hold()
+    report.finish('abc')
+    assert report.total is None
+    report.count('cards prerendered', 5)
+    report.release()
+    assert report.total is not None
+    assert report.as_dict()['counts'] == {'cards prerendered': 5}
@@ -0,0 +1,111 @@
+import pytest
+
+from r2d7.core import DroidCore, DroidException
+from r2d7.points import PointsOverlay
+
+
+def test_overlay():
+    base = {
+        'pilot': {'luke': {'xws': 'luke', 'category': 'pilot', 'cost': 6, 'standard': True}},
+        'upgrade': {'hlc': {'xws': 'hlc', 'category': 'cannon', 'cost': {'value': 4}}},
+    }
+    data = {
+        'pilot': {'luke': {'xws': 'luke', 'category': 'pilot', 'cost': 7},
+                  'wedge': {'xws': 'wedge', 'category': 'pilot', 'cost': 5}},
+        'upgrade': {'hlc': {'xws': 'hlc', 'category': 'cannon', 'cost': {'value': 4}}},
+    }
+    overlay = PointsOverlay.build(base, data)
+    assert len(overlay) == 1
+
+    luke = overlay.apply(base['pilot']['luke'])
+    assert luke['cost'] == 7
+    assert 'standard' not in luke
+    assert base['pilot']['luke']['cost'] == 6
+    assert overlay.apply(base['upgrade']['hlc']) is base['upgrade']['hlc']
+
+
+@pytest.fixture
+def droid(points_droid):
+    return points_droid
+
+
+def test_lookup(droid):
+    assert [card['cost'] for card in droid.lookup('luke')] == [6]
+    assert [card['cost'] for card in droid.lookup('luke', "XWA")] == [7]
+    assert len(droid.current_generation("XWA").overlay) == 2
+    assert droid.current_generation("XWA").data is None
+
+    amg, = droid.handle_lookup('t65xwing')
+    xwa, = droid.handle_lookup('t65xwing', "XWA")
+    assert '*[6]*' in amg[-1][0]
+    assert '*[7]*' in xwa[-1][0]
+
+    assert '[Standard]' not in droid.handle_lookup('chewbacca')[0][0]
+    assert '[Standard]' in droid.handle_lookup('chewbacca', "XWA")[0][0]
+
+
+@pytest.mark.parametrize('lookup, points_database, expected', [
+    (':crew: <= 5', "AMG", ['Chewbacca']),
+    (':crew: < 5', "AMG", []),
+    (':t65xwing: = 6', "AMG", ['Luke Skywalker']),
+    (':t65xwing: = 6', "XWA", []),
+    (':t65xwing: points > 6', "XWA", ['Luke Skywalker']),
+    (':t65xwing: initiative >= 5', "XWA", ['Luke Skywalker']),
+    ('Initiative=4 :t65xwing:', "AMG", []),
+    (':t65xwing: loadout < 20', "AMG", []),
+    (':rebel: initiative = 5', "AMG", ['Luke Skywalker']),
+    (':rebel: luke', "AMG", ['Luke Skywalker']),
+    (':scum: luke', "AMG", []),
+])
+def test_range_lookup(droid, lookup, points_database, expected):
+    cards = droid.lookup(lookup, points_database)
+    assert [card['name'] for card in cards] == expected
+
+
+def test_print_xws(droid):
+    xws = {
+        'faction': 'rebelalliance',
+        'pilots': [{'id': 'lukeskywalker', 'ship': 't65xwing',
+                    'upgrades': {'crew': ['chewbacca']}}],
+    }
+    assert droid.print_xws(xws)[0][0].endswith('*[6]*')
+    assert droid.print_xws(dict(xws, ruleset='XWA'))[0][0].endswith('*[7]*')
+
+
+def test_base_reload(droid, points_trees):
+    droid.current_generation("XWA")
+    assert not droid.needs_update("XWA")
+
+    points_trees["AMG"].ship['pilots'][0]['cost'] = 7
+    points_trees["AMG"].write()
+    droid.load_data("AMG")
+    assert droid.needs_update("XWA")
+    droid.load_data("XWA")
+    assert len(droid.current_generation("XWA").overlay) == 1
+    assert [card['cost'] for card in droid.lookup('luke', "XWA")] == [7]
+
+
+def test_base_reload_range_index(droid, points_trees):
+    assert [card['name'] for card in droid.lookup(':crew: <= 3', "XWA")] == []
+    built = droid.current_generation("XWA").range_index[1]
+
+    points_trees["AMG"].crew[0]['cost'] = {'value': 3}
+    points_trees["AMG"].write()
+    assert not droid.load_data("AMG").full
+    assert [card['name'] for card in droid.lookup(':crew: <= 3', "XWA")] == ['Chewbacca']
+    # Updated for the new base rather than rebuilt
+    updated = droid.current_generation("XWA").range_index[1]
+    assert updated is not built
+    assert updated._values[':t65xwing:', 'points'] is built._values[':t65xwing:', 'points']
+
+
+def test_overlay_not_loaded(tree, offline_droid):
+    droid = offline_droid({"AMG": tree})
+    assert droid.current_generation("XWA") is droid.generation
+    assert [card['cost'] for card in droid.lookup('luke', "XWA")] == [6]
+    assert '*[6]*' in droid.handle_lookup('t65xwing', "XWA")[-1][-1][0]
+
+
+def test_nothing_loaded():
+    with pytest.raises(DroidException):
+        DroidCore().current_generation("XWA")
@@ -0,0 +1,37 @@
+import multiprocessing
+import sys
+
+import pytest
+
+from r2d7.prerender import rendered_size
+
+
+@pytest.fixture(params=['forkserver', 'spawn'])
+def droid(request, tree, monkeypatch, offline_droid):
+    if request.param == 'spawn':
+        monkeypatch.setattr(multiprocessing, 'get_all_start_methods', lambda: ['spawn'])
+    return offline_droid(tree, PRERENDER_WORKERS=2)
+
+
+def test_prerender(droid):
+    generation = droid.generation
+    generation.prerenderer.join()
+    cards = list(droid.all_cards(droid.data))
+    rendered = generation.rendered["AMG", None]
+    assert set(rendered) == {card['_id'] for card in cards}
+    for card in cards:
+        assert droid.print_card(card) == droid.render_card(card)
+
+    report = droid.metrics()['loads'][0]
+    # Logged once the pre-rendering had been recorded
+    assert report['total'] >= report['phases']['prerender']
+    assert report['counts']['cards prerendered'] == len(cards)
+    assert report['counts']['prerendered bytes'] == rendered_size(rendered)
+    assert 'prerender' in report['phases']
+
+
+def test_rendered_size():
+    line = 'x' * 100
+    # Shared lines are only counted once
+    assert rendered_size((line, line)) == sys.getsizeof((line, line)) + sys.getsizeof(line)
+    assert rendered_size({1: (line,)}) > rendered_size((line,))
@@ -0,0 +1,68 @@
+import pytest
+
+from r2d7.core import UserError
+from r2d7.querycache import QueryCache
+
+
+class Clock():
+    now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru():
+    cache = QueryCache(size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    stats = cache.stats()
+    assert (stats.size, stats.hits, stats.misses, stats.evictions) == (2, 3, 1, 1)
+    assert stats.hit_rate == 0.75
+
+
+def test_ttl():
+    clock = Clock()
+    cache = QueryCache(ttl=10, clock=clock)
+    cache.put('a', 1)
+    clock.now = 10
+    assert cache.get('a') == 1
+    clock.now = 11
+    assert cache.get('a') is None
+    assert cache.stats().expirations == 1
+    assert cache.stats().size == 0
+
+
+def test_disabled():
+    cache = QueryCache(size=0)
+    cache.put('a', 1)
+    assert cache.get('a') is None
+    assert cache.stats().hit_rate == 0
+    assert QueryCache().stats().hit_rate is None
+
+
+def test_query_cache(points_droid, points_trees):
+    amg = points_droid.handle_lookup('t65xwing')
+    amg[0].append('changed')
+    assert (points_droid.handle_lookup('  t65xwing ')
+            == points_droid.handle_lookup('t65xwing') != amg)
+    xwa = points_droid.handle_lookup('t65xwing', "XWA")
+    assert points_droid.metrics()['lookup_cache']['hits'] == 2
+    assert points_droid.handle_lookup('t65xwing', "XWA") == xwa
+
+    with pytest.raises(UserError):
+        points_droid.handle_lookup('points > 1')
+    with pytest.raises(UserError):
+        points_droid.handle_lookup('points > 1')
+
+    points_trees["XWA"].ship['pilots'][0]['cost'] = 8
+    points_trees["XWA"].write()
+    points_droid.load_data("XWA")
+    xwa, = points_droid.handle_lookup('t65xwing', "XWA")
+    assert '*[8]*' in xwa[-1][0]
+    stats = points_droid.metrics()['lookup_cache']
+    assert (stats['hits'], stats['misses']) == (4, 4)
@@ -0,0 +1,73 @@
+from r2d7.refresher import DataRefresher
+
+
+class FakeDroid():
+    check_frequency = 900
+
+    def __init__(self, stale=(), broken=()):
+        self.stale = set(stale)
+        self.broken = set(broken)
+        self.loaded = []
+
+    def needs_update(self, points_database="AMG", recheck=False):
+        if points_database in self.broken:
+            raise ConnectionError("GitHub is down")
+        return points_database in self.stale
+
+    def load_data(self, points_database="AMG", full=False):
+        self.loaded.append(points_database)
+        self.stale.discard(points_database)
+
+
+def test_refresh_loads_stale():
+    droid = FakeDroid(stale=["XWA"])
+    refresher = DataRefresher(droid, points_databases=("AMG", "XWA"))
+    refresher.refresh()
+    assert droid.loaded == ["XWA"]
+    refresher.refresh()
+    assert droid.loaded == ["XWA"]
+
+
+def test_refresh_survives_errors():
+    droid = FakeDroid(stale=["XWA"], broken=["AMG"])
+    DataRefresher(droid, points_databases=("AMG", "XWA")).refresh()
+    assert droid.loaded == ["XWA"]
+
+
+def test_runs_in_background():
+    droid = FakeDroid(stale=["AMG"])
+    refresher = DataRefresher(droid, interval=0.01)
+    assert refresher.daemon
+    refresher.start()
+    refresher.join(0.5)
+    refresher.stop()
+    refresher.join()
+    assert droid.loaded == ["AMG"]
+
+
+def test_refreshes_before_waiting():
+    droid = FakeDroid(stale=["AMG", "XWA"])
+    refresher = DataRefresher(droid, points_databases=("AMG", "XWA"), interval=60)
+    refresher.start()
+    for _ in range(50):
+        if len(droid.loaded) == 2:
+            break
+        refresher.join(0.01)
+    refresher.stop()
+    refresher.join()
+    assert droid.loaded == ["AMG", "XWA"]
+
+
+def test_trigger():
+    droid = FakeDroid()
+    refresher = DataRefresher(droid, interval=60)
+    refresher.start()
+    droid.stale.add("AMG")
+    refresher.trigger()
+    for _ in range(50):
+        if droid.loaded:
+            break
+        refresher.join(0.01)
+    refresher.stop()
+    refresher.join()
+    assert droid.loaded == ["AMG"]
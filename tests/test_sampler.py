@@ -0,0 +1,45 @@
+import itertools
+
+import pytest
+
+from r2d7.sampler import WeightedSampler
+
+
+class Every():
+    """
+    Stands in for random, giving back each combination of draws in turn.
+    """
+    def __init__(self, sampler):
+        self.draws = itertools.product(range(len(sampler)), range(sampler._total))
+        self.next = None
+
+    def randrange(self, stop):
+        if self.next is None:
+            column, self.next = next(self.draws)
+            return column
+        value, self.next = self.next, None
+        return value
+
+
+@pytest.mark.parametrize('weights', [
+    {'a': 1},
+    {'a': 5, 'b': 1},
+    {'a': 3, 'b': 3, 'c': 3},
+    {'a': 2, 'b': 0, 'c': 7, 'd': 1, 'e': 4},
+])
+def test_draw(weights):
+    sampler = WeightedSampler(weights.items())
+    every = Every(sampler)
+    draws = len(sampler) * sampler._total
+    counts = {}
+    for _ in range(draws):
+        item = sampler.draw(every)
+        counts[item] = counts.get(item, 0) + 1
+    total = sum(weights.values())
+    assert {item: count * total for item, count in counts.items()} == {
+        item: weight * draws for item, weight in weights.items() if weight}
+
+
+def test_empty():
+    with pytest.raises(ValueError):
+        WeightedSampler([('a', 0)])
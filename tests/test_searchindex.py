@@ -0,0 +1,184 @@
+import pytest
+
+from r2d7.searchindex import (
+    FuzzyIndex, PrefixIndex, RangeIndex, TrigramIndex, WordIndex, edit_distance)
+
+
+def test_word_index():
+    index = WordIndex([
+        ('hotshotcopilot', ['Hotshot Co-pilot']),
+        ('hotshottailblaster', ['Hot Shot Tail Blaster']),
+        ('heavylasercannon', ['Heavy Laser Cannon']),
+        ('ionscannon', ['Ion Cannon', 'Ion Cannon']),
+    ])
+    assert index.prefixed('hot') == ['hotshotcopilot', 'hotshottailblaster']
+    assert index.prefixed('cannon') == ['heavylasercannon', 'ionscannon']
+    assert index.prefixed('pilot') == ['hotshotcopilot']
+    assert index.prefixed('laser') == ['heavylasercannon']
+    assert index.prefixed('zz') == []
+    assert index.closest('canon') == ['heavylasercannon', 'ionscannon']
+    assert index.closest('lazer') == ['heavylasercannon']
+    assert index.closest('zz') == []
+
+
+def test_word_index_updated():
+    index = WordIndex([
+        ('hotshotcopilot', ['Hotshot Co-pilot']),
+        ('heavylasercannon', ['Heavy Laser Cannon']),
+        ('ionscannon', ['Ion Cannon']),
+    ])
+    assert index.updated([], []) is index
+
+    updated = index.updated(
+        [('hotshotcopilot', ['Hotshot Co-pilot']), ('ionscannon', ['Ion Cannon'])],
+        [('hotshotcopilot', ['Hotshot Wingman']), ('hansolo', ['Han Solo'])],
+    )
+    assert updated.prefixed('h') == ['hotshotcopilot', 'heavylasercannon', 'hansolo']
+    assert updated.prefixed('wing') == ['hotshotcopilot']
+    assert updated.prefixed('pilot') == []
+    assert updated.prefixed('cannon') == ['heavylasercannon']
+    assert updated.prefixed('ion') == []
+    assert index.prefixed('ion') == ['ionscannon']
+    assert updated.closest('wingmen') == ['hotshotcopilot']
+    assert updated.closest('pilots') == []
+    assert updated.closest('canon') == ['heavylasercannon']
+    assert index.closest('pilots') == ['hotshotcopilot']
+
+
+def test_prefix_index():
+    index = PrefixIndex([
+        ('heavylasercannon', 'heavylasercannon'),
+        ('hlc', 'heavylasercannon'),
+        ('hotshotcopilot', 'hotshotcopilot'),
+        ('hotshottailblaster', 'hotshottailblaster'),
+        ('ioncannon', 'ioncannon'),
+    ])
+    assert index.prefixed('h') == ['heavylasercannon', 'hotshotcopilot', 'hotshottailblaster']
+    assert index.prefixed('hot', limit=1) == ['hotshotcopilot']
+    assert index.prefixed('hl') == ['heavylasercannon']
+    assert index.prefixed('ioncannon') == ['ioncannon']
+    assert index.prefixed('ioncannons') == []
+    assert index.prefixed('z') == []
+
+
+def test_prefix_index_updated():
+    index = PrefixIndex([
+        ('hansolo', 'hansolo'),
+        ('hotshotcopilot', 'hotshotcopilot'),
+        ('ioncannon', 'ioncannon'),
+    ])
+    assert index.updated([], []) is index
+
+    updated = index.updated([('hansolo', 'hansolo')], [('hlc', 'heavylasercannon')])
+    assert updated.prefixed('h') == ['heavylasercannon', 'hotshotcopilot']
+    assert updated.prefixed('i') == ['ioncannon']
+    assert index.prefixed('h') == ['hansolo', 'hotshotcopilot']
+
+
+def test_trigram_index():
+    index = TrigramIndex([
+        'hotshotcopilot', 'hotshottailblaster', 'heavylasercannon', 'ioncannon'])
+    assert index.containing('shot') == ['hotshotcopilot', 'hotshottailblaster']
+    assert index.containing('cannon') == ['heavylasercannon', 'ioncannon']
+    assert index.containing('lasercan') == ['heavylasercannon']
+    assert index.containing('pilotcannon') == []
+    assert index.containing('zzz') == []
+    assert index.containing('on') is None
+
+
+def test_trigram_index_updated():
+    index = TrigramIndex(['hotshotcopilot', 'heavylasercannon', 'ioncannon'])
+    assert index.updated([], []) is index
+
+    updated = index.updated(['ioncannon'], ['hotshottailblaster'])
+    assert updated.containing('shot') == ['hotshotcopilot', 'hotshottailblaster']
+    assert updated.containing('cannon') == ['heavylasercannon']
+    assert index.containing('cannon') == ['heavylasercannon', 'ioncannon']
+
+
+@pytest.mark.parametrize('a, b, limit, expected', [
+    ('soontirfel', 'soontirfel', 2, 0),
+    ('soontirfell', 'soontirfel', 2, 1),
+    ('soontrifel', 'soontirfel', 2, 1),
+    ('heavylasercanon', 'heavylasercannon', 2, 1),
+    ('hansolo', 'lando', 2, 3),
+    ('hansolo', 'lando', 5, 4),
+])
+def test_edit_distance(a, b, limit, expected):
+    assert edit_distance(a, b, limit) == expected
+
+
+def test_fuzzy_index():
+    index = FuzzyIndex([
+        ('soontirfel', 'soontirfel'),
+        ('heavylasercannon', 'heavylasercannon'),
+        ('hlc', 'heavylasercannon'),
+        ('hansolo', 'hansolo'),
+        ('lando', 'landocalrissian'),
+    ])
+    assert index.closest('soontirfell') == ['soontirfel']
+    assert index.closest('heavylasercanon') == ['heavylasercannon']
+    assert index.closest('hansolp') == ['hansolo']
+    assert index.closest('lamdo') == ['landocalrissian']
+    assert index.closest('hanslo') == ['hansolo']
+    # Too far, and too short to guess at
+    assert index.closest('hanso') == []
+    assert index.closest('hlx') == []
+
+
+def test_fuzzy_index_updated():
+    terms = [('soontirfel', 'soontirfel'), ('hansolo', 'hansolo'), ('lando', 'landocalrissian')]
+    index = FuzzyIndex(terms)
+    assert index.updated([], []) is index
+
+    updated = index.updated([('hansolo', 'hansolo')], [('hansolo', 'hansolocrew')])
+    assert updated.closest('hansolp') == ['hansolocrew']
+    assert updated.closest('soontirfell') == ['soontirfel']
+    assert updated.closest('lamdo') == ['landocalrissian']
+    # The original is untouched
+    assert index.closest('hansolp') == ['hansolo']
+
+    removed = index.updated([('lando', 'landocalrissian')], [])
+    assert removed.closest('lamdo') == []
+    assert removed._deletes.keys() == FuzzyIndex(terms[:2])._deletes.keys()
+
+
+def test_range_index():
+    index = RangeIndex([
+        (':crew:', 'points', 5, 'chewbacca'),
+        (':crew:', 'points', 3, 'c3po'),
+        (':gunner:', 'points', 8, 'hansolo'),
+        (':crew:', 'points', 9, 'hansolo'),
+        (':xwing:', 'points', 6, 'lukeskywalker'),
+        (':xwing:', 'initiative', 5, 'lukeskywalker'),
+    ])
+    assert index.compare(':crew:', 'points', '<=', 5) == ['chewbacca', 'c3po']
+    assert index.compare(':crew:', 'points', '<', 5) == ['c3po']
+    assert index.compare(':crew:', 'points', '>', 5) == ['hansolo']
+    assert index.compare(':crew:', 'points', '>=', 3) == ['chewbacca', 'c3po', 'hansolo']
+    assert index.compare(':crew:', 'points', '=', 4) == []
+    assert index.compare(':xwing:', 'initiative', '=', 5) == ['lukeskywalker']
+    assert index.compare(':xwing:', 'loadout', '<', 10) == []
+    with pytest.raises(ValueError):
+        index.compare(':crew:', 'points', '=>', 5)
+
+
+def test_range_index_updated():
+    entries = [
+        (':crew:', 'points', 5, 'chewbacca'),
+        (':crew:', 'points', 3, 'c3po'),
+        (':xwing:', 'points', 6, 'lukeskywalker'),
+    ]
+    index = RangeIndex(entries)
+    assert index.updated([], []) is index
+
+    updated = index.updated(
+        [(':crew:', 'points', 5, 'chewbacca'), (':xwing:', 'points', 6, 'lukeskywalker')],
+        [(':crew:', 'points', 3, 'chewbacca'), (':crew:', 'points', 4, 'hansolo')],
+    )
+    assert updated.compare(':crew:', 'points', '=', 3) == ['chewbacca', 'c3po']
+    assert updated.compare(':crew:', 'points', '>', 3) == ['hansolo']
+    assert updated.compare(':xwing:', 'points', '>', 0) == []
+    # The original is untouched
+    assert index.compare(':crew:', 'points', '=', 5) == ['chewbacca']
+    assert index.compare(':xwing:', 'points', '>', 0) == ['lukeskywalker']
@@ -56,3 +56,20 @@ convert_text_tests = [
 @pytest.mark.parametrize('before, after', convert_text_tests)
 def test_convert_text(testbot, before, after):
     assert testbot.convert_text(before) == after
+
+
+def test_converted_text_reload(data_tree, offline_droid):
+    droid = offline_droid(data_tree.write())
+    pinned = droid.generation
+    old = pinned.data['upgrade']['chewbacca']['sides'][0]['ability']
+    data_tree.crew[0]['sides'][0]['ability'] = 'Spend 1 [Charge].'
+    data_tree.write()
+    assert not droid.load_data().full
+
+    # The text of the old card goes, from this generation only
+    assert old not in droid.generation.converted_text
+    assert old in pinned.converted_text
+    assert droid.generation.converted_text['Spend 1 [Charge].'] == ['Spend 1 :charge:.']
+    full = dict(droid.generation.converted_text)
+    droid.load_data(full=True)
+    assert droid.generation.converted_text == full
@@ -0,0 +1,67 @@
+import os
+
+from r2d7.snapshot import SnapshotStore
+
+
+def test_round_trip(tmp_path):
+    store = SnapshotStore(tmp_path)
+    ship = {'name': 'T-65 X-wing', 'xws': 't65xwing'}
+    pilot = {'name': 'Luke Skywalker', 'ship': ship}
+    ship['pilots'] = {'Rebel Alliance': [pilot]}
+    store.save('AMG', 'abc123', {'ship': {'t65xwing': ship}})
+
+    data = store.load('AMG', 'abc123')
+    loaded_ship = data['ship']['t65xwing']
+    assert loaded_ship['name'] == 'T-65 X-wing'
+    # Back references survive
+    assert loaded_ship['pilots']['Rebel Alliance'][0]['ship'] is loaded_ship
+
+
+def test_keyed_by_version_and_database(tmp_path):
+    store = SnapshotStore(tmp_path)
+    store.save('AMG', 'abc123', {'ship': {}})
+    assert store.load('AMG', 'def456') is None
+    assert store.load('XWA', 'abc123') is None
+    assert store.load('AMG', False) is None
+
+
+def test_unreadable_snapshot(tmp_path):
+    store = SnapshotStore(tmp_path)
+    store.save('AMG', 'abc123', {'ship': {}})
+    store._filename('AMG', 'abc123').write_bytes(b'not a pickle')
+    assert store.load('AMG', 'abc123') is None
+
+
+def test_prune(tmp_path):
+    store = SnapshotStore(tmp_path)
+    for age, version in enumerate(('old', 'middle', 'new')):
+        store.save('AMG', version, {})
+        os.utime(store._filename('AMG', version), (age, age))
+    store.save('XWA', 'other', {})
+    store.prune('AMG')
+    assert store.load('AMG', 'old') is None
+    assert store.load('AMG', 'middle') == {}
+    assert store.load('AMG', 'new') == {}
+    assert store.load('XWA', 'other') == {}
+
+
+def test_publish(tmp_path):
+    store = SnapshotStore(tmp_path)
+    assert store.published('AMG') is None
+    store.publish('AMG', 'abc123')
+    store.publish('AMG', False)
+    assert store.published('AMG') == 'abc123'
+    assert SnapshotStore(tmp_path).published('AMG') == 'abc123'
+    assert store.published('XWA') is None
+
+
+def test_shared_directory(tmp_path):
+    shared = tmp_path / 'shared'
+    SnapshotStore(shared).save('AMG', 'abc123', {})
+    assert shared.stat().st_mode & 0o777 == 0o700
+    shared.chmod(0o777)
+    store = SnapshotStore(shared)
+    assert store.load('AMG', 'abc123') is None
+    store.save('AMG', 'def456', {})
+    assert not store._filename('AMG', 'def456').exists()
+    assert store.published('AMG') is None
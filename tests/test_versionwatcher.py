@@ -0,0 +1,153 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import pytest
+
+from r2d7 import versionwatcher
+from r2d7.versionwatcher import VersionWatcher
+
+
+class GitHub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    sha = 'one'
+    remaining = 60
+    requests = []
+    malformed = False
+
+    def do_GET(self):
+        GitHub.requests.append(self.path)
+        etag = f'"{GitHub.sha}"'
+        headers = {
+            'X-RateLimit-Remaining': str(GitHub.remaining),
+            'X-RateLimit-Reset': str(int(time.time()) + 3600),
+            'ETag': etag,
+        }
+        if GitHub.remaining <= 0:
+            status, body = 403, b'{"message": "API rate limit exceeded"}'
+        elif GitHub.malformed:
+            status, body = 200, b'{"message": "Server Error"}'
+        elif self.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+        else:
+            GitHub.remaining -= 1
+            status, body = 200, json.dumps({'commit': {'sha': GitHub.sha}}).encode()
+        self.send_response(status)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def github():
+    GitHub.sha, GitHub.remaining, GitHub.requests, GitHub.malformed = 'one', 60, [], False
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/repos/someone/xwing-data2/branches/master"
+    server.shutdown()
+
+
+def expire(watcher, url):
+    state = watcher._read()
+    state['branches'][url]['checked'] = 0
+    state['blocked_until'] = 0
+    watcher._write(state)
+
+
+def test_version(github):
+    watcher = VersionWatcher()
+    assert watcher.version(github) == 'one'
+    # Checked recently
+    assert watcher.version(github) == 'one'
+    assert len(GitHub.requests) == 1
+
+    expire(watcher, github)
+    assert watcher.version(github) == 'one'
+    assert len(GitHub.requests) == 2
+    # The 304 didn't count against the limit
+    assert GitHub.remaining == 59
+
+    GitHub.sha = 'two'
+    expire(watcher, github)
+    assert watcher.version(github) == 'two'
+
+
+def test_shared(github, tmp_path):
+    first = VersionWatcher(tmp_path / 'versions.json')
+    second = VersionWatcher(tmp_path / 'versions.json')
+    assert first.version(github) == 'one'
+    assert second.version(github) == 'one'
+    assert len(GitHub.requests) == 1
+
+
+def test_no_file_locks(github, tmp_path, monkeypatch):
+    monkeypatch.setattr(versionwatcher, 'fcntl', None)
+    first = VersionWatcher(tmp_path / 'versions.json')
+    second = VersionWatcher(tmp_path / 'versions.json')
+    assert first.version(github) == second.version(github) == 'one'
+    assert len(GitHub.requests) == 2
+    assert not (tmp_path / 'versions.json').exists()
+
+
+def test_rate_limit(github):
+    watcher = VersionWatcher()
+    GitHub.remaining = 20
+    watcher.version(github)
+    # 15 requests (after the reserve) to last the hour
+    assert watcher._read()['interval'] == pytest.approx(3600 / 15, abs=1)
+
+    GitHub.remaining = 0
+    GitHub.sha = 'two'
+    expire(watcher, github)
+    assert watcher.version(github) == 'one'
+    requests = len(GitHub.requests)
+    # Nothing more until the limit resets
+    watcher._read()['branches'][github]['checked'] = 0
+    assert watcher.version(github) == 'one'
+    assert len(GitHub.requests) == requests
+    assert watcher._read()['blocked_until'] > time.time() + 3500
+
+
+def test_unreachable():
+    watcher = VersionWatcher()
+    assert watcher.version("http://127.0.0.1:9/branches/master") is None
+    assert watcher._read()['blocked_until'] > time.time()
+
+
+def test_shared_updates(github, tmp_path):
+    def check(branch):
+        VersionWatcher(tmp_path / 'versions.json').version(f"{github}/{branch}")
+
+    checks = [threading.Thread(target=check, args=(branch,)) for branch in range(8)]
+    for thread in checks:
+        thread.start()
+    for thread in checks:
+        thread.join()
+    # No process overwrote another's check
+    assert len(VersionWatcher(tmp_path / 'versions.json')._read()['branches']) == 8
+
+
+def test_malformed(github):
+    watcher = VersionWatcher()
+    assert watcher.version(github) == 'one'
+    GitHub.malformed = True
+    expire(watcher, github)
+    assert watcher.version(github) == 'one'
+    assert watcher._read()['failures'] == 1
+    assert watcher._read()['blocked_until'] > time.time()
+
+
+def test_expire(github):
+    watcher = VersionWatcher()
+    watcher.version(github)
+    GitHub.sha = 'two'
+    assert watcher.version(github) == 'one'
+    watcher.expire(github)
+    assert watcher.version(github) == 'two'
+    assert len(GitHub.requests) == 2
@@ -0,0 +1,90 @@
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from r2d7.httpclient import HttpClient
+from r2d7.webhook import WebhookServer
+
+URL = "https://api.github.com/repos/someone/xwing-data2/branches/master"
+
+
+class FakeDroid():
+    def metrics(self):
+        return {'loads': []}
+
+
+class FakeRefresher():
+    droid = FakeDroid()
+    triggered = 0
+
+    def trigger(self):
+        self.triggered += 1
+
+
+class FakeWatcher():
+    def __init__(self):
+        self.expired = []
+
+    def expire(self, url):
+        self.expired.append(url)
+
+
+@pytest.fixture
+def webhook():
+    webhook = WebhookServer(FakeRefresher(), FakeWatcher(), 0, 'sekrit')
+    webhook.start()
+    yield webhook
+    webhook.stop()
+
+
+def deliver(webhook, event, payload, secret='sekrit'):
+    body = json.dumps(payload).encode()
+    signature = 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return HttpClient().post(f"http://127.0.0.1:{webhook.port}/", data=body, headers={
+        'X-GitHub-Event': event,
+        'X-Hub-Signature-256': signature,
+    }).status_code
+
+
+PUSH = {
+    'ref': 'refs/heads/master',
+    'after': 'abc123',
+    'repository': {'full_name': 'someone/xwing-data2'},
+}
+
+
+def test_push(webhook):
+    assert deliver(webhook, 'push', PUSH) == 202
+    assert webhook.watcher.expired == [URL]
+    assert webhook.refresher.triggered == 1
+
+
+def test_ignored(webhook):
+    assert deliver(webhook, 'push', PUSH, secret='wrong') == 401
+    assert deliver(webhook, 'ping', {}) == 204
+    assert deliver(webhook, 'push', dict(PUSH, repository={'full_name': 'someone/other'})) == 204
+    assert deliver(webhook, 'push', {}) == 400
+    assert webhook.watcher.expired == []
+    assert webhook.refresher.triggered == 0
+
+
+def test_metrics(webhook):
+    client = HttpClient()
+    assert client.get(f"http://127.0.0.1:{webhook.port}/metrics").json() == {'loads': []}
+    assert client.get(f"http://127.0.0.1:{webhook.port}/").status_code == 404
+
+
+def test_metrics_token(webhook):
+    webhook.metrics_token = 'letmein'
+    url = f"http://127.0.0.1:{webhook.port}/metrics"
+    client = HttpClient()
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers={'Authorization': 'Bearer nope'}).status_code == 401
+    assert client.get(url, headers={'Authorization': 'Bearer letmein'}).json() == {'loads': []}
+
+
+def test_secret_required():
+    with pytest.raises(ValueError):
+        WebhookServer(FakeRefresher(), FakeWatcher(), 0, None)